@@ -0,0 +1,394 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from rich.console import Console
+from rich.table import Table
+
+import token_analyzer
+from fixtures import FixtureServer
+
+console = Console()
+
+
+def make_stub_pair(address):
+    return {
+        "chainId": "ethereum",
+        "dexId": "uniswap",
+        "url": f"https://dexscreener.com/ethereum/{address}",
+        "pairAddress": address,
+        "baseToken": {"address": address, "name": "Stub Token", "symbol": "STUB"},
+        "quoteToken": {"address": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2", "name": "Wrapped Ether", "symbol": "WETH"},
+        "priceNative": "0.0000001",
+        "priceUsd": "0.00025",
+        "txns": {"h24": {"buys": 120, "sells": 80}},
+        "volume": {"h24": 150000.0},
+        "priceChange": {"h24": 2.5},
+        "liquidity": {"usd": 500000.0, "base": 1000000000.0, "quote": 120.0},
+        "fdv": 2500000.0,
+    }
+
+
+class StubDexScreenerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.05
+
+    def do_GET(self):
+        prefix = "/latest/dex/tokens/"
+        if not self.path.startswith(prefix):
+            self.send_error(404)
+            return
+        time.sleep(self.latency)
+        addresses = self.path[len(prefix):].split(",")
+        body = json.dumps({"pairs": [make_stub_pair(a) for a in addresses]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(latency):
+    StubDexScreenerHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubDexScreenerHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def time_call(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench_favorites_scan(sizes, latency, max_in_flight):
+    with tempfile.TemporaryDirectory() as workdir:
+        token_analyzer.RESPONSE_CACHE_FILE = os.path.join(workdir, "response_cache.db")
+        token_analyzer.PRICE_HISTORY_DIR = os.path.join(workdir, "price_history")
+        token_analyzer.SEARCH_INDEX_FILE = os.path.join(workdir, "search_index.db")
+        server = start_stub_server(latency)
+        token_analyzer.DEXSCREENER_API = f"http://127.0.0.1:{server.server_address[1]}/latest/dex"
+        # Measure network behaviour, not cache hits from the previous run
+        token_analyzer.CACHE_TTLS["pairs"] = 0
+
+        table = Table(title=f"Favorites scan vs watchlist size (stub latency {latency * 1000:.0f} ms)")
+        table.add_column("Tokens", justify="right", style="cyan")
+        table.add_column("Sequential (s)", justify="right", style="yellow")
+        table.add_column("Batched (s)", justify="right", style="green")
+        table.add_column("Speedup", justify="right", style="magenta")
+
+        for size in sizes:
+            addresses = [f"0x{i:040x}" for i in range(1, size + 1)]
+            sequential = time_call(lambda: [token_analyzer.fetch_dexscreener_data(a) for a in addresses])
+            batched = time_call(lambda: list(token_analyzer.scan_tokens_batched(addresses, max_in_flight=max_in_flight)))
+            table.add_row(str(size), f"{sequential:.3f}", f"{batched:.3f}", f"{sequential / batched:.1f}x")
+
+        server.shutdown()
+        console.print(table)
+        token_analyzer.display_http_stats()
+
+def time_subprocess(args, cwd):
+    start = time.perf_counter()
+    subprocess.run(args, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def time_to_first_menu(script, cwd):
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, script], cwd=cwd, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    elapsed = None
+    for line in process.stdout:
+        if "Main Menu" in line:
+            elapsed = time.perf_counter() - start
+            break
+    process.stdin.write("8\n")
+    process.stdin.flush()
+    process.communicate(timeout=30)
+    return elapsed
+
+
+def bench_startup(runs):
+    # Run from an empty directory so favorites files and the ABI lookup cannot lean on the repo checkout
+    workdir = tempfile.mkdtemp()
+    module_dir = os.path.dirname(os.path.abspath(token_analyzer.__file__))
+    script = os.path.join(module_dir, "token_analyzer.py")
+    import_cmd = [sys.executable, "-c", f"import sys; sys.path.insert(0, {module_dir!r}); import token_analyzer"]
+
+    samples = {
+        "Interpreter baseline": [time_subprocess([sys.executable, "-c", "pass"], workdir) for _ in range(runs)],
+        "Import token_analyzer": [time_subprocess(import_cmd, workdir) for _ in range(runs)],
+        "Time to first menu": [time_to_first_menu(script, workdir) for _ in range(runs)],
+    }
+
+    table = Table(title=f"Startup time ({runs} runs)")
+    table.add_column("Measurement", style="cyan")
+    table.add_column("Median (ms)", justify="right", style="green")
+    table.add_column("Min (ms)", justify="right", style="yellow")
+    table.add_column("Max (ms)", justify="right", style="red")
+    for name, values in samples.items():
+        values = [v for v in values if v is not None]
+        if not values:
+            table.add_row(name, "n/a", "n/a", "n/a")
+            continue
+        table.add_row(name, f"{statistics.median(values) * 1000:.0f}", f"{min(values) * 1000:.0f}", f"{max(values) * 1000:.0f}")
+    console.print(table)
+
+
+SYNTHETIC_WALLET = "0x" + "ab" * 20
+SYNTHETIC_TRANSFERS = 3000
+
+
+def make_synthetic_transfer(index):
+    block = 18000000 + index // 3
+    incoming = index % 2 == 0
+    counterparty = f"0x{index % 50 + 1:040x}"
+    return {
+        "blockNumber": str(block), "timeStamp": str(1700000000 + block % 100000 * 12),
+        "hash": f"0x{index // 2:064x}", "logIndex": str(index % 2), "nonce": "1", "blockHash": f"0x{block:064x}",
+        "from": counterparty if incoming else SYNTHETIC_WALLET, "to": SYNTHETIC_WALLET if incoming else counterparty,
+        "contractAddress": f"0x{index % 7 + 1000:040x}", "value": str(10 ** 18 * (index + 1) + index),
+        "tokenName": f"Token {index % 7}", "tokenSymbol": f"TK{index % 7}", "tokenDecimal": "18",
+        "transactionIndex": "1", "gas": "60000", "gasPrice": "20000000000", "gasUsed": "50000",
+        "cumulativeGasUsed": "100000", "input": "deprecated", "confirmations": "10",
+    }
+
+
+def synthetic_scan_api(query):
+    if query.get("action") == "balance":
+        return {"status": "1", "message": "OK", "result": "1500000000000000000"}
+    if query.get("action") != "tokentx":
+        return None
+    transfers = [make_synthetic_transfer(i) for i in range(SYNTHETIC_TRANSFERS)]
+    transfers = [tx for tx in transfers if int(query.get("startblock", 0)) <= int(tx["blockNumber"]) <= int(query.get("endblock", 99999999))]
+    if query.get("sort") == "desc":
+        transfers.reverse()
+    page, offset = int(query.get("page", 1)), int(query.get("offset", 30))
+    rows = transfers[(page - 1) * offset:page * offset]
+    return {"status": "1" if rows else "0", "message": "OK" if rows else "No transactions found", "result": rows}
+
+
+def synthetic_rpc(body):
+    replies = []
+    for call in json.loads(body):
+        tx_hash = call["params"][0]
+        if call["method"] == "eth_getTransactionByHash":
+            result = {"hash": tx_hash, "from": SYNTHETIC_WALLET, "to": f"0x{1000:040x}", "value": "0x0", "gas": "0xea60",
+                      "gasPrice": "0x4a817c800", "nonce": "0x1", "blockNumber": "0x112a880",
+                      "input": "0xa9059cbb" + "00" * 12 + "11" * 20 + f"{10 ** 18:064x}"}
+        else:
+            result = {"transactionHash": tx_hash, "status": "0x1", "gasUsed": "0xc350", "effectiveGasPrice": "0x4a817c800", "logs": []}
+        replies.append({"jsonrpc": "2.0", "id": call["id"], "result": result})
+    return replies
+
+
+def synthetic_response(method, url, body):
+    # Stand-in for recorded fixtures, so the suite runs with no API keys and no network
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    payload = None
+    if parts.netloc == "api.dexscreener.com" and "/tokens/" in parts.path:
+        payload = {"pairs": [make_stub_pair(a) for a in unquote(parts.path.rsplit("/", 1)[1]).split(",")]}
+    elif parts.netloc == "api.dexscreener.com" and parts.path.endswith("/search"):
+        term = query.get("q", "stub")
+        payload = {"pairs": [make_stub_pair(f"0x{i + 5000:040x}") for i in range(30)]}
+        for i, pair in enumerate(payload["pairs"]):
+            pair["baseToken"].update(name=f"{term.title()} {i}", symbol=term.upper())
+            pair["liquidity"]["usd"] = 500000.0 / (i + 1)
+    elif parts.netloc == "api.ethplorer.io":
+        payload = {"holders": [{"address": f"0x{i + 1:040x}", "balance": 10 ** 24 // (i + 1), "share": 10.0 / (i + 1)} for i in range(10)]}
+    elif method == "POST":
+        payload = synthetic_rpc(body)
+    elif "api" in parts.netloc and "scan" in parts.netloc:
+        payload = synthetic_scan_api(query)
+    if payload is None:
+        return None
+    return 200, "application/json", json.dumps(payload)
+
+
+def percentile(samples, pct):
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def run_case(func, iterations, warmup):
+    for _ in range(warmup):
+        func()
+    samples = []
+    failures = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        ok = func()
+        samples.append(time.perf_counter() - start)
+        failures += ok is False
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "failures": failures,
+        "throughput": iterations / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def bench_suite(args):
+    workdir = tempfile.mkdtemp()
+    server = FixtureServer(args.fixtures or os.path.join(workdir, "fixtures"), latency=args.latency, error_rate=args.error_rate,
+                           fallback=None if args.fixtures else synthetic_response).start()
+    token_analyzer.FIXTURE_SERVER_URL = server.url
+    token_analyzer.RESPONSE_CACHE_FILE = os.path.join(workdir, "response_cache.db")
+    token_analyzer.WALLET_INDEX_FILE = os.path.join(workdir, "wallet_index.db")
+    token_analyzer.FAVORITES_DB_FILE = os.path.join(workdir, "favorites.db")
+    token_analyzer.PRICE_HISTORY_DIR = os.path.join(workdir, "price_history")
+    token_analyzer.SEARCH_INDEX_FILE = os.path.join(workdir, "search_index.db")
+    # The fixture server is local; pacing calls for the real scan APIs would only measure the pacing
+    token_analyzer.SCAN_API_RATE = 10000
+    for data_class in ("pairs", "search"):
+        token_analyzer.CACHE_TTLS[data_class] = 0
+    # Render to a real terminal-sized console, then throw the output away
+    real_console = token_analyzer.console
+    token_analyzer.console = Console(file=open(os.devnull, "w"), force_terminal=True, width=140)
+
+    tokens = args.tokens.split(",") if args.tokens else [f"0x{i:040x}" for i in range(1, args.favorites + 1)]
+    favorites = {address: {"name": f"Token {i}", "last_scan_price": 0.0002, "last_scan_time": "2024-01-01T00:00:00"}
+                 for i, address in enumerate(tokens, 1)}
+    wallet, chain = args.wallet or SYNTHETIC_WALLET, args.chain
+    pair_data = token_analyzer.primary_pair(tokens[0], (token_analyzer.fetch_dexscreener_data(tokens[0]) or {}).get("pairs") or [])
+
+    def wallet_page():
+        token_analyzer.sync_wallet_transfers(wallet, chain)
+        transactions = token_analyzer.query_wallet_transfers(wallet, chain, 0, 30)
+        if not transactions:
+            return False
+        token_analyzer.display_transactions(transactions, chain, wallet, 0)
+        token_analyzer.display_wallet_balance(wallet, chain)
+
+    def pair_info():
+        if not pair_data:
+            return False
+        token_analyzer.display_pair_info(pair_data)
+
+    def meme_search():
+        pairs = token_analyzer.fetch_meme_tokens(args.search_term)
+        if pairs is None:
+            return False
+        token_analyzer.display_meme_tokens(pairs)
+
+    # Seed the index up front so the local case times real matches, not the empty-result path
+    token_analyzer.refresh_search_index(args.search_term)
+
+    def local_search():
+        pairs = token_analyzer.search_index(args.search_term)
+        if not pairs:
+            return False
+        token_analyzer.display_meme_tokens(pairs)
+
+    cases = {
+        f"scan_all_favorites ({len(favorites)} tokens)": lambda: token_analyzer.scan_all_favorites(favorites),
+        "analyze_wallet page (30 rows)": wallet_page,
+        "display_pair_info": pair_info,
+        f"meme search '{args.search_term}'": meme_search,
+        f"local index search '{args.search_term}'": local_search,
+    }
+    results = {}
+    try:
+        for name, func in cases.items():
+            iterations = args.iterations * (10 if name == "display_pair_info" else 1)
+            results[name] = run_case(func, iterations, args.warmup)
+    finally:
+        token_analyzer.console = real_console
+        server.shutdown()
+
+    table = Table(title=f"Hot path benchmarks (fixture latency {args.latency * 1000:.0f} ms, error rate {args.error_rate:.0%})")
+    table.add_column("Benchmark", style="cyan")
+    table.add_column("Runs", justify="right")
+    table.add_column("Failed", justify="right", style="red")
+    table.add_column("Throughput (ops/s)", justify="right", style="green")
+    table.add_column("p50 (ms)", justify="right", style="yellow")
+    table.add_column("p99 (ms)", justify="right", style="magenta")
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        table.add_column("p50 vs baseline", justify="right")
+    regressions = []
+    for name, result in results.items():
+        row = [name, str(result["iterations"]), str(result["failures"]), f"{result['throughput']:,.1f}",
+               f"{result['p50_ms']:.2f}", f"{result['p99_ms']:.2f}"]
+        if args.baseline:
+            previous = baseline.get(name)
+            if previous and previous["p50_ms"]:
+                change = result["p50_ms"] / previous["p50_ms"] - 1
+                if change > args.tolerance:
+                    regressions.append(name)
+                row.append(f"[{'red' if change > args.tolerance else 'green'}]{change:+.0%}[/{'red' if change > args.tolerance else 'green'}]")
+            else:
+                row.append("-")
+        table.add_row(*row)
+    console.print(table)
+    console.print(f"[dim]Fixture server: {server.stats}[/dim]")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        console.print(f"[bold red]p50 regressed more than {args.tolerance:.0%}: {', '.join(regressions)}[/bold red]")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for token_analyzer against a local stub server")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    scan_parser = subparsers.add_parser("scan", help="favorites scan wall-clock time versus watchlist size")
+    scan_parser.add_argument("--sizes", default="10,50,100,300", help="comma-separated watchlist sizes")
+    scan_parser.add_argument("--latency", type=float, default=0.05, help="stub server latency per request in seconds")
+    scan_parser.add_argument("--max-in-flight", type=int, default=token_analyzer.SCAN_MAX_IN_FLIGHT)
+
+    startup_parser = subparsers.add_parser("startup", help="import time and time to first menu")
+    startup_parser.add_argument("--runs", type=int, default=5)
+
+    suite_parser = subparsers.add_parser("suite", help="favorites scan, wallet page, pair rendering and meme search through the fixture server")
+    suite_parser.add_argument("--fixtures", help="replay fixtures recorded with fixtures.py instead of generated ones")
+    suite_parser.add_argument("--latency", type=float, default=0.02, help="injected latency per request in seconds")
+    suite_parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429/503")
+    suite_parser.add_argument("--iterations", type=int, default=20)
+    suite_parser.add_argument("--warmup", type=int, default=2)
+    suite_parser.add_argument("--favorites", type=int, default=100, help="number of generated favorite tokens")
+    suite_parser.add_argument("--tokens", help="comma-separated token addresses (for recorded fixtures)")
+    suite_parser.add_argument("--wallet", help="wallet address (for recorded fixtures)")
+    suite_parser.add_argument("--chain", default="eth", choices=["eth", "bsc"])
+    suite_parser.add_argument("--search-term", default="pepe")
+    suite_parser.add_argument("--json", help="write results to this file")
+    suite_parser.add_argument("--baseline", help="compare against results written earlier with --json")
+    suite_parser.add_argument("--tolerance", type=float, default=0.2, help="p50 slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    if args.benchmark == "scan":
+        sizes = [int(size) for size in args.sizes.split(",")]
+        bench_favorites_scan(sizes, args.latency, args.max_in_flight)
+    elif args.benchmark == "startup":
+        bench_startup(args.runs)
+    elif args.benchmark == "suite":
+        sys.exit(bench_suite(args))
+
+
+if __name__ == "__main__":
+    main()
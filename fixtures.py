@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from rich.console import Console
+
+console = Console()
+
+# Query parameters that never take part in fixture matching and are never written to disk
+SECRET_PARAMS = {"apikey"}
+INJECTED_ERROR_STATUSES = (429, 503)
+
+
+def strip_secrets(url):
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in SECRET_PARAMS)
+    base = f"{parts.scheme}://{parts.netloc}{parts.path}"
+    return f"{base}?{urlencode(query)}" if query else base
+
+
+def parse_json(body):
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+def rpc_ids(payload):
+    if isinstance(payload, list):
+        return [item.get("id") for item in payload if isinstance(item, dict)]
+    if isinstance(payload, dict) and "jsonrpc" in payload:
+        return [payload.get("id")]
+    return []
+
+
+def normalize_body(body):
+    # JSON-RPC ids change from run to run, so they are left out of the match
+    payload = parse_json(body)
+    if payload is None:
+        return body.decode("utf-8", "replace") if isinstance(body, bytes) else (body or "")
+    if isinstance(payload, list):
+        payload = [{k: v for k, v in item.items() if k != "id"} if isinstance(item, dict) else item for item in payload]
+    elif isinstance(payload, dict) and "jsonrpc" in payload:
+        payload = {k: v for k, v in payload.items() if k != "id"}
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+
+def restore_rpc_ids(text, recorded_ids, request_ids):
+    # Replies carry the ids of the recorded request; map them onto the ids of this one
+    if not recorded_ids or not request_ids:
+        return text
+    payload = parse_json(text)
+    if payload is None:
+        return text
+    id_map = dict(zip(map(json.dumps, recorded_ids), request_ids))
+    replies = payload if isinstance(payload, list) else [payload]
+    for reply in replies:
+        if isinstance(reply, dict) and json.dumps(reply.get("id")) in id_map:
+            reply["id"] = id_map[json.dumps(reply.get("id"))]
+    return json.dumps(payload)
+
+
+def upstream_from_path(path):
+    # /https/api.dexscreener.com/latest/dex/... -> https://api.dexscreener.com/latest/dex/...
+    scheme, _, rest = path.lstrip("/").partition("/")
+    return f"{scheme}://{rest}"
+
+
+class FixtureStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def key(self, method, url, body):
+        material = f"{method} {strip_secrets(url)} {normalize_body(body)}"
+        return hashlib.sha1(material.encode()).hexdigest()[:20]
+
+    def path(self, method, url, body):
+        host = urlsplit(url).netloc.replace(":", "_")
+        return os.path.join(self.directory, host, f"{self.key(method, url, body)}.json")
+
+    def save(self, method, url, body, status, content_type, text):
+        path = self.path(method, url, body)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fixture = {
+            "request": {
+                "method": method,
+                "url": strip_secrets(url),
+                "body": normalize_body(body) or None,
+                "rpc_ids": rpc_ids(parse_json(body)),
+            },
+            "response": {"status": status, "content_type": content_type, "body": text},
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(fixture, f, indent=1)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._loaded[path] = fixture
+        return fixture
+
+    def load(self, method, url, body):
+        path = self.path(method, url, body)
+        with self._lock:
+            if path in self._loaded:
+                return self._loaded[path]
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            fixture = json.load(f)
+        with self._lock:
+            self._loaded[path] = fixture
+        return fixture
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.serve("GET")
+
+    def do_POST(self):
+        self.serve("POST")
+
+    def serve(self, method):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        upstream = upstream_from_path(self.path)
+
+        if server.latency:
+            time.sleep(max(0.0, random.gauss(server.latency, server.latency * server.jitter)))
+        if server.error_rate and random.random() < server.error_rate:
+            server.count("injected_errors")
+            self.respond(random.choice(INJECTED_ERROR_STATUSES), json.dumps({"error": "injected by fixture server"}))
+            return
+
+        fixture = server.store.load(method, upstream, body)
+        if fixture is None and server.mode == "record":
+            fixture = self.record(method, upstream, body)
+        if fixture is None and server.fallback:
+            # Generated responses are saved like recorded ones, so later runs replay them unchanged
+            generated = server.fallback(method, upstream, body)
+            if generated is not None:
+                server.count("generated")
+                fixture = server.store.save(method, upstream, body, *generated)
+        if fixture is None:
+            server.count("misses")
+            self.respond(404, json.dumps({"error": f"no fixture for {method} {strip_secrets(upstream)}"}))
+            return
+
+        server.count("hits")
+        response = fixture["response"]
+        text = restore_rpc_ids(response["body"], fixture["request"].get("rpc_ids"), rpc_ids(parse_json(body)))
+        self.respond(response["status"], text, response.get("content_type") or "application/json")
+
+    def record(self, method, upstream, body):
+        headers = {"Content-Type": self.headers.get("Content-Type", "application/json")}
+        try:
+            reply = requests.request(method, upstream, data=body or None, headers=headers, timeout=30)
+        except requests.RequestException as e:
+            console.print(f"[bold red]Upstream request failed: {e}[/bold red]")
+            return None
+        self.server.count("recorded")
+        return self.server.store.save(method, upstream, body, reply.status_code, reply.headers.get("Content-Type"), reply.text)
+
+    def respond(self, status, text, content_type="application/json"):
+        payload = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, directory, mode="replay", latency=0.0, jitter=0.2, error_rate=0.0, port=0, fallback=None):
+        super().__init__(("127.0.0.1", port), FixtureHandler)
+        self.store = FixtureStore(directory)
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # fallback(method, url, body) -> (status, content_type, text) or None, for fixtures that were never recorded
+        self.fallback = fallback
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0, "generated": 0, "injected_errors": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Record real API responses to fixture files, or replay them from a local server. "
+                    "Point token_analyzer at it with TOKEN_ANALYZER_FIXTURE_SERVER=http://127.0.0.1:PORT"
+    )
+    parser.add_argument("mode", choices=["record", "replay"], help="record forwards misses upstream and saves them")
+    parser.add_argument("--dir", default="fixtures", help="fixture directory")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="injected latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency standard deviation as a fraction of --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429/503")
+    args = parser.parse_args()
+
+    server = FixtureServer(args.dir, args.mode, args.latency, args.jitter, args.error_rate, args.port)
+    console.print(f"[bold green]{args.mode.capitalize()}ing fixtures in {args.dir} on {server.url}[/bold green] (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    console.print(f"[dim]{server.stats}[/dim]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+import token_analyzer as ta
+
+WALLET = "0x" + "a" * 40
+ALICE = "0x" + "b" * 40
+BOB = "0x" + "c" * 40
+USDC = "0x" + "1" * 40
+WETH = "0x" + "2" * 40
+
+
+def test_limb_sums_match_big_int_sums():
+    rng = random.Random(7)
+    values = [rng.randrange(10 ** rng.randrange(1, 79)) for _ in range(2000)] + [2 ** 256 - 1, 0, 10 ** 12, 10 ** 12 - 1]
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE transfers (grp INTEGER, value TEXT)")
+    db.executemany("INSERT INTO transfers VALUES (?, ?)", [(i % 5, str(value)) for i, value in enumerate(values)])
+    for grp, *limbs in db.execute(f"SELECT grp, {ta.value_limb_sums_sql()} FROM transfers GROUP BY grp"):
+        assert ta.combine_limbs(limbs) == sum(value for i, value in enumerate(values) if i % 5 == grp)
+
+
+def test_combine_limbs_treats_missing_limbs_as_zero():
+    assert ta.combine_limbs([5, None, 1]) == 5 + 10 ** (2 * ta.VALUE_LIMB_DIGITS)
+
+
+@pytest.fixture
+def wallet_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(ta, "WALLET_INDEX_FILE", str(tmp_path / "wallet_index.db"))
+    monkeypatch.setattr(ta, "_wallet_index_db", None)
+    db = ta.get_wallet_index_db()
+    yield db
+    db.close()
+
+
+def transfer(n, contract, sender, receiver, value, symbol="TOK"):
+    return {
+        'hash': f"0x{n:064x}", 'logIndex': str(n), 'blockNumber': str(100 + n), 'timeStamp': str(1_700_000_000 + n),
+        'contractAddress': contract, 'from': sender, 'to': receiver, 'value': str(value),
+        'tokenName': symbol.title(), 'tokenSymbol': symbol, 'tokenDecimal': "18",
+    }
+
+
+def test_portfolio_nets_each_token_and_totals_counterparty_flows(wallet_index):
+    ta.store_transfers(wallet_index, "eth", [
+        transfer(1, USDC, ALICE, WALLET, 500, "USDC"),
+        transfer(2, USDC, ALICE, WALLET, 250, "USDC"),
+        transfer(3, USDC, WALLET, BOB, 100, "USDC"),
+        transfer(4, USDC, WALLET, ALICE, 50, "USDC"),
+        transfer(5, WETH, BOB, WALLET, 7, "WETH"),
+        transfer(6, WETH, WALLET, BOB, 9, "WETH"),
+        transfer(7, WETH, ALICE, BOB, 1000, "WETH"),
+    ])
+    portfolio = ta.build_portfolio(WALLET.upper(), "eth")
+    usdc, weth = portfolio['tokens'][USDC], portfolio['tokens'][WETH]
+    assert (usdc['received'], usdc['sent'], usdc['net'], usdc['transfers']) == (750, 150, 600, 4)
+    assert (weth['received'], weth['sent'], weth['net'], weth['transfers']) == (7, 9, -2, 2)
+    flows = {(flow['contract'], flow['counterparty'], flow['direction']): (flow['raw'], flow['transfers']) for flow in portfolio['flows']}
+    assert flows == {
+        (USDC, ALICE, "in"): (750, 2),
+        (USDC, BOB, "out"): (100, 1),
+        (USDC, ALICE, "out"): (50, 1),
+        (WETH, BOB, "in"): (7, 1),
+        (WETH, BOB, "out"): (9, 1),
+    }
+
+
+def test_portfolio_counts_self_transfers_once_without_moving_balance(wallet_index):
+    ta.store_transfers(wallet_index, "eth", [
+        transfer(1, USDC, ALICE, WALLET, 40, "USDC"),
+        transfer(2, USDC, WALLET, WALLET, 25, "USDC"),
+    ])
+    portfolio = ta.build_portfolio(WALLET, "eth")
+    usdc = portfolio['tokens'][USDC]
+    assert (usdc['received'], usdc['sent'], usdc['net'], usdc['transfers']) == (40, 0, 40, 2)
+    assert all(flow['counterparty'] != WALLET for flow in portfolio['flows'])
+
+
+def test_portfolio_keeps_values_beyond_64_bits_exact(wallet_index):
+    huge = [2 ** 255 + 12345, 2 ** 200 - 1, 10 ** 30 + 7]
+    ta.store_transfers(wallet_index, "eth", [transfer(n, WETH, ALICE, WALLET, value, "WETH") for n, value in enumerate(huge)])
+    ta.store_transfers(wallet_index, "eth", [transfer(9, WETH, WALLET, BOB, 2 ** 70 + 1, "WETH")])
+    weth = ta.build_portfolio(WALLET, "eth")['tokens'][WETH]
+    assert weth['received'] == sum(huge)
+    assert weth['sent'] == 2 ** 70 + 1
+    assert weth['net'] == sum(huge) - 2 ** 70 - 1
+
+
+def test_token_bucket_spaces_reservations_at_its_rate():
+    bucket = ta.TokenBucket(4.0)
+    now = bucket.updated_at
+    waits = [bucket.reserve(now) for _ in range(4)]
+    assert waits == pytest.approx([0.0, 0.25, 0.5, 0.75])
+    assert bucket.wait_time(now + 1.25) == pytest.approx(0.0)
+
+
+def test_token_bucket_backs_off_and_recovers():
+    bucket = ta.TokenBucket(5.0)
+    for _ in range(5):
+        bucket.slow_down()
+    assert bucket.rate == pytest.approx(1.0)
+    assert bucket.tokens <= 0.0
+    for _ in range(20):
+        bucket.speed_up()
+    assert bucket.rate == pytest.approx(5.0)
+
+
+def test_latency_histogram_quantiles_stay_within_the_sample_bucket():
+    rng = random.Random(3)
+    samples = [rng.lognormvariate(-3, 1.5) for _ in range(5000)]
+    histogram = ta.LatencyHistogram()
+    for sample in samples:
+        histogram.observe(sample)
+    bounds = (0.0, *ta.METRICS_LATENCY_BUCKETS, max(samples))
+    for q in (0.5, 0.9, 0.99):
+        exact = sorted(samples)[int(q * len(samples)) - 1]
+        i = np.searchsorted(bounds, exact)
+        assert bounds[max(i - 1, 0)] <= histogram.quantile(q) <= bounds[i]
+    assert histogram.quantile(1.0) <= histogram.max
+    assert ta.LatencyHistogram().quantile(0.5) == 0.0
+
+
+def test_gas_oracle_ring_buffer_keeps_the_newest_blocks_in_order():
+    oracle = ta.GasOracle(capacity=8)
+    appended = []
+    for start, count in ((0, 3), (3, 4), (7, 12), (19, 1)):
+        blocks = np.arange(start, start + count, dtype=float)
+        oracle.append(blocks, blocks / 100, np.column_stack([blocks] * len(oracle.percentiles)))
+        appended.extend(blocks)
+        base_fees, ratios, rewards = oracle.window()
+        assert list(base_fees) == appended[-8:]
+        assert list(ratios) == [block / 100 for block in appended[-8:]]
+        assert list(rewards[:, 0]) == appended[-8:]
+    assert list(oracle.window(3)[0]) == appended[-3:]
+
+
+def test_diff_market_snapshots_aligns_on_id_not_position():
+    previous = ta.market_columns([
+        {'id': 'bitcoin', 'symbol': 'BTC', 'rank': '1', 'priceUsd': '100'},
+        {'id': 'ethereum', 'symbol': 'ETH', 'rank': '2', 'priceUsd': '10'},
+        {'id': 'gone', 'symbol': 'GONE', 'rank': '3', 'priceUsd': '1'},
+    ], taken_at=1000)
+    current = ta.market_columns([
+        {'id': 'ethereum', 'symbol': 'ETH', 'rank': '1', 'priceUsd': '20'},
+        {'id': 'bitcoin', 'symbol': 'BTC', 'rank': '2', 'priceUsd': '50'},
+        {'id': 'newcoin', 'symbol': 'BTC', 'rank': '3', 'priceUsd': '5'},
+    ])
+    diff = ta.diff_market_snapshots(current, previous)
+    assert list(diff['previous_price'][:2]) == [10.0, 100.0]
+    assert list(diff['change'][:2]) == pytest.approx([100.0, -50.0])
+    assert np.isnan(diff['change'][2])
+    assert list(diff['rank_change']) == [1, -1, 0]
+    assert list(diff['is_new']) == [False, False, True]
+    assert diff['previous_taken_at'] == 1000.0
+
+
+def test_diff_market_snapshots_without_a_previous_snapshot():
+    current = ta.market_columns([{'id': 'bitcoin', 'rank': '1', 'priceUsd': '100'}])
+    diff = ta.diff_market_snapshots(current, None)
+    assert diff['is_new'].all()
+    assert diff['previous_taken_at'] is None
+
+
+def test_holder_distribution_streams_close_to_the_exact_figures():
+    rng = random.Random(11)
+    quantities = [int(rng.paretovariate(1.2) * 10 ** 18) for _ in range(20000)] + [0, -5]
+    distribution = ta.HolderDistribution()
+    for start in range(0, len(quantities), 1000):
+        distribution.add((f"0x{i:040x}", quantity) for i, quantity in enumerate(quantities[start:start + 1000], start))
+    summary = distribution.summary()
+    held = np.sort(np.array([quantity for quantity in quantities if quantity > 0], dtype=float))[::-1]
+    n, supply = len(held), held.sum()
+    exact_gini = 2 * ((n + 1) * supply - np.arange(1, n + 1) @ held) / (n * supply) - (n + 1) / n
+    assert summary['holders'] == n
+    assert summary['total_quantity'] == str(sum(quantity for quantity in quantities if quantity > 0))
+    assert summary['hhi'] == pytest.approx(float((held / supply) @ (held / supply) * 10000))
+    assert summary['top_share_pct']['10'] == pytest.approx(held[:10].sum() / supply * 100)
+    assert summary['gini'] == pytest.approx(exact_gini, abs=1e-3)
+    assert summary['holders_to_50pct'] == pytest.approx(int(np.searchsorted(np.cumsum(held) / supply, 0.5) + 1), rel=0.01)
+    assert ta.HolderDistribution().summary() is None
@@ -1,9 +1,29 @@
 import requests
+import argparse
 import json
+import csv
 import os
 import sys
 import time
-import pyperclip
+import threading
+import heapq
+import math
+import itertools
+import contextlib
+import sqlite3
+import functools
+import hashlib
+import random
+import re
+import mmap
+import struct
+import bisect
+import io
+from concurrent.futures import Future
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from decimal import Decimal, localcontext
 from rich import print
 from rich.console import Console
 from rich.panel import Panel
@@ -12,31 +32,117 @@ from rich.prompt import Prompt
 from rich.progress import Progress
 from datetime import datetime, timedelta
 from collections import defaultdict
-from web3 import Web3
-from solana.rpc.async_api import AsyncClient
-import asyncio
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+
+# web3, eth_abi and pyperclip are imported where they are used; web3 alone takes
+# over a second to import and most menu actions never touch it
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+ABI_FILES = {
+    "ERC20_ABI": "erc20_abi.json",
+    "ROUTER_ABI": "router_abi.json",
+}
+
+@functools.lru_cache(maxsize=None)
+def load_abi(filename):
+    with open(os.path.join(MODULE_DIR, filename)) as f:
+        return json.load(f)
+
+def __getattr__(name):
+    # ABIs are read on first access instead of at import time
+    if name in ABI_FILES:
+        return load_abi(ABI_FILES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Load ABIs
-with open('erc20_abi.json') as f:
-    ERC20_ABI = json.load(f)
-with open('router_abi.json') as f:
-    ROUTER_ABI = json.load(f)
-    
 console = Console()
 ETH_PROVIDER = "https://mainnet.infura.io/v3/YOUR_INFURA_PROJECT_ID"
 BSC_PROVIDER = "https://bsc-dataseed.binance.org/"
+POLYGON_PROVIDER = "https://polygon-rpc.com/"
 UNISWAP_ROUTER = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
 PANCAKESWAP_ROUTER = "0x10ED43C718714eb63d5aA57B78B54704E256024E"
 ETHERSCAN_API = "https://api.etherscan.io/api"
 BSCSCAN_API = "https://api.bscscan.com/api"
+POLYGONSCAN_API = "https://api.polygonscan.com/api"
 SOLSCAN_API = "https://public-api.solscan.io/account/transactions"
 ETHERSCAN_KEY = "YOUR_ETHERSCAN_API_KEY"
 BSCSCAN_KEY = "YOUR_BSC_API_KEY"
 POLYGON_KEY = "YOUR_POLYGON_API_KEY"
+# Add extra keys per chain to spread bulk jobs across them
+SCAN_API_KEYS = {
+    "eth": [ETHERSCAN_KEY],
+    "bsc": [BSCSCAN_KEY],
+    "polygon": [POLYGON_KEY],
+}
+SCAN_API_RATE = 4.5  # requests per second per key, just under the free tier limit of 5
+SCAN_API_MAX_RETRIES = 5
+SCAN_API_BACKOFF = 0.5  # seconds; doubled on every rate-limited retry
 COINGECKO_API = "https://api.coingecko.com/api/v3/simple/price"
+DEXSCREENER_API = "https://api.dexscreener.com/latest/dex"
+COINCAP_API = "https://api.coincap.io/v2"
+DEXSCREENER_BATCH_SIZE = 30  # DexScreener accepts up to 30 comma-separated addresses
+DEXSCREENER_PAIR_CAP = 30  # and returns at most this many pairs per /tokens response, however many addresses were asked for
+DEXSCREENER_CHAIN_IDS = {"eth": "ethereum", "bsc": "bsc", "polygon": "polygon"}
+NATIVE_SYMBOLS = {"eth": "ETH", "bsc": "BNB", "polygon": "MATIC"}
+EXPLORER_TX_URLS = {"eth": "https://etherscan.io/tx/", "bsc": "https://bscscan.com/tx/", "polygon": "https://polygonscan.com/tx/"}
+WALLET_CHAINS = ["eth", "bsc", "polygon"]  # chains covered by the multi-chain wallet view
+WALLET_CHAIN_TIMEOUT = 30  # seconds a chain may take to sync before the merged view goes ahead without it
+BALANCE_BATCH_SIZE = 20  # the scan APIs accept up to 20 addresses per balancemulti call
+# A pair whose price is this far from the liquidity-weighted price, or with less liquidity, is flagged
+PAIR_OUTLIER_DEVIATION = 0.1
+PAIR_MIN_LIQUIDITY_USD = 1000
+HOLDER_PAGE_SIZE = 10000
+HOLDER_TOP_KEEP = 100
+# Log-spaced balance buckets per doubling for the streamed Gini; 16 keeps each bucket under 7% wide
+HOLDER_BUCKETS_PER_OCTAVE = 16
+HOLDER_TOP_N = (10, 50, 100)
+SCAN_MAX_IN_FLIGHT = 4
+PRICE_TICKER_INTERVAL = 30
+# Watch mode polls moving tokens every WATCH_MIN_INTERVAL seconds and backs quiet ones off to WATCH_MAX_INTERVAL
+WATCH_MIN_INTERVAL = 10
+WATCH_MAX_INTERVAL = 300
+WATCH_MOVE_THRESHOLD = 0.5
+WATCH_FPS = 4
+WATCH_MAX_ROWS = 30
 ETHEREUM_GAS_LIMIT = 21000
+GAS_ORACLE_BLOCKS = 200  # ring buffer size; node providers serve at most 1024 blocks per eth_feeHistory call
+GAS_ORACLE_TIER_BLOCKS = 20  # recent blocks whose priority fees set the tier prices
+# Tier, eth_feeHistory reward percentile, Etherscan gasoracle field, estimated inclusion time
+GAS_TIERS = [
+    ("Low", 10, "SafeGasPrice", "< 15 minutes"),
+    ("Standard", 50, "ProposeGasPrice", "< 5 minutes"),
+    ("Fast", 90, "FastGasPrice", "< 1 minute"),
+]
 FAVORITES_FILE = "favorite_tokens.json"
 WALLET_FAVORITES_FILE = "favorite_wallets.json"
+FAVORITES_DB_FILE = "favorites.db"
+PRICE_HISTORY_DIR = "price_history"
+# (tier, bucket seconds, retention seconds): raw scans roll up into 5 minute, then hourly samples
+PRICE_HISTORY_TIERS = [
+    ("raw", 0, 2 * 86400),
+    ("5m", 300, 30 * 86400),
+    ("1h", 3600, None),
+]
+PRICE_HISTORY_WINDOWS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400}
+MARKET_SNAPSHOT_DIR = "market_snapshots"
+MARKET_SNAPSHOT_KEEP = 200
+MARKET_PAGE_SIZE = 250  # assets per CoinCap request; pages are fetched concurrently
+MARKET_SCAN_MAX = 2000
+MARKET_TABLE_ROWS = 50  # rows per rendered page of a large scan
+MARKET_MOVERS = 10
+LAST_SCANNED_PRICES_FILE = "last_scanned_prices.json"
+WALLET_INDEX_FILE = "wallet_index.db"
+SEARCH_INDEX_FILE = "search_index.db"
+SEARCH_RESULT_LIMIT = 10
+SEARCH_MIN_SUBSTRING = 3  # shorter queries match name and symbol prefixes only
+SEARCH_SCAN_THRESHOLD = 2000  # above this many matches, scan tokens by liquidity instead of sorting the matches
+TRANSFER_SYNC_PAGE_SIZE = 1000
+SCAN_API_MAX_RESULTS = 10000  # the scan APIs refuse page * offset beyond this
+RESPONSE_CACHE_FILE = "response_cache.db"
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TOKEN_INFO_NEGATIVE_TTL = 24 * 60 * 60  # re-check contracts that did not answer as ERC-20 once a day
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"  # same address on every supported chain
+MULTICALL_MAX_TOKENS = 300
+TX_DETAIL_CACHE_SIZE = 2000
+SIGNATURE_DB_FILE = "signatures.bin"
 
 # Gas limit estimates for different transaction types
 GAS_LIMITS = {
@@ -46,6 +152,610 @@ GAS_LIMITS = {
     "Borrowing": 302000
 }
 
+# Seconds a cached response stays fresh per data class; None means it never expires
+CACHE_TTLS = {
+    "price": 15,
+    "gas": 15,
+    "pairs": 30,
+    "search": 60,
+    "market": 60,
+    "holders": 10 * 60,
+    "token_metadata": None,
+}
+# When set, cached entries up to this many seconds old are served regardless of TTL
+CACHE_MAX_STALENESS = None
+
+# HTTP client settings: (connect, read) timeouts per endpoint and pooled connections per host
+HTTP_POOL_MAXSIZE = 8
+HTTP_TIMEOUTS = {
+    "default": (3.05, 15),
+    "dexscreener": (3.05, 10),
+    "coingecko": (3.05, 5),
+    "coincap": (3.05, 10),
+    "etherscan": (3.05, 20),
+    "ethplorer": (3.05, 15),
+    "rpc": (3.05, 20),
+}
+# Send every outbound request to a fixture server instead (see fixtures.py) for offline record/replay runs
+FIXTURE_SERVER_URL = os.environ.get("TOKEN_ANALYZER_FIXTURE_SERVER")
+# Upper bounds (seconds) of the latency histogram buckets, as exported to Prometheus
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STATS_REPORT = False
+PROFILE_DIR = "profiles"
+PROFILE_TOP_N = 25
+PROFILE_CPU = False
+PROFILE_MEMORY = False
+PROFILE_ACTIONS = None  # menu choices to profile; None profiles every action
+
+_thread_state = threading.local()
+_http_sessions = {}
+_http_request_counts = defaultdict(int)
+_http_lock = threading.Lock()
+
+def report_fetch_error(message):
+    # Background refreshers run quietly so they never print over the menu
+    if not getattr(_thread_state, 'quiet', False):
+        console.print(f"[bold red]{message}[/bold red]")
+
+def get_http_session(url):
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    with _http_lock:
+        session = _http_sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            # pool_block caps concurrent connections per host instead of opening throwaway ones
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE, pool_block=True)
+            session.mount(host, adapter)
+            _http_sessions[host] = session
+        _http_request_counts[host] += 1
+    return session
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets = [0] * (len(METRICS_LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(METRICS_LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        
+    def quantile(self, q):
+        # Interpolates inside the bucket holding the q-th sample, like Prometheus' histogram_quantile
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.buckets):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = METRICS_LATENCY_BUCKETS[i - 1] if i else 0.0
+                upper = METRICS_LATENCY_BUCKETS[i] if i < len(METRICS_LATENCY_BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+_metrics_lock = threading.Lock()
+_metrics_started_at = time.time()
+_request_metrics = defaultdict(lambda: {'requests': 0, 'errors': 0, 'retries': 0, 'bytes': 0, 'latency': LatencyHistogram()})
+_stage_metrics = defaultdict(lambda: {'network_time': 0.0, 'latency': LatencyHistogram()})
+_cache_metrics = defaultdict(lambda: {'hit': 0, 'miss': 0, 'coalesced': 0})
+
+def record_request(endpoint, seconds, size, error=False):
+    with _metrics_lock:
+        metrics = _request_metrics[endpoint]
+        metrics['requests'] += 1
+        metrics['bytes'] += size
+        metrics['errors'] += bool(error)
+        metrics['latency'].observe(seconds)
+    # Lets a display stage on this thread split its time into network and everything else
+    _thread_state.network_time = getattr(_thread_state, 'network_time', 0.0) + seconds
+
+def record_retry(endpoint):
+    with _metrics_lock:
+        _request_metrics[endpoint]['retries'] += 1
+
+def record_cache_lookup(data_class, result):
+    with _metrics_lock:
+        _cache_metrics[data_class][result] += 1
+
+def record_stage(stage, seconds, network_time):
+    with _metrics_lock:
+        metrics = _stage_metrics[stage]
+        metrics['network_time'] += network_time
+        metrics['latency'].observe(seconds)
+
+def timed_stage(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        network_before = getattr(_thread_state, 'network_time', 0.0)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            network_time = getattr(_thread_state, 'network_time', 0.0) - network_before
+            record_stage(func.__name__, time.perf_counter() - started, network_time)
+    return wrapper
+
+def route_url(url):
+    if not FIXTURE_SERVER_URL:
+        return url
+    # The fixture server reads the real upstream back out of the path: /<scheme>/<host>/<path>
+    parts = urlsplit(url)
+    routed = f"{FIXTURE_SERVER_URL.rstrip('/')}/{parts.scheme}/{parts.netloc}{parts.path}"
+    return f"{routed}?{parts.query}" if parts.query else routed
+
+def http_request(method, url, endpoint, **kwargs):
+    timeout = HTTP_TIMEOUTS.get(endpoint, HTTP_TIMEOUTS["default"])
+    url = route_url(url)
+    started = time.perf_counter()
+    try:
+        response = get_http_session(url).request(method, url, timeout=timeout, **kwargs)
+    except requests.RequestException:
+        record_request(endpoint, time.perf_counter() - started, 0, error=True)
+        raise
+    record_request(endpoint, time.perf_counter() - started, len(response.content), error=response.status_code >= 400)
+    return response
+
+def http_get(url, params=None, endpoint="default"):
+    return http_request("GET", url, endpoint, params=params)
+
+def http_post(url, json_body, endpoint="default"):
+    return http_request("POST", url, endpoint, json=json_body)
+
+def get_http_stats():
+    stats = {}
+    with _http_lock:
+        for host, session in _http_sessions.items():
+            pools = session.get_adapter(host).poolmanager.pools
+            connections = sum(pools[key].num_connections for key in pools.keys())
+            request_count = _http_request_counts[host]
+            stats[host] = {
+                'requests': request_count,
+                'connections': connections,
+                'reused': max(request_count - connections, 0),
+            }
+    return stats
+
+def display_http_stats():
+    stats = get_http_stats()
+    if not stats:
+        return
+    
+    table = Table(title="HTTP Connection Reuse")
+    table.add_column("Host", style="cyan")
+    table.add_column("Requests", justify="right")
+    table.add_column("New Connections", justify="right", style="yellow")
+    table.add_column("Reused", justify="right", style="green")
+    
+    for host, host_stats in stats.items():
+        reuse_rate = host_stats['reused'] / host_stats['requests'] * 100 if host_stats['requests'] else 0
+        table.add_row(host, str(host_stats['requests']), str(host_stats['connections']), f"{host_stats['reused']} ({reuse_rate:.0f}%)")
+    console.print(table)
+
+_response_cache_db = None
+_response_cache_lock = threading.Lock()
+_response_cache_size = None  # running total of stored bytes, summed from the table once per process
+_inflight_fetches = {}
+_inflight_lock = threading.Lock()
+
+def get_response_cache_db():
+    global _response_cache_db
+    if _response_cache_db is None:
+        _response_cache_db = sqlite3.connect(RESPONSE_CACHE_FILE, check_same_thread=False)
+        _response_cache_db.execute("PRAGMA journal_mode=WAL")
+        _response_cache_db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        _response_cache_db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        _response_cache_db.commit()
+    return _response_cache_db
+
+def make_cache_key(data_class, key):
+    return f"{data_class}:{json.dumps(key, sort_keys=True, default=str)}"
+
+def response_cache_get(data_class, key, max_age=None):
+    cache_key = make_cache_key(data_class, key)
+    now = time.time()
+    with _response_cache_lock:
+        db = get_response_cache_db()
+        row = db.execute("SELECT value, fetched_at FROM responses WHERE key = ?", (cache_key,)).fetchone()
+        if row is None or (max_age is not None and now - row[1] > max_age):
+            return None
+        db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, cache_key))
+        db.commit()
+    return json.loads(row[0])
+
+def response_cache_put(data_class, key, value):
+    global _response_cache_size
+    cache_key = make_cache_key(data_class, key)
+    serialized = json.dumps(value)
+    now = time.time()
+    with _response_cache_lock:
+        db = get_response_cache_db()
+        if _response_cache_size is None:
+            _response_cache_size = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        replaced = db.execute("SELECT size FROM responses WHERE key = ?", (cache_key,)).fetchone()
+        db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (cache_key, serialized, len(serialized), now, now)
+        )
+        _response_cache_size += len(serialized) - (replaced[0] if replaced else 0)
+        if _response_cache_size > RESPONSE_CACHE_MAX_BYTES:
+            # Other processes may share the file, so settle the exact total before evicting
+            _response_cache_size = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        # Evict least recently used entries until the cache fits under its size cap
+        if _response_cache_size > RESPONSE_CACHE_MAX_BYTES:
+            excess = _response_cache_size - RESPONSE_CACHE_MAX_BYTES
+            evicted = 0
+            for evict_key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+                if evicted >= excess:
+                    break
+                db.execute("DELETE FROM responses WHERE key = ?", (evict_key,))
+                evicted += size
+            _response_cache_size -= evicted
+        db.commit()
+
+def cache_max_age(data_class, ttl=None, max_staleness=None):
+    max_age = ttl if ttl is not None else CACHE_TTLS.get(data_class)
+    max_staleness = max_staleness if max_staleness is not None else CACHE_MAX_STALENESS
+    if max_age is not None and max_staleness is not None:
+        max_age = max(max_age, max_staleness)
+    return max_age
+
+def cached_fetch(data_class, key, fetch, ttl=None, max_staleness=None, refresh=False):
+    # refresh=True skips the lookup but still stores the fresh response
+    cached = None if refresh else response_cache_get(data_class, key, cache_max_age(data_class, ttl, max_staleness))
+    if cached is not None:
+        record_cache_lookup(data_class, 'hit')
+        return cached
+    
+    # Collapse concurrent identical requests: the first caller fetches, the rest wait for its result
+    cache_key = make_cache_key(data_class, key)
+    with _inflight_lock:
+        future = _inflight_fetches.get(cache_key)
+        is_leader = future is None
+        if is_leader:
+            future = _inflight_fetches[cache_key] = Future()
+    if not is_leader:
+        record_cache_lookup(data_class, 'coalesced')
+        return future.result()
+    
+    record_cache_lookup(data_class, 'miss')
+    try:
+        value = fetch()
+        if value is not None:
+            response_cache_put(data_class, key, value)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_fetches.pop(cache_key, None)
+
+def response_cached(data_class):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, ttl=None, max_staleness=None, refresh=False):
+            key = [func.__name__] + [arg.lower() if isinstance(arg, str) else arg for arg in args]
+            return cached_fetch(data_class, key, lambda: func(*args), ttl=ttl, max_staleness=max_staleness, refresh=refresh)
+        return wrapper
+    return decorator
+
+def scan_api_url(chain):
+    return {"eth": ETHERSCAN_API, "bsc": BSCSCAN_API, "polygon": POLYGONSCAN_API}.get(chain)
+
+def is_rate_limited(data):
+    result = data.get('result')
+    return isinstance(result, str) and 'rate limit' in result.lower()
+
+class TokenBucket:
+    def __init__(self, rate):
+        self.base_rate = rate
+        self.rate = rate
+        # No burst allowance: the scan APIs count calls over a sliding second
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+        
+    def refill(self, now):
+        self.tokens = min(1.0, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        
+    def wait_time(self, now):
+        self.refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+    
+    def reserve(self, now):
+        # Tokens may go negative: each caller reserves its slot and sleeps until it arrives
+        wait = self.wait_time(now)
+        self.tokens -= 1
+        return wait
+    
+    def slow_down(self):
+        self.rate = max(self.base_rate * 0.2, self.rate * 0.5)
+        self.tokens = min(self.tokens, 0.0)
+        
+    def speed_up(self):
+        self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+class ScanApiScheduler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self.stats = {
+            'requests': 0,
+            'rate_limited': 0,
+            'retries': 0,
+            'throttle_time': 0.0,
+            'queue_depth': 0,
+            'max_queue_depth': 0,
+        }
+        
+    def acquire(self, chain):
+        keys = SCAN_API_KEYS.get(chain) or [""]
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                if key not in self._buckets:
+                    self._buckets[key] = TokenBucket(SCAN_API_RATE)
+            # Spread load by always taking the key whose next slot comes soonest
+            key = min(keys, key=lambda k: self._buckets[k].wait_time(now))
+            wait = self._buckets[key].reserve(now)
+            self.stats['requests'] += 1
+            if wait > 0:
+                self.stats['queue_depth'] += 1
+                self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.stats['queue_depth'])
+        if wait > 0:
+            time.sleep(wait)
+            with self._lock:
+                self.stats['queue_depth'] -= 1
+                self.stats['throttle_time'] += wait
+        return key
+    
+    def request(self, chain, params, endpoint="etherscan"):
+        api_url = scan_api_url(chain)
+        for attempt in range(SCAN_API_MAX_RETRIES + 1):
+            key = self.acquire(chain)
+            response = http_get(api_url, params={**params, 'apikey': key}, endpoint=endpoint)
+            rate_limited = response.status_code == 429
+            if not rate_limited:
+                response.raise_for_status()
+                data = response.json()
+                rate_limited = is_rate_limited(data)
+            
+            with self._lock:
+                bucket = self._buckets[key]
+                if rate_limited:
+                    bucket.slow_down()
+                    self.stats['rate_limited'] += 1
+                else:
+                    bucket.speed_up()
+            if not rate_limited:
+                return data
+            if attempt < SCAN_API_MAX_RETRIES:
+                with self._lock:
+                    self.stats['retries'] += 1
+                record_retry(endpoint)
+                # Full jitter keeps parallel workers from retrying in lockstep
+                time.sleep(random.uniform(0, SCAN_API_BACKOFF * 2 ** attempt))
+        return {'status': '0', 'message': 'NOTOK', 'result': 'Max rate limit reached'}
+
+scan_api = ScanApiScheduler()
+
+def scan_api_get(chain, params, endpoint="etherscan"):
+    return scan_api.request(chain, params, endpoint)
+
+def display_scan_api_stats():
+    stats = dict(scan_api.stats)
+    if not stats['requests']:
+        return
+    console.print(
+        f"[dim]Scan API: {stats['requests']} requests, {stats['rate_limited']} rate-limited, "
+        f"{stats['retries']} retries, {stats['throttle_time']:.1f}s throttled, "
+        f"max queue depth {stats['max_queue_depth']}[/dim]"
+    )
+
+def metrics_snapshot():
+    with _metrics_lock:
+        requests_by_endpoint = {endpoint: dict(metrics) for endpoint, metrics in _request_metrics.items()}
+        stages = {stage: dict(metrics) for stage, metrics in _stage_metrics.items()}
+        cache = {data_class: dict(counts) for data_class, counts in _cache_metrics.items()}
+    return requests_by_endpoint, stages, cache
+
+def format_bytes(size):
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+def display_metrics_report():
+    requests_by_endpoint, stages, cache = metrics_snapshot()
+    console.print(f"\n[bold cyan]Run statistics ({time.time() - _metrics_started_at:.1f}s):[/bold cyan]")
+    
+    if requests_by_endpoint:
+        table = Table(title="Outbound Requests")
+        table.add_column("Endpoint", style="cyan")
+        table.add_column("Requests", justify="right")
+        table.add_column("Errors", justify="right", style="red")
+        table.add_column("Retries", justify="right", style="yellow")
+        table.add_column("Received", justify="right")
+        table.add_column("p50", justify="right", style="green")
+        table.add_column("p95", justify="right", style="green")
+        table.add_column("p99", justify="right", style="green")
+        table.add_column("Total Time", justify="right", style="magenta")
+        for endpoint, metrics in sorted(requests_by_endpoint.items(), key=lambda item: -item[1]['latency'].total):
+            latency = metrics['latency']
+            table.add_row(
+                endpoint, str(metrics['requests']), str(metrics['errors']), str(metrics['retries']),
+                format_bytes(metrics['bytes']), format_seconds(latency.quantile(0.5)),
+                format_seconds(latency.quantile(0.95)), format_seconds(latency.quantile(0.99)),
+                format_seconds(latency.total)
+            )
+        console.print(table)
+    
+    if stages:
+        table = Table(title="Display Stages")
+        table.add_column("Stage", style="cyan")
+        table.add_column("Calls", justify="right")
+        table.add_column("Total Time", justify="right", style="magenta")
+        table.add_column("Network", justify="right", style="yellow")
+        table.add_column("Rendering & Other", justify="right", style="green")
+        table.add_column("p50", justify="right")
+        table.add_column("p99", justify="right")
+        for stage, metrics in sorted(stages.items(), key=lambda item: -item[1]['latency'].total):
+            latency = metrics['latency']
+            table.add_row(
+                stage, str(latency.count), format_seconds(latency.total), format_seconds(metrics['network_time']),
+                format_seconds(max(latency.total - metrics['network_time'], 0.0)),
+                format_seconds(latency.quantile(0.5)), format_seconds(latency.quantile(0.99))
+            )
+        console.print(table)
+    
+    if cache:
+        table = Table(title="Response Cache")
+        table.add_column("Data Class", style="cyan")
+        table.add_column("Hits", justify="right", style="green")
+        table.add_column("Misses", justify="right", style="yellow")
+        table.add_column("Coalesced", justify="right")
+        table.add_column("Hit Ratio", justify="right", style="magenta")
+        for data_class, counts in sorted(cache.items()):
+            lookups = counts['hit'] + counts['miss'] + counts['coalesced']
+            # A coalesced lookup waited on another caller's fetch instead of sending its own
+            ratio = (counts['hit'] + counts['coalesced']) / lookups * 100 if lookups else 0
+            table.add_row(data_class, str(counts['hit']), str(counts['miss']), str(counts['coalesced']), f"{ratio:.0f}%")
+        console.print(table)
+    
+    display_scan_api_stats()
+
+def prometheus_labels(**labels):
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+def prometheus_histogram(lines, name, labels, histogram):
+    cumulative = 0
+    for bound, bucket_count in zip(METRICS_LATENCY_BUCKETS, histogram.buckets):
+        cumulative += bucket_count
+        lines.append(f"{name}_bucket{prometheus_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_bucket{prometheus_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{prometheus_labels(**labels)} {histogram.total:.6f}")
+    lines.append(f"{name}_count{prometheus_labels(**labels)} {histogram.count}")
+
+def write_prometheus_textfile(path, command, exit_code):
+    requests_by_endpoint, stages, cache = metrics_snapshot()
+    scan_stats = dict(scan_api.stats)
+    prefix = "token_analyzer"
+    lines = []
+    
+    def metric(name, metric_type, help_text, samples):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+        for labels, value in samples:
+            lines.append(f"{prefix}_{name}{prometheus_labels(**labels)} {value}")
+    
+    metric("last_run_timestamp_seconds", "gauge", "Unix time the run finished.",
+           [({'command': command}, f"{time.time():.3f}")])
+    metric("last_run_duration_seconds", "gauge", "Wall-clock duration of the run.",
+           [({'command': command}, f"{time.time() - _metrics_started_at:.3f}")])
+    metric("last_run_exit_code", "gauge", "Exit code of the run.", [({'command': command}, exit_code)])
+    metric("http_requests_total", "counter", "Outbound HTTP requests by endpoint.",
+           [({'endpoint': endpoint}, m['requests']) for endpoint, m in requests_by_endpoint.items()])
+    metric("http_errors_total", "counter", "Outbound requests that failed or returned HTTP 4xx/5xx.",
+           [({'endpoint': endpoint}, m['errors']) for endpoint, m in requests_by_endpoint.items()])
+    metric("http_retries_total", "counter", "Requests retried after a rate limit.",
+           [({'endpoint': endpoint}, m['retries']) for endpoint, m in requests_by_endpoint.items()])
+    metric("http_response_bytes_total", "counter", "Response body bytes received.",
+           [({'endpoint': endpoint}, m['bytes']) for endpoint, m in requests_by_endpoint.items()])
+    
+    lines.append(f"# HELP {prefix}_http_request_duration_seconds Outbound request latency.")
+    lines.append(f"# TYPE {prefix}_http_request_duration_seconds histogram")
+    for endpoint, m in requests_by_endpoint.items():
+        prometheus_histogram(lines, f"{prefix}_http_request_duration_seconds", {'endpoint': endpoint}, m['latency'])
+    
+    lines.append(f"# HELP {prefix}_stage_duration_seconds Time spent in each display stage, network included.")
+    lines.append(f"# TYPE {prefix}_stage_duration_seconds histogram")
+    for stage, m in stages.items():
+        prometheus_histogram(lines, f"{prefix}_stage_duration_seconds", {'stage': stage}, m['latency'])
+    metric("stage_network_seconds_total", "counter", "Part of each stage spent waiting on requests from the same thread.",
+           [({'stage': stage}, f"{m['network_time']:.6f}") for stage, m in stages.items()])
+    
+    metric("cache_lookups_total", "counter", "Response cache lookups by data class and result.",
+           [({'data_class': data_class, 'result': result}, count)
+            for data_class, counts in cache.items() for result, count in counts.items()])
+    metric("scan_api_rate_limited_total", "counter", "Scan API responses that reported a rate limit.",
+           [({}, scan_stats['rate_limited'])])
+    metric("scan_api_throttle_seconds_total", "counter", "Time spent waiting for a scan API rate limit slot.",
+           [({}, f"{scan_stats['throttle_time']:.6f}")])
+    
+    # Write then rename so the node_exporter textfile collector never reads a half-written file
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+def should_profile(action):
+    return (PROFILE_CPU or PROFILE_MEMORY) and (PROFILE_ACTIONS is None or action in PROFILE_ACTIONS)
+
+@contextlib.contextmanager
+def profiled(label):
+    if not (PROFILE_CPU or PROFILE_MEMORY):
+        yield
+        return
+    import cProfile
+    import pstats
+    import tracemalloc
+    
+    profiler = cProfile.Profile() if PROFILE_CPU else None
+    if PROFILE_MEMORY:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        
+        if profiler:
+            # cProfile only follows the calling thread; worker threads show up as time spent waiting on futures
+            profile_path = os.path.join(PROFILE_DIR, f"{label}-{stamp}.prof")
+            profiler.dump_stats(profile_path)
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+            console.print(f"\n[bold cyan]CPU profile for {label}[/bold cyan] [dim](saved to {profile_path})[/dim]")
+            console.print(output.getvalue().strip(), markup=False, highlight=False)
+        
+        if PROFILE_MEMORY:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            snapshot_path = os.path.join(PROFILE_DIR, f"{label}-{stamp}.tracemalloc")
+            snapshot.dump(snapshot_path)
+            
+            table = Table(title=f"Memory for {label}: {format_bytes(current)} still allocated, peak {format_bytes(peak)}")
+            table.add_column("Location", style="cyan")
+            table.add_column("Size", justify="right", style="magenta")
+            table.add_column("Blocks", justify="right")
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP_N]:
+                frame = stat.traceback[0]
+                table.add_row(f"{frame.filename}:{frame.lineno}", format_bytes(stat.size), str(stat.count))
+            console.print(table)
+            console.print(f"[dim]Snapshot saved to {snapshot_path}[/dim]")
+
 def display_ascii_art():
     ascii_art = """
 [bold cyan]
@@ -59,164 +769,499 @@ by Malvidous | github/nescatfe
 
 #----- ABE NEW FUNCTION HERE -----#
 
-def decode_input_data(input_data, chain):
-    # Add more common function signatures here
-    function_signatures = {
-        "0x38ed1739": "swapExactTokensForTokens",
-        "0x7ff36ab5": "swapExactETHForTokens",
-        "0x18cbafe5": "swapExactTokensForETH",
-        "0xfb3bdb41": "swapETHForExactTokens",
-        "0x5c11d795": "swapExactTokensForTokensSupportingFeeOnTransferTokens",
-        "0xa9059cbb": "transfer",
-        "0x23b872dd": "transferFrom",
-        "0x095ea7b3": "approve",
-    }
+# Always available, and tried before the signature database
+COMMON_FUNCTION_SIGNATURES = {
+    "0x38ed1739": "swapExactTokensForTokens(uint256,uint256,address[],address,uint256)",
+    "0x7ff36ab5": "swapExactETHForTokens(uint256,address[],address,uint256)",
+    "0x18cbafe5": "swapExactTokensForETH(uint256,uint256,address[],address,uint256)",
+    "0xfb3bdb41": "swapETHForExactTokens(uint256,address[],address,uint256)",
+    "0x5c11d795": "swapExactTokensForTokensSupportingFeeOnTransferTokens(uint256,uint256,address[],address,uint256)",
+    "0xa9059cbb": "transfer(address,uint256)",
+    "0x23b872dd": "transferFrom(address,address,uint256)",
+    "0x095ea7b3": "approve(address,uint256)",
+}
+
+# signatures.bin layout: header, fixed-width records sorted by selector, then the signature strings
+SIGNATURE_DB_MAGIC = b"SIGDB\x01\x00\x00"
+SIGNATURE_DB_HEADER = struct.Struct(">8sII")  # magic, record count, record size
+SIGNATURE_DB_RECORD = struct.Struct(">4sIH2x")  # selector, string offset, string length
+SIGNATURE_PATTERN = re.compile(r"([A-Za-z_$][\w$]*\(.*\))")
+
+class SignatureDatabase:
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, record_size = SIGNATURE_DB_HEADER.unpack_from(self._map, 0)
+        if magic != SIGNATURE_DB_MAGIC or record_size != SIGNATURE_DB_RECORD.size:
+            raise ValueError(f"{path} is not a signature database")
+        self._strings_start = SIGNATURE_DB_HEADER.size + self.count * SIGNATURE_DB_RECORD.size
+        
+    def _record(self, index):
+        return SIGNATURE_DB_RECORD.unpack_from(self._map, SIGNATURE_DB_HEADER.size + index * SIGNATURE_DB_RECORD.size)
+    
+    def lookup(self, selector):
+        # Binary search straight over the mapped file; only the touched pages are read
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[0] < selector:
+                lo = mid + 1
+            else:
+                hi = mid
+        signatures = []
+        while lo < self.count:
+            record_selector, offset, length = self._record(lo)
+            if record_selector != selector:
+                break
+            start = self._strings_start + offset
+            signatures.append(self._map[start:start + length].decode('utf-8'))
+            lo += 1
+        return signatures
+
+_signature_db = None
+_signature_db_loaded = False
+
+def get_signature_db():
+    global _signature_db, _signature_db_loaded
+    if not _signature_db_loaded:
+        _signature_db_loaded = True
+        if os.path.exists(SIGNATURE_DB_FILE):
+            try:
+                _signature_db = SignatureDatabase(SIGNATURE_DB_FILE)
+            except (OSError, ValueError) as e:
+                console.print(f"[bold yellow]Warning: Could not open signature database: {e}[/bold yellow]")
+    return _signature_db
+
+def build_signature_db(source_path, output_path=None):
+    from eth_utils import function_signature_to_4byte_selector
+    output_path = output_path or SIGNATURE_DB_FILE
+    
+    # Accepts one signature per line in any text or CSV dump (e.g. 4byte.directory exports)
+    entries = {(bytes.fromhex(selector[2:]), signature) for selector, signature in COMMON_FUNCTION_SIGNATURES.items()}
+    with open(source_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            match = SIGNATURE_PATTERN.search(line)
+            if match:
+                signature = match.group(1).replace(" ", "")
+                entries.add((function_signature_to_4byte_selector(signature), signature))
     
-    if len(input_data) < 10:
-        return "Unknown Function"
+    records = []
+    strings = bytearray()
+    for selector, signature in sorted(entries):
+        encoded = signature.encode('utf-8')[:0xFFFF]
+        records.append(SIGNATURE_DB_RECORD.pack(selector, len(strings), len(encoded)))
+        strings += encoded
     
-    function_signature = input_data[:10]
-    return function_signatures.get(function_signature, "Unknown Function")
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(SIGNATURE_DB_HEADER.pack(SIGNATURE_DB_MAGIC, len(records), SIGNATURE_DB_RECORD.size))
+        f.write(b"".join(records))
+        f.write(strings)
+    os.replace(temp_path, output_path)
+    return len(records)
 
-def get_token_info(address, chain):
-    if chain.lower() in ['ethereum', 'eth']:
-        w3 = Web3(Web3.HTTPProvider(ETH_PROVIDER))
-    elif chain.lower() in ['binance', 'bsc', 'bnb']:
-        w3 = Web3(Web3.HTTPProvider(BSC_PROVIDER))
-    else:
-        return {"symbol": "UNKNOWN", "decimals": 18, "name": "Unknown Token"}
+def split_signature_types(params):
+    # Split on top-level commas only, so tuple types like (address,uint256)[] stay whole
+    types, depth, current = [], 0, ""
+    for char in params:
+        if char == "," and depth == 0:
+            types.append(current)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    if current:
+        types.append(current)
+    return types
+
+def format_decoded_value(value):
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(format_decoded_value(v) for v in value) + "]"
+    return str(value)
+
+def decode_calldata_batch(inputs):
+    from eth_abi import decode
+    db = get_signature_db()
+    
+    # Each distinct selector is looked up once for the whole batch
+    candidates = {}
+    for input_data in inputs:
+        if input_data and len(input_data) >= 10:
+            selector = input_data[:10].lower()
+            if selector not in candidates:
+                known = COMMON_FUNCTION_SIGNATURES.get(selector)
+                candidates[selector] = ([known] if known else []) + (db.lookup(bytes.fromhex(selector[2:])) if db else [])
+    
+    decoded = []
+    for input_data in inputs:
+        if not input_data or len(input_data) < 10:
+            decoded.append({"selector": None, "signature": None, "name": "Unknown Function", "args": []})
+            continue
+        selector = input_data[:10].lower()
+        result = {"selector": selector, "signature": None, "name": "Unknown Function", "args": []}
+        try:
+            args_data = bytes.fromhex(input_data[10:])
+        except ValueError:
+            args_data = None
+        for signature in candidates[selector] if args_data is not None else []:
+            # Selector collisions are common in large dumps; the first signature that decodes cleanly wins
+            name, params = signature.split("(", 1)
+            types = split_signature_types(params[:-1])
+            try:
+                values = decode(types, args_data)
+            except Exception:
+                continue
+            result = {"selector": selector, "signature": signature, "name": name, "args": list(zip(types, values))}
+            break
+        decoded.append(result)
+    return decoded
+
+def decode_calldata(input_data):
+    return decode_calldata_batch([input_data])[0]
+
+def decode_input_data(input_data, chain):
+    return decode_calldata(input_data)["name"]
+
+MULTICALL3_ABI = [{
+    "inputs": [{"components": [
+        {"internalType": "address", "name": "target", "type": "address"},
+        {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+        {"internalType": "bytes", "name": "callData", "type": "bytes"}
+    ], "internalType": "struct Multicall3.Call3[]", "name": "calls", "type": "tuple[]"}],
+    "name": "aggregate3",
+    "outputs": [{"components": [
+        {"internalType": "bool", "name": "success", "type": "bool"},
+        {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+    ], "internalType": "struct Multicall3.Result[]", "name": "returnData", "type": "tuple[]"}],
+    "stateMutability": "payable",
+    "type": "function"
+}]
+
+ERC20_METADATA_SELECTORS = [
+    ("symbol", bytes.fromhex("95d89b41")),
+    ("name", bytes.fromhex("06fdde03")),
+    ("decimals", bytes.fromhex("313ce567")),
+]
+UNKNOWN_TOKEN_INFO = {"symbol": "UNKNOWN", "decimals": 18, "name": "Unknown Token"}
+
+_web3_clients = {}
+_token_info_lock = threading.Lock()
+
+WEI_UNITS = {'ether': 18, 'gwei': 9}
+
+def from_units(value, decimals):
+    with localcontext() as ctx:
+        ctx.prec = 999
+        return Decimal(value) / (Decimal(10) ** int(decimals))
+
+def from_wei(value, unit):
+    # Same result as Web3.from_wei without importing web3
+    return from_units(value, WEI_UNITS[unit])
+
+def normalize_chain(chain):
+    chain = (chain or '').lower()
+    if chain in ['ethereum', 'eth']:
+        return 'eth'
+    if chain in ['binance', 'bsc', 'bnb']:
+        return 'bsc'
+    if chain in ['polygon', 'matic']:
+        return 'polygon'
+    return None
 
+def get_web3(chain):
+    from web3 import Web3
+    providers = {'eth': ETH_PROVIDER, 'bsc': BSC_PROVIDER, 'polygon': POLYGON_PROVIDER}
+    chain = normalize_chain(chain)
+    if chain not in providers:
+        return None
+    if chain not in _web3_clients:
+        _web3_clients[chain] = Web3(Web3.HTTPProvider(route_url(providers[chain]), request_kwargs={'timeout': HTTP_TIMEOUTS['rpc']}))
+    return _web3_clients[chain]
+
+def decode_erc20_string(data):
+    from eth_abi import decode
     try:
-        token_contract = w3.eth.contract(address=Web3.to_checksum_address(address), abi=ERC20_ABI)
+        return decode(['string'], data)[0]
+    except Exception:
+        # Older tokens (e.g. MKR) return bytes32 instead of string
+        if len(data) == 32:
+            return data.rstrip(b'\x00').decode('utf-8', errors='ignore')
+        return None
+
+def fetch_token_info_multicall(addresses, chain):
+    from web3 import Web3
+    w3 = get_web3(chain)
+    multicall = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+    calls = [
+        (Web3.to_checksum_address(address), True, selector)
+        for address in addresses
+        for _, selector in ERC20_METADATA_SELECTORS
+    ]
+    # web3 sends this through its own session, so only latency is recorded, not bytes
+    started = time.perf_counter()
+    try:
+        results = multicall.functions.aggregate3(calls).call()
+    except Exception:
+        record_request("rpc", time.perf_counter() - started, 0, error=True)
+        raise
+    record_request("rpc", time.perf_counter() - started, 0)
+    
+    entries = {}
+    for i, address in enumerate(addresses):
+        answers = results[i * len(ERC20_METADATA_SELECTORS):(i + 1) * len(ERC20_METADATA_SELECTORS)]
+        (symbol_ok, symbol_data), (name_ok, name_data), (decimals_ok, decimals_data) = answers
+        symbol = decode_erc20_string(symbol_data) if symbol_ok and symbol_data else None
+        name = decode_erc20_string(name_data) if name_ok and name_data else None
+        decimals = int.from_bytes(decimals_data[:32], 'big') if decimals_ok and len(decimals_data) >= 32 else None
+        
+        if symbol is None and name is None and decimals is None:
+            entries[address] = {"erc20": False, "checked_at": time.time()}
+        else:
+            entries[address] = {
+                "symbol": symbol if symbol is not None else UNKNOWN_TOKEN_INFO["symbol"],
+                "name": name if name is not None else UNKNOWN_TOKEN_INFO["name"],
+                "decimals": decimals if decimals is not None else UNKNOWN_TOKEN_INFO["decimals"],
+            }
+    return entries
+
+def resolve_token_info(addresses, chain):
+    from web3 import Web3
+    results = {address: dict(UNKNOWN_TOKEN_INFO) for address in addresses}
+    chain = normalize_chain(chain)
+    if get_web3(chain) is None:
+        return results
+    
+    with _token_info_lock:
+        now = time.time()
+        missing = []
+        for address in dict.fromkeys(addresses):
+            if not address or not Web3.is_address(address):
+                continue
+            entry = response_cache_get("token_metadata", [chain, address.lower()], cache_max_age("token_metadata"))
+            if entry is None or (entry.get("erc20") is False and now - entry["checked_at"] > TOKEN_INFO_NEGATIVE_TTL):
+                missing.append(address)
+            elif entry.get("erc20") is not False:
+                results[address] = entry
         
-        # Try to get symbol, name, and decimals with fallbacks
         try:
-            symbol = token_contract.functions.symbol().call()
-        except:
-            symbol = "UNKNOWN"
+            for i in range(0, len(missing), MULTICALL_MAX_TOKENS):
+                entries = fetch_token_info_multicall(missing[i:i + MULTICALL_MAX_TOKENS], chain)
+                for address, entry in entries.items():
+                    response_cache_put("token_metadata", [chain, address.lower()], entry)
+                    if entry.get("erc20") is not False:
+                        results[address] = dict(entry)
+        except Exception as e:
+            console.print(f"[bold yellow]Warning: Could not fetch complete token info: {str(e)}[/bold yellow]")
+    
+    return results
+
+def get_token_info(address, chain):
+    return resolve_token_info([address], chain)[address]
+
+_tx_details = OrderedDict()
+_decoded_calls = {}
+_tx_detail_futures = {}
+_tx_detail_lock = threading.Lock()
+_tx_detail_executor = ThreadPoolExecutor(max_workers=2)
 
+def rpc_provider(chain):
+    return {'eth': ETH_PROVIDER, 'bsc': BSC_PROVIDER, 'polygon': POLYGON_PROVIDER}.get(normalize_chain(chain))
+
+def rpc_request(chain, method, params):
+    response = http_post(rpc_provider(chain), {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}, endpoint="rpc")
+    response.raise_for_status()
+    reply = response.json()
+    if reply.get('error'):
+        raise ValueError(f"{method} failed: {reply['error'].get('message')}")
+    return reply.get('result')
+
+def fetch_transaction_details_batch(tx_hashes, chain):
+    # One JSON-RPC batch carries the transaction and receipt for every hash on the page
+    batch = []
+    for i, tx_hash in enumerate(tx_hashes):
+        batch.append({"jsonrpc": "2.0", "id": 2 * i, "method": "eth_getTransactionByHash", "params": [tx_hash]})
+        batch.append({"jsonrpc": "2.0", "id": 2 * i + 1, "method": "eth_getTransactionReceipt", "params": [tx_hash]})
+    response = http_post(rpc_provider(chain), batch, endpoint="rpc")
+    response.raise_for_status()
+    replies = response.json()
+    if not isinstance(replies, list):
+        raise ValueError(f"Node provider does not support batch requests: {replies}")
+    
+    results = {reply.get('id'): reply.get('result') for reply in replies if isinstance(reply, dict)}
+    details = {}
+    for i, tx_hash in enumerate(tx_hashes):
+        tx_data, receipt_data = results.get(2 * i), results.get(2 * i + 1)
+        if isinstance(tx_data, dict) and isinstance(receipt_data, dict):
+            details[tx_hash] = (tx_data, receipt_data)
+    return details
+
+def _prefetch_transaction_details(tx_hashes, chain):
+    _thread_state.quiet = True
+    try:
         try:
-            name = token_contract.functions.name().call()
-        except:
-            name = "Unknown Token"
+            details = fetch_transaction_details_batch(tx_hashes, chain)
+        except (requests.RequestException, ValueError):
+            # Leave these hashes to the Etherscan proxy fallback
+            details = {}
+        # Decode the whole page's calldata in one pass while we are off the UI thread
+        hashes = list(details.keys())
+        calls = decode_calldata_batch([details[h][0].get('input', '') for h in hashes]) if hashes else []
+        with _tx_detail_lock:
+            for tx_hash, call in zip(hashes, calls):
+                tx_data, receipt_data = details[tx_hash]
+                _tx_details[(chain, tx_hash)] = (tx_data, receipt_data)
+                _decoded_calls[(chain, tx_hash)] = call
+            while len(_tx_details) > TX_DETAIL_CACHE_SIZE:
+                key, _ = _tx_details.popitem(last=False)
+                _decoded_calls.pop(key, None)
+    finally:
+        # Even a failed prefetch must release its hashes, or every later lookup would wait on it
+        with _tx_detail_lock:
+            for tx_hash in tx_hashes:
+                _tx_detail_futures.pop((chain, tx_hash), None)
+
+def prefetch_transaction_details(tx_hashes, chain):
+    if rpc_provider(chain) is None:
+        return
+    with _tx_detail_lock:
+        pending = [
+            tx_hash for tx_hash in dict.fromkeys(h.lower() for h in tx_hashes)
+            if (chain, tx_hash) not in _tx_details and (chain, tx_hash) not in _tx_detail_futures
+        ]
+        if not pending:
+            return
+        future = _tx_detail_executor.submit(_prefetch_transaction_details, pending, chain)
+        for tx_hash in pending:
+            _tx_detail_futures[(chain, tx_hash)] = future
 
+def get_transaction_details(tx_hash, chain):
+    key = (chain, tx_hash.lower())
+    with _tx_detail_lock:
+        future = _tx_detail_futures.get(key)
+    if future is not None:
         try:
-            decimals = token_contract.functions.decimals().call()
-        except:
-            decimals = 18
+            future.result()
+        except Exception:
+            # A broken prefetch only means this transaction goes through proxy mode
+            pass
+    with _tx_detail_lock:
+        if key in _tx_details:
+            return _tx_details[key]
+    
+    # Proxy mode: two Etherscan calls for this transaction only
+    try:
+        tx_result = scan_api_get(chain, {"module": "proxy", "action": "eth_getTransactionByHash", "txhash": tx_hash})
+        receipt_result = scan_api_get(chain, {"module": "proxy", "action": "eth_getTransactionReceipt", "txhash": tx_hash})
+    except requests.RequestException as e:
+        report_fetch_error(f"Error fetching transaction details: {e}")
+        return None, None
+    
+    tx_data = tx_result.get('result')
+    receipt_data = receipt_result.get('result')
+    if not isinstance(tx_data, dict) or not isinstance(receipt_data, dict):
+        return None, None
+    return tx_data, receipt_data
 
-        return {
-            "symbol": symbol,
-            "decimals": decimals,
-            "name": name
-        }
-    except Exception as e:
-        console.print(f"[bold yellow]Warning: Could not fetch complete token info: {str(e)}[/bold yellow]")
-        return {"symbol": "UNKNOWN", "decimals": 18, "name": "Unknown Token"}
+def get_decoded_call(tx_hash, chain, input_data):
+    with _tx_detail_lock:
+        call = _decoded_calls.get((chain, tx_hash.lower()))
+    return call if call is not None else decode_calldata(input_data)
 
+@timed_stage
 def display_transaction_details(tx, chain, wallet_address):
     tx_hash = tx['hash']
-    if chain == 'eth':
-        api_base = ETHERSCAN_API
-        api_key = ETHERSCAN_KEY
-        explorer_base = "https://etherscan.io/tx/"
-    elif chain == 'bsc':
-        api_base = BSCSCAN_API
-        api_key = BSCSCAN_KEY
-        explorer_base = "https://bscscan.com/tx/"
-    else:
+    explorer_base = EXPLORER_TX_URLS.get(chain)
+    if explorer_base is None:
         console.print(f"[red]Unsupported chain: {chain}[/red]")
         return
     
-    # Fetch transaction details
-    tx_url = f"{api_base}?module=proxy&action=eth_getTransactionByHash&txhash={tx_hash}&apikey={api_key}"
-    tx_response = requests.get(tx_url)
-    
-    # Fetch transaction receipt
-    receipt_url = f"{api_base}?module=proxy&action=eth_getTransactionReceipt&txhash={tx_hash}&apikey={api_key}"
-    receipt_response = requests.get(receipt_url)
-    
-    if tx_response.status_code == 200 and receipt_response.status_code == 200:
-        tx_data = tx_response.json().get('result', {})
-        receipt_data = receipt_response.json().get('result', {})
+    # Usually already fetched in the background when the page was rendered
+    tx_data, receipt_data = get_transaction_details(tx_hash, chain)
+    if tx_data and receipt_data:
+        # Create a table to display transaction details
+        table = Table(title=f"Transaction Details for {tx_hash}")
+        table.add_column("Field", style="cyan", width=30)
+        table.add_column("Value", style="yellow")
         
-        if tx_data and receipt_data:
-            # Create a table to display transaction details
-            table = Table(title=f"Transaction Details for {tx_hash}")
-            table.add_column("Field", style="cyan", width=30)
-            table.add_column("Value", style="yellow")
-            
-            # Transaction type and status
-            tx_type = "IN" if tx['to'].lower() == wallet_address.lower() else "OUT"
-            status = "Success" if receipt_data.get('status') == '0x1' else "Failed"
-            table.add_row("Type", f"[{'green' if tx_type == 'IN' else 'red'}]{tx_type}[/{'green' if tx_type == 'IN' else 'red'}]")
-            table.add_row("Status", f"[{'green' if status == 'Success' else 'red'}]{status}[/{'green' if status == 'Success' else 'red'}]")
-            
-            # Token information
-            table.add_row("Token Name", tx['tokenName'])
-            table.add_row("Token Symbol", tx['tokenSymbol'])
-            table.add_row("Token Decimals", tx['tokenDecimal'])
-            table.add_row("Amount", f"{float(tx['value']) / (10 ** int(tx['tokenDecimal'])):.6f} {tx['tokenSymbol']}")
-            
-            # Basic transaction details
-            table.add_row("From", tx_data.get('from', 'Unknown'))
-            table.add_row("To", tx_data.get('to', 'Unknown'))
-            table.add_row("Native Value", f"{Web3.from_wei(int(tx_data.get('value', '0'), 16), 'ether'):.18f} {'ETH' if chain == 'eth' else 'BNB'}")
-            table.add_row("Gas Price", f"{Web3.from_wei(int(tx_data.get('gasPrice', '0'), 16), 'gwei'):.2f} Gwei")
-            table.add_row("Gas Limit", str(int(tx_data.get('gas', '0'), 16)))
-            table.add_row("Nonce", str(int(tx_data.get('nonce', '0'), 16)))
-            
-            # Transaction receipt details
-            table.add_row("Gas Used", str(int(receipt_data.get('gasUsed', '0'), 16)))
-            table.add_row("Block Number", str(int(receipt_data.get('blockNumber', '0'), 16)))
-            table.add_row("Block Hash", receipt_data.get('blockHash', 'Unknown'))
-            
-            # Calculate transaction fee
-            gas_price = Web3.from_wei(int(tx_data.get('gasPrice', '0'), 16), 'ether')
-            gas_used = int(receipt_data.get('gasUsed', '0'), 16)
-            tx_fee = gas_price * gas_used
-            table.add_row("Transaction Fee", f"{tx_fee:.8f} {'ETH' if chain == 'eth' else 'BNB'}")
-            
-            # Add transaction timestamp if available
-            if 'timeStamp' in tx:
-                tx_time = datetime.fromtimestamp(int(tx['timeStamp']))
-                table.add_row("Timestamp", tx_time.strftime("%Y-%m-%d %H:%M:%S"))
-            
-            # Add explorer link
-            table.add_row("Explorer Link", f"{explorer_base}{tx_hash}")
+        # Transaction type and status
+        tx_type = "IN" if tx['to'].lower() == wallet_address.lower() else "OUT"
+        status = "Success" if receipt_data.get('status') == '0x1' else "Failed"
+        table.add_row("Type", f"[{'green' if tx_type == 'IN' else 'red'}]{tx_type}[/{'green' if tx_type == 'IN' else 'red'}]")
+        table.add_row("Status", f"[{'green' if status == 'Success' else 'red'}]{status}[/{'green' if status == 'Success' else 'red'}]")
+        
+        # Token information
+        table.add_row("Token Name", tx['tokenName'])
+        table.add_row("Token Symbol", tx['tokenSymbol'])
+        table.add_row("Token Decimals", tx['tokenDecimal'])
+        table.add_row("Amount", f"{from_units(int(tx['value']), tx['tokenDecimal'] or 0):.6f} {tx['tokenSymbol']}")
+        
+        # Basic transaction details
+        table.add_row("From", tx_data.get('from', 'Unknown'))
+        table.add_row("To", tx_data.get('to', 'Unknown'))
+        table.add_row("Native Value", f"{from_wei(int(tx_data.get('value', '0'), 16), 'ether'):.18f} {NATIVE_SYMBOLS[chain]}")
+        table.add_row("Gas Price", f"{from_wei(int(tx_data.get('gasPrice', '0'), 16), 'gwei'):.2f} Gwei")
+        table.add_row("Gas Limit", str(int(tx_data.get('gas', '0'), 16)))
+        table.add_row("Nonce", str(int(tx_data.get('nonce', '0'), 16)))
+        
+        # Transaction receipt details
+        table.add_row("Gas Used", str(int(receipt_data.get('gasUsed', '0'), 16)))
+        table.add_row("Block Number", str(int(receipt_data.get('blockNumber', '0'), 16)))
+        table.add_row("Block Hash", receipt_data.get('blockHash', 'Unknown'))
+        
+        # Calculate transaction fee
+        gas_price = from_wei(int(tx_data.get('gasPrice', '0'), 16), 'ether')
+        gas_used = int(receipt_data.get('gasUsed', '0'), 16)
+        tx_fee = gas_price * gas_used
+        table.add_row("Transaction Fee", f"{tx_fee:.8f} {NATIVE_SYMBOLS[chain]}")
+        
+        # Add transaction timestamp if available
+        if 'timeStamp' in tx:
+            tx_time = datetime.fromtimestamp(int(tx['timeStamp']))
+            table.add_row("Timestamp", tx_time.strftime("%Y-%m-%d %H:%M:%S"))
+        
+        # Add explorer link
+        table.add_row("Explorer Link", f"{explorer_base}{tx_hash}")
+        
+        # Interpret transaction
+        input_data = tx_data.get('input', '')
+        call = get_decoded_call(tx_hash, chain, input_data)
+        function_name = call['name']
+        
+        if function_name in ["swapExactTokensForTokens", "swapExactETHForTokens", "swapExactTokensForETH", "swapETHForExactTokens"]:
+            # Interpret swap transaction
+            token_info = resolve_token_info([tx_data.get('from'), receipt_data.get('to')], chain)
+            from_token = token_info[tx_data.get('from')]
+            to_token = token_info[receipt_data.get('to')]
             
-            # Interpret transaction
-            input_data = tx_data.get('input', '')
-            function_name = decode_input_data(input_data, chain)
+            from_amount = from_wei(int(tx_data.get('value', '0'), 16), 'ether')
+            to_amount = from_units(int(tx.get('value') or 0), tx.get('tokenDecimal') or 18)
             
-            if function_name in ["swapExactTokensForTokens", "swapExactETHForTokens", "swapExactTokensForETH", "swapETHForExactTokens"]:
-                # Interpret swap transaction
-                from_token = get_token_info(tx_data.get('from'), chain)
-                to_token = get_token_info(receipt_data.get('to'), chain)
-                
-                from_amount = Web3.from_wei(int(tx_data.get('value', '0'), 16), 'ether')
-                to_amount = float(tx.get('value', '0')) / (10 ** int(tx.get('tokenDecimal', '18')))
-                
-                if function_name == "swapExactETHForTokens":
-                    interpretation = f"Swapped {from_amount:.6f} {'ETH' if chain == 'eth' else 'BNB'} for {to_amount:.6f} {tx['tokenSymbol']}"
-                elif function_name == "swapExactTokensForETH":
-                    interpretation = f"Swapped {to_amount:.6f} {tx['tokenSymbol']} for {from_amount:.6f} {'ETH' if chain == 'eth' else 'BNB'}"
-                else:
-                    interpretation = f"Swapped {from_amount:.6f} {from_token['symbol']} for {to_amount:.6f} {to_token['symbol']}"
-            elif function_name == "transfer":
-                amount = float(tx.get('value', '0')) / (10 ** int(tx.get('tokenDecimal', '18')))
-                interpretation = f"Transferred {amount:.6f} {tx['tokenSymbol']} to {tx_data.get('to', 'Unknown')}"
-            elif function_name == "approve":
-                amount = Web3.from_wei(int(input_data[74:138], 16), 'ether')
-                spender = "0x" + input_data[34:74]
-                interpretation = f"Approved {amount:.6f} {tx['tokenSymbol']} to be spent by {spender}"
+            if function_name == "swapExactETHForTokens":
+                interpretation = f"Swapped {from_amount:.6f} {NATIVE_SYMBOLS[chain]} for {to_amount:.6f} {tx['tokenSymbol']}"
+            elif function_name == "swapExactTokensForETH":
+                interpretation = f"Swapped {to_amount:.6f} {tx['tokenSymbol']} for {from_amount:.6f} {NATIVE_SYMBOLS[chain]}"
             else:
-                interpretation = f"Executed {function_name} function"
-            
-            table.add_row("Transaction Type", interpretation)
-            
-            console.print(table)
-            
+                interpretation = f"Swapped {from_amount:.6f} {from_token['symbol']} for {to_amount:.6f} {to_token['symbol']}"
+        elif function_name == "transfer":
+            amount = from_units(int(tx.get('value') or 0), tx.get('tokenDecimal') or 18)
+            interpretation = f"Transferred {amount:.6f} {tx['tokenSymbol']} to {tx_data.get('to', 'Unknown')}"
+        elif function_name == "approve" and call['args']:
+            spender = call['args'][0][1]
+            amount = from_wei(call['args'][1][1], 'ether')
+            interpretation = f"Approved {amount:.6f} {tx['tokenSymbol']} to be spent by {spender}"
+        else:
+            interpretation = f"Executed {function_name} function"
+        
+        table.add_row("Transaction Type", interpretation)
+        if call['signature']:
+            table.add_row("Function", call['signature'])
+            table.add_row("Arguments", "\n".join(f"{arg_type}: {format_decoded_value(value)}" for arg_type, value in call['args']) or "-")
+        
+        console.print(table)
+        
 
 def format_token_share(share_str):
     try:
@@ -227,93 +1272,383 @@ def format_token_share(share_str):
     except ValueError:
         return share_str  
 
+@response_cached("holders")
 def fetch_top_token_holders(token_address, chain):
     try:
         if chain.lower() in ['ethereum', 'eth']:
             api_url = f"https://api.ethplorer.io/getTopTokenHolders/{token_address}?apiKey=freekey&limit=10"
-            response = requests.get(api_url)
+            response = http_get(api_url, endpoint="ethplorer")
             if response.status_code == 200:
                 data = response.json()
                 return [{'address': h['address'], 'share': h['share']} for h in data.get('holders', [])]
-        elif chain.lower() in ['binance', 'bsc', 'bnb']:
-            api_url = f"https://api.bscscan.com/api?module=token&action=tokenholderlist&contractaddress={token_address}&page=1&offset=10&apikey={BSCSCAN_KEY}"
-            response = requests.get(api_url)
-            if response.status_code == 200:
-                data = response.json()
-                if data['status'] == '1' and 'result' in data:
-                    return [{'address': h['HolderAddress'], 'share': float(h['PercentHeld'])} for h in data['result']]
-        elif chain.lower() in ['polygon', 'matic']:
-            api_url = f"https://api.polygonscan.com/api?module=token&action=tokenholderlist&contractaddress={token_address}&page=1&offset=10&apikey={POLYGON_KEY}"
-            response = requests.get(api_url)
-            if response.status_code == 200:
-                data = response.json()
-                if data['status'] == '1' and 'result' in data:
-                    return [{'address': h['HolderAddress'], 'share': float(h['PercentHeld'])} for h in data['result']]
+        elif chain.lower() in ['binance', 'bsc', 'bnb', 'polygon', 'matic']:
+            params = {"module": "token", "action": "tokenholderlist", "contractaddress": token_address, "page": 1, "offset": 10}
+            data = scan_api_get(normalize_chain(chain), params)
+            if data['status'] == '1' and 'result' in data:
+                return [{'address': h['HolderAddress'], 'share': float(h['PercentHeld'])} for h in data['result']]
     except Exception as e:
-        console.print(f"[bold red]Error fetching top token holders for {chain} chain: {str(e)}[/bold red]")
+        report_fetch_error(f"Error fetching top token holders for {chain} chain: {str(e)}")
         
     return None
 
+@response_cached("gas")
 def fetch_eth_gas_prices():
-    etherscan_url = f"{ETHERSCAN_API}?module=gastracker&action=gasoracle&apikey={ETHERSCAN_KEY}"
-    
     try:
-        response = requests.get(etherscan_url)
-        response.raise_for_status()
-        data = response.json()
+        data = scan_api_get("eth", {"module": "gastracker", "action": "gasoracle"})
+        if data.get("status") != "1":
+            report_fetch_error(f"Error fetching ETH gas prices: {data.get('result')}")
+            return None
         return data["result"]
     except requests.RequestException as e:
-        console.print(f"[bold red]Error fetching ETH gas prices: {e}[/bold red]")
+        report_fetch_error(f"Error fetching ETH gas prices: {e}")
         return None
     
-def fetch_eth_price():
+@response_cached("price")
+def fetch_coingecko_prices(ids):
     try:
-        response = requests.get(f"{COINGECKO_API}?ids=ethereum&vs_currencies=usd")
+        response = http_get(f"{COINGECKO_API}?ids={ids}&vs_currencies=usd", endpoint="coingecko")
         response.raise_for_status()
-        data = response.json()
+        return response.json()
+    except requests.RequestException as e:
+        report_fetch_error(f"Error fetching prices for {ids}: {e}")
+        return None
+
+def fetch_eth_price():
+    # Shares the cached BTC/ETH lookup the main menu already makes
+    data = fetch_coingecko_prices("bitcoin,ethereum")
+    if data and 'ethereum' in data:
         return data['ethereum']['usd']
+    return None
+    
+def fetch_holder_page(token_address, chain, page, page_size=None):
+    params = {"module": "token", "action": "tokenholderlist", "contractaddress": token_address,
+              "page": page, "offset": page_size or HOLDER_PAGE_SIZE}
+    data = scan_api_get(chain, params)
+    if data['status'] != '1':
+        if 'no token holder' in str(data.get('message', '')).lower() or data.get('result') == []:
+            return []
+        raise requests.RequestException(f"tokenholderlist failed: {data.get('result')}")
+    return [
+        (h.get('TokenHolderAddress') or h.get('HolderAddress'), int(h.get('TokenHolderQuantity') or 0))
+        for h in data['result']
+    ]
+
+def iter_holder_pages(token_address, chain, page_size=None, max_in_flight=None):
+    page_size = page_size or HOLDER_PAGE_SIZE
+    max_in_flight = max_in_flight or SCAN_MAX_IN_FLIGHT
+    # Keep a window of pages in flight and hand them back in page order; a short page ends the list
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = {page: executor.submit(fetch_holder_page, token_address, chain, page, page_size) for page in range(1, max_in_flight + 1)}
+        page = 1
+        try:
+            while True:
+                holders = futures.pop(page).result()
+                if holders:
+                    yield holders
+                if len(holders) < page_size:
+                    return
+                futures[page + max_in_flight] = executor.submit(fetch_holder_page, token_address, chain, page + max_in_flight, page_size)
+                page += 1
+        finally:
+            for future in futures.values():
+                future.cancel()
+
+class HolderDistribution:
+    # Streams the holder pages in bounded memory: count, total and sum of squares give exact HHI, the top
+    # holders heap gives exact top-N shares, and balances beyond that are only counted into log-spaced
+    # buckets, so Gini (and holders to 50% when the heap falls short) come from the bucketed Lorenz curve
+    # rather than a sort of every balance
+    def __init__(self, keep_top=None):
+        self.holders = 0
+        self.total = 0
+        self.sum_squares = 0.0
+        self.buckets = defaultdict(lambda: [0, 0.0])
+        self.top = []
+        self.keep_top = keep_top or HOLDER_TOP_KEEP
+        
+    def add(self, holders):
+        for address, quantity in holders:
+            if quantity <= 0:
+                continue
+            self.holders += 1
+            self.total += quantity
+            self.sum_squares += float(quantity) ** 2
+            mantissa, exponent = math.frexp(quantity)
+            bucket = self.buckets[exponent * HOLDER_BUCKETS_PER_OCTAVE + int((mantissa - 0.5) * 2 * HOLDER_BUCKETS_PER_OCTAVE)]
+            bucket[0] += 1
+            bucket[1] += float(quantity)
+            if len(self.top) < self.keep_top:
+                heapq.heappush(self.top, (quantity, address))
+            elif quantity > self.top[0][0]:
+                heapq.heapreplace(self.top, (quantity, address))
+                
+    def holders_to_share(self, share):
+        supply = float(self.total)
+        held = 0.0
+        for rank, (quantity, _) in enumerate(sorted(self.top, reverse=True), 1):
+            held += float(quantity)
+            if held >= share * supply:
+                return rank
+        held, rank = 0.0, 0
+        for index in sorted(self.buckets, reverse=True):
+            count, bucket_sum = self.buckets[index]
+            if held + bucket_sum >= share * supply:
+                return rank + max(math.ceil((share * supply - held) / (bucket_sum / count)), 1)
+            held += bucket_sum
+            rank += count
+        return self.holders
+        
+    def summary(self, complete=True):
+        n = self.holders
+        if not n:
+            return None
+        supply = float(self.total)
+        # Lorenz curve over the buckets from smallest to largest: G = 1 - sum(count/n * (L_prev + L))
+        gini, lorenz = 1.0, 0.0
+        for index in sorted(self.buckets):
+            count, bucket_sum = self.buckets[index]
+            previous, lorenz = lorenz, lorenz + bucket_sum / supply
+            gini -= count / n * (previous + lorenz)
+        top = sorted(self.top, reverse=True)
+        return {
+            'holders': n,
+            'total_quantity': str(self.total),
+            'hhi': self.sum_squares / supply ** 2 * 10000,
+            'gini': max(gini, 0.0),
+            'top_share_pct': {str(top_n): sum(float(quantity) for quantity, _ in top[:top_n]) / supply * 100 for top_n in HOLDER_TOP_N},
+            'holders_to_50pct': self.holders_to_share(0.5),
+            'top_holders': [
+                {'address': address, 'quantity': str(quantity), 'share': quantity / self.total * 100}
+                for quantity, address in top
+            ],
+            'complete': complete,
+            'computed_at': time.time(),
+        }
+
+def fetch_ethplorer_holders(token_address, limit=1000):
+    response = http_get(f"https://api.ethplorer.io/getTopTokenHolders/{token_address}?apiKey=freekey&limit={limit}", endpoint="ethplorer")
+    response.raise_for_status()
+    return [(h['address'], int(Decimal(str(h['balance'])))) for h in response.json().get('holders', [])]
+
+@response_cached("holders")
+def fetch_holder_distribution(token_address, chain):
+    # chain must already be normalized ('eth', 'bsc', 'polygon') so cache keys line up
+    distribution = HolderDistribution()
+    try:
+        for holders in iter_holder_pages(token_address, chain):
+            distribution.add(holders)
+        complete = True
     except requests.RequestException as e:
-        console.print(f"[bold red]Error fetching ETH price: {e}[/bold red]")
+        if chain != "eth" or distribution.holders:
+            report_fetch_error(f"Error fetching token holders for {chain} chain: {e}")
+            return None
+        # The full holder list is an Etherscan API Pro endpoint; Ethplorer's free key covers the largest holders
+        try:
+            distribution.add(fetch_ethplorer_holders(token_address))
+        except (requests.RequestException, ValueError, KeyError) as e:
+            report_fetch_error(f"Error fetching token holders for {chain} chain: {e}")
+            return None
+        complete = False
+    return distribution.summary(complete)
+
+def cached_holder_distribution(token_address, chain):
+    # Cache-only read: the full holder fetch is too heavy to start implicitly
+    chain = normalize_chain(chain)
+    if chain is None:
         return None
+    return response_cache_get("holders", ["fetch_holder_distribution", token_address.lower(), chain], cache_max_age("holders", None, None))
+
+@timed_stage
+def display_holder_distribution(distribution, chain):
+    summary_table = Table(show_header=False, box=None)
+    summary_table.add_row("Holders", f"[cyan]{distribution['holders']:,}[/cyan]" + ("" if distribution['complete'] else " [yellow](largest holders only)[/yellow]"))
+    summary_table.add_row("HHI", f"[yellow]{distribution['hhi']:,.1f}[/yellow] [dim](0-10,000)[/dim]")
+    summary_table.add_row("Gini", f"[yellow]{distribution['gini']:.4f}[/yellow]")
+    for top_n, share in distribution['top_share_pct'].items():
+        summary_table.add_row(f"Top {top_n} Share", f"[magenta]{share:.2f}%[/magenta]")
+    summary_table.add_row("Holders to 50%", f"[green]{distribution['holders_to_50pct']:,}[/green]")
+    console.print(Panel(summary_table, title=f"Holder Concentration ({chain.upper()})", expand=False))
+
+def holder_distribution_analysis():
+    token_address = Prompt.ask("\n[bold cyan]Enter the token address[/bold cyan]")
+    chain = Prompt.ask("Enter the blockchain", choices=["eth", "bsc", "polygon"], default="eth")
+    with console.status("[bold green]Fetching the complete holder list..."):
+        distribution = fetch_holder_distribution(token_address, chain)
+    if not distribution:
+        console.print("[bold red]Unable to fetch the holder list for this token.[/bold red]")
+        return
+    display_holder_distribution(distribution, chain)
+    display_top_holders(distribution['top_holders'][:20], chain)
+
+@timed_stage
+def display_top_holders(top_holders, chain):
+    holders_table = Table(title=f"Top {len(top_holders)} Token Holders ({chain.upper()})", show_header=True, header_style="bold blue")
+    holders_table.add_column("Rank", style="cyan", justify="right")
+    holders_table.add_column("Address", style="green")
+    holders_table.add_column("Share", style="magenta", justify="right")
     
-def gwei_to_eth(gwei):
-    return float(gwei) * (10 ** -9)
+    for i, holder in enumerate(top_holders, 1):
+        holders_table.add_row(
+            str(i),
+            holder['address'],
+            format_token_share(holder['share'])
+        )
+        
+    console.print(holders_table)
 
-def calculate_gas_cost_in_usd(gas_price_gwei, eth_price_usd, gas_limit):
-    eth_cost = gwei_to_eth(gas_price_gwei) * gas_limit
-    return eth_cost * eth_price_usd
+class GasOracle:
+    def __init__(self, chain="eth", capacity=None):
+        import numpy as np
+        self.chain = chain
+        self.capacity = capacity or GAS_ORACLE_BLOCKS
+        self.percentiles = [percentile for _, percentile, _, _ in GAS_TIERS]
+        # Fixed-size ring buffers: slot head is written next, the oldest of size blocks sits just after it
+        self.base_fees = np.zeros(self.capacity)
+        self.gas_used_ratios = np.zeros(self.capacity)
+        self.rewards = np.zeros((self.capacity, len(self.percentiles)))
+        self.head = 0
+        self.size = 0
+        self.newest_block = None
+        self.next_base_fee = None
+        self._lock = threading.Lock()
+        
+    def append(self, base_fees, gas_used_ratios, rewards):
+        import numpy as np
+        count = min(len(gas_used_ratios), self.capacity)
+        slots = (self.head + np.arange(count)) % self.capacity
+        self.base_fees[slots] = base_fees[-count:]
+        self.gas_used_ratios[slots] = gas_used_ratios[-count:]
+        self.rewards[slots] = rewards[-count:]
+        self.head = (self.head + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        
+    def window(self, blocks=None):
+        import numpy as np
+        count = min(blocks or self.size, self.size)
+        slots = (self.head - count + np.arange(count)) % self.capacity
+        return self.base_fees[slots], self.gas_used_ratios[slots], self.rewards[slots]
+    
+    def refresh(self):
+        import numpy as np
+        with self._lock:
+            latest = int(rpc_request(self.chain, "eth_blockNumber", []), 16)
+            if self.newest_block is not None and latest <= self.newest_block:
+                return 0
+            # Only blocks newer than the buffer are fetched; after a long gap the buffer simply starts over
+            count = self.capacity if self.newest_block is None else min(self.capacity, latest - self.newest_block)
+            history = rpc_request(self.chain, "eth_feeHistory", [hex(count), hex(latest), self.percentiles])
+            
+            gas_used_ratios = np.array(history['gasUsedRatio'], dtype=float)
+            # baseFeePerGas carries one extra entry: the base fee of the block after the newest one
+            base_fees = np.array([int(fee, 16) for fee in history['baseFeePerGas']], dtype=float) / 1e9
+            rewards = np.zeros((len(gas_used_ratios), len(self.percentiles)))
+            for i, row in enumerate(history.get('reward') or []):
+                if row:
+                    rewards[i] = [int(reward, 16) for reward in row]
+            rewards /= 1e9
+            
+            self.append(base_fees[:len(gas_used_ratios)], gas_used_ratios, rewards)
+            self.next_base_fee = float(base_fees[-1])
+            self.newest_block = int(history['oldestBlock'], 16) + len(gas_used_ratios) - 1
+            return len(gas_used_ratios)
+    
+    def summary(self, tier_blocks=None):
+        import numpy as np
+        with self._lock:
+            if not self.size:
+                return None
+            base_fees, gas_used_ratios, rewards = self.window()
+            recent = slice(-(tier_blocks or GAS_ORACLE_TIER_BLOCKS), None)
+            # Empty blocks report zero rewards at every percentile, which would drag every tier to 0
+            busy = rewards[recent][gas_used_ratios[recent] > 0]
+            priority_fees = np.median(busy if len(busy) else rewards[recent], axis=0)
+            
+            edge = max(1, min(10, len(base_fees) // 4))
+            early, late = base_fees[:edge].mean(), base_fees[-edge:].mean()
+            slope = np.polyfit(np.arange(len(base_fees)), base_fees, 1)[0] if len(base_fees) > 1 else 0.0
+            return {
+                'newest_block': self.newest_block,
+                'blocks': int(self.size),
+                'next_base_fee': self.next_base_fee,
+                'priority_fees': priority_fees.tolist(),
+                'gas_prices': (self.next_base_fee + priority_fees).tolist(),
+                'base_fee_min': float(base_fees.min()),
+                'base_fee_max': float(base_fees.max()),
+                'base_fee_mean': float(base_fees.mean()),
+                'base_fee_slope': float(slope),
+                'base_fee_change_pct': float((late - early) / early * 100) if early else 0.0,
+                'gas_used_ratio': float(gas_used_ratios.mean()),
+            }
 
-def display_eth_gas_prices():
+_gas_oracle = None
+
+def get_gas_oracle():
+    global _gas_oracle
+    if _gas_oracle is None:
+        _gas_oracle = GasOracle()
+    return _gas_oracle
+
+def fetch_gas_quote():
+    try:
+        get_gas_oracle().refresh()
+        summary = get_gas_oracle().summary()
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        if not getattr(_thread_state, 'quiet', False):
+            console.print(f"[dim]Fee history unavailable from the node provider ({e}); using the Etherscan gas oracle.[/dim]")
+        summary = None
+    if summary:
+        return {
+            'source': 'eth_feeHistory',
+            'gas_prices': summary['gas_prices'],
+            'priority_fees': summary['priority_fees'],
+            'base_fee': summary['next_base_fee'],
+            'last_block': summary['newest_block'],
+            'history': summary,
+        }
+    
     gas_data = fetch_eth_gas_prices()
+    if not gas_data:
+        return None
+    return {
+        'source': 'gasoracle',
+        'gas_prices': [float(gas_data[field]) for _, _, field, _ in GAS_TIERS],
+        'priority_fees': None,
+        'base_fee': float(gas_data['suggestBaseFee']),
+        'last_block': int(gas_data['LastBlock']),
+        'history': None,
+    }
+
+def gas_cost_labels():
+    return ["ETH Transfer", *GAS_LIMITS.keys()]
+
+def gas_cost_matrix(gas_prices_gwei, eth_price_usd):
+    import numpy as np
+    # Rows follow gas_cost_labels() (the plain transfer first), columns follow GAS_TIERS
+    gas_limits = np.array([ETHEREUM_GAS_LIMIT, *GAS_LIMITS.values()], dtype=float)
+    return np.outer(gas_limits, np.asarray(gas_prices_gwei, dtype=float) * 1e-9 * eth_price_usd)
+
+@timed_stage
+def display_eth_gas_prices():
+    quote = fetch_gas_quote()
     eth_price_usd = fetch_eth_price()
     
-    if gas_data and eth_price_usd:
-        # Calculate USD costs for different gas tiers and transaction types
-        usd_costs = {
-            "Low": {},
-            "Standard": {},
-            "Fast": {}
-        }
+    if quote and eth_price_usd:
+        costs = gas_cost_matrix(quote['gas_prices'], eth_price_usd)
         
-        for tier, gas_price_key in [("Low", "SafeGasPrice"), ("Standard", "ProposeGasPrice"), ("Fast", "FastGasPrice")]:
-            gas_price_gwei = float(gas_data[gas_price_key])
-            for tx_type, gas_limit in GAS_LIMITS.items():
-                usd_costs[tier][tx_type] = calculate_gas_cost_in_usd(gas_price_gwei, eth_price_usd, gas_limit)
-                
         # Gas Price Table
         gas_table = Table(title="Ethereum Gas Prices")
         gas_table.add_column("Priority", style="cyan")
         gas_table.add_column("Gas Price (Gwei)", style="yellow")
+        if quote['priority_fees']:
+            gas_table.add_column("Priority Fee (Gwei)", style="yellow")
         gas_table.add_column("Cost in USD (ETH Transfer)", style="green")
         gas_table.add_column("Estimated Time", style="magenta")
         
-        low_gas_usd = calculate_gas_cost_in_usd(gas_data['SafeGasPrice'], eth_price_usd, 21000)
-        standard_gas_usd = calculate_gas_cost_in_usd(gas_data['ProposeGasPrice'], eth_price_usd, 21000)
-        fast_gas_usd = calculate_gas_cost_in_usd(gas_data['FastGasPrice'], eth_price_usd, 21000)
-        
-        gas_table.add_row("Low", gas_data['SafeGasPrice'], f"${low_gas_usd:.2f}", "< 15 minutes")
-        gas_table.add_row("Standard", gas_data['ProposeGasPrice'], f"${standard_gas_usd:.2f}", "< 5 minutes")
-        gas_table.add_row("Fast", gas_data['FastGasPrice'], f"${fast_gas_usd:.2f}", "< 1 minute")
+        for i, (tier, _, _, estimated_time) in enumerate(GAS_TIERS):
+            row = [tier, f"{quote['gas_prices'][i]:.2f}"]
+            if quote['priority_fees']:
+                row.append(f"{quote['priority_fees'][i]:.3f}")
+            gas_table.add_row(*row, f"${costs[0, i]:.2f}", estimated_time)
         
         console.print(gas_table)
         
@@ -324,20 +1659,26 @@ def display_eth_gas_prices():
         tx_table.add_column("Standard Priority", style="yellow")
         tx_table.add_column("Fast Priority", style="red")
         
-        for tx_type in GAS_LIMITS.keys():
-            tx_table.add_row(
-                tx_type,
-                f"${usd_costs['Low'][tx_type]:.2f}",
-                f"${usd_costs['Standard'][tx_type]:.2f}",
-                f"${usd_costs['Fast'][tx_type]:.2f}"
-            )
+        for tx_type, tier_costs in list(zip(gas_cost_labels(), costs))[1:]:
+            tx_table.add_row(tx_type, *(f"${cost:.2f}" for cost in tier_costs))
             
         console.print(tx_table)
         
         # Additional Information
         info_table = Table(show_header=False, box=None)
-        info_table.add_row("Base Fee:", f"[yellow]{gas_data['suggestBaseFee']} Gwei[/yellow]")
-        info_table.add_row("Last Block:", f"[green]{gas_data['LastBlock']}[/green]")
+        info_table.add_row("Base Fee:", f"[yellow]{quote['base_fee']:.2f} Gwei[/yellow]")
+        info_table.add_row("Last Block:", f"[green]{quote['last_block']}[/green]")
+        history = quote['history']
+        if history:
+            change = history['base_fee_change_pct']
+            color = "red" if change > 0 else "green"
+            info_table.add_row(
+                f"Base Fee Trend ({history['blocks']} blocks):",
+                f"[{color}]{change:+.1f}%[/{color}] ({history['base_fee_slope']:+.3f} Gwei/block, "
+                f"range {history['base_fee_min']:.2f}-{history['base_fee_max']:.2f} Gwei)"
+            )
+            info_table.add_row("Block Fullness:", f"{history['gas_used_ratio'] * 100:.0f}% of gas limit on average")
+        info_table.add_row("Source:", quote['source'])
         
         now = datetime.now()
         info_table.add_row("Last Updated:", f"[magenta]{now.strftime('%Y-%m-%d %H:%M:%S')}[/magenta]")
@@ -345,10 +1686,9 @@ def display_eth_gas_prices():
         console.print(Panel(info_table, title="Additional Information", expand=False))
         
         # Historical comparison
-        if 'LastBlock' in gas_data and 'suggestBaseFee' in gas_data:
-            blocks_per_day = 24 * 60 * 60 / 12  # Approximate number of blocks per day
-            estimated_daily_base_fee = float(gas_data['suggestBaseFee']) * blocks_per_day
-            console.print(f"\n[bold yellow]Estimated daily base fee burn:[/bold yellow] {estimated_daily_base_fee:.2f} ETH")
+        blocks_per_day = 24 * 60 * 60 / 12  # Approximate number of blocks per day
+        estimated_daily_base_fee = quote['base_fee'] * blocks_per_day
+        console.print(f"\n[bold yellow]Estimated daily base fee burn:[/bold yellow] {estimated_daily_base_fee:.2f} ETH")
             
         # Gas price volatility warning
         console.print("\n[bold red]Note:[/bold red] Gas prices can be highly volatile. Always check current prices before sending a transaction.")
@@ -364,29 +1704,26 @@ def clear_screen():
         os.system('clear')  
         
 def save_favorite_wallets(favorites):
-    with open(WALLET_FAVORITES_FILE, 'w') as f:
-        json.dump(favorites, f)
+    replace_favorite_rows("favorite_wallets", favorites)
         
 def load_favorite_wallets():
-    if os.path.exists(WALLET_FAVORITES_FILE):
-        with open(WALLET_FAVORITES_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    return load_favorite_rows("favorite_wallets")
         
 def add_to_favorite_wallets(favorites, address, chain):
     nickname = Prompt.ask("Enter a nickname for this wallet (optional)", default="")
     favorites[address] = {'chain': chain, 'nickname': nickname}
-    save_favorite_wallets(favorites)
+    store_favorite_row("favorite_wallets", address, favorites[address])
     console.print(f"[bold green]Added {address} ({chain}) to favorite wallets with nickname: {nickname or 'N/A'}![/bold green]")
     
 def remove_from_favorite_wallets(favorites, address):
     if address in favorites:
         data = favorites.pop(address)
-        save_favorite_wallets(favorites)
+        delete_favorite_row("favorite_wallets", address)
         console.print(f"[bold yellow]Removed {address} ({data['chain']}) from favorite wallets.[/bold yellow]")
     else:
         console.print("[bold red]Wallet address not found in favorites.[/bold red]")
         
+@timed_stage
 def display_favorite_wallets(favorites):
     if not favorites:
         console.print("[yellow]No favorite wallets saved yet.[/yellow]")
@@ -406,55 +1743,520 @@ def display_favorite_wallets(favorites):
     console.print(table)
     
 def copy_to_clipboard(text):
+    import pyperclip
     pyperclip.copy(text)
     console.print("[bold green]Copied to clipboard![/bold green]")
     
-def fetch_token_transfers(address, chain, start=0, limit=30):
-    if chain == "eth":
-        api_url = ETHERSCAN_API
-        api_key = ETHERSCAN_KEY
-    elif chain == "bsc":
-        api_url = BSCSCAN_API
-        api_key = BSCSCAN_KEY
-    else:
+def fetch_token_transfers(address, chain, start=0, limit=30, startblock=0, sort="desc", endblock=99999999):
+    if scan_api_url(chain) is None:
         return None
     
     params = {
         "module": "account",
         "action": "tokentx",
         "address": address,
-        "startblock": 0,
-        "endblock": 99999999,
-        "sort": "desc",
+        "startblock": startblock,
+        "endblock": endblock,
+        "sort": sort,
         "offset": limit,
         "page": start // limit + 1,
-        "apikey": api_key
     }
     
-    response = requests.get(api_url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        if data["status"] == "1":
-            return data["result"]
+    try:
+        data = scan_api_get(chain, params)
+    except requests.RequestException as e:
+        report_fetch_error(f"Error fetching token transfers: {e}")
+        return None
+    if data["status"] == "1":
+        return data["result"]
+    # An empty range is status 0 too; anything else (rate limit, bad key) is a failure
+    if data.get("result") == [] or 'no transactions found' in str(data.get("message", "")).lower():
+        return []
+    report_fetch_error(f"Error fetching token transfers: {data.get('result')}")
     return None
 
 def get_wallet_balance(address, chain):
-    if chain == "eth":
-        api_url = f"{ETHERSCAN_API}?module=account&action=balance&address={address}&tag=latest&apikey={ETHERSCAN_KEY}"
-    elif chain == "bsc":
-        api_url = f"{BSCSCAN_API}?module=account&action=balance&address={address}&tag=latest&apikey={BSCSCAN_KEY}"
-    else:
+    if scan_api_url(chain) is None:
         return None
     
-    response = requests.get(api_url)
-    data = response.json()
+    try:
+        data = scan_api_get(chain, {"module": "account", "action": "balance", "address": address, "tag": "latest"})
+    except requests.RequestException as e:
+        report_fetch_error(f"Error fetching wallet balance: {e}")
+        return None
     if data["status"] == "1":
-        return float(data["result"]) / 1e18
+        return from_wei(int(data["result"]), 'ether')
     return None
+
+def fetch_wallet_balances(addresses, chain):
+    if scan_api_url(chain) is None:
+        return None
+    
+    params = {"module": "account", "action": "balancemulti", "address": ",".join(addresses), "tag": "latest"}
+    try:
+        data = scan_api_get(chain, params)
+    except requests.RequestException as e:
+        report_fetch_error(f"Error fetching wallet balances: {e}")
+        return None
+    if data["status"] == "1":
+        # Balances stay integer wei so unchanged wallets compare exactly
+        return {entry["account"].lower(): int(entry["balance"]) for entry in data["result"]}
+    return None
+    
+_wallet_index_db = None
+_wallet_index_lock = threading.Lock()
+
+TRANSFER_COLUMNS = [
+    ("blockNumber", "block_number"),
+    ("timeStamp", "time_stamp"),
+    ("hash", "hash"),
+    ("logIndex", "log_index"),
+    ("contractAddress", "contract_address"),
+    ("from", "from_address"),
+    ("to", "to_address"),
+    ("value", "value"),
+    ("tokenName", "token_name"),
+    ("tokenSymbol", "token_symbol"),
+    ("tokenDecimal", "token_decimal"),
+]
+
+def get_wallet_index_db():
+    global _wallet_index_db
+    if _wallet_index_db is None:
+        db = sqlite3.connect(WALLET_INDEX_FILE, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS transfers (
+                chain TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                log_index INTEGER NOT NULL,
+                block_number INTEGER NOT NULL,
+                time_stamp INTEGER NOT NULL,
+                contract_address TEXT NOT NULL,
+                from_address TEXT NOT NULL,
+                to_address TEXT NOT NULL,
+                value TEXT NOT NULL,
+                token_name TEXT,
+                token_symbol TEXT,
+                token_decimal TEXT,
+                PRIMARY KEY (chain, hash, log_index)
+            );
+            CREATE INDEX IF NOT EXISTS transfers_from ON transfers (chain, from_address, time_stamp);
+            CREATE INDEX IF NOT EXISTS transfers_to ON transfers (chain, to_address, time_stamp);
+            CREATE INDEX IF NOT EXISTS transfers_contract ON transfers (chain, contract_address, time_stamp);
+            CREATE INDEX IF NOT EXISTS transfers_time ON transfers (chain, time_stamp);
+            -- Covering indexes so portfolio reductions read grouped rows straight from the index
+            CREATE INDEX IF NOT EXISTS transfers_in_flows ON transfers (chain, to_address, contract_address, from_address, value);
+            CREATE INDEX IF NOT EXISTS transfers_out_flows ON transfers (chain, from_address, contract_address, to_address, value);
+            CREATE TABLE IF NOT EXISTS wallet_sync (
+                chain TEXT NOT NULL,
+                address TEXT NOT NULL,
+                last_block INTEGER NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (chain, address)
+            );
+        """)
+        _wallet_index_db = db
+    return _wallet_index_db
+
+def transfer_log_index(tx):
+    if tx.get('logIndex') not in (None, ''):
+        return int(tx['logIndex'])
+    # Older responses have no logIndex; derive a stable id from the transfer itself
+    digest = hashlib.sha1(f"{tx['contractAddress']}:{tx['from']}:{tx['to']}:{tx['value']}".lower().encode()).digest()
+    return -int.from_bytes(digest[:7], 'big')
+
+def store_transfers(db, chain, transactions):
+    rows = [
+        (
+            chain, tx['hash'].lower(), transfer_log_index(tx), int(tx['blockNumber']), int(tx['timeStamp']),
+            tx['contractAddress'].lower(), tx['from'].lower(), tx['to'].lower(), tx['value'],
+            tx.get('tokenName'), tx.get('tokenSymbol'), tx.get('tokenDecimal'),
+        )
+        for tx in transactions
+    ]
+    before = db.total_changes
+    db.executemany(
+        "INSERT OR IGNORE INTO transfers (chain, hash, log_index, block_number, time_stamp, contract_address, "
+        "from_address, to_address, value, token_name, token_symbol, token_decimal) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    return db.total_changes - before
+
+def wallet_synced_block(address, chain):
+    with _wallet_index_lock:
+        row = get_wallet_index_db().execute(
+            "SELECT last_block FROM wallet_sync WHERE chain = ? AND address = ?", (chain, address.lower())
+        ).fetchone()
+    return row[0] if row else None
+
+def sync_wallet_transfers(address, chain):
+    db = get_wallet_index_db()
+    address = address.lower()
+    # Resume from the last synced block itself; transfers already stored are ignored by the primary key
+    last_block = wallet_synced_block(address, chain) or 0
+    new_transfers = 0
+    
+    for transactions in iter_transfer_pages(address, chain, startblock=last_block):
+        with _wallet_index_lock:
+            new_transfers += store_transfers(db, chain, transactions)
+            db.commit()
+        last_block = max(last_block, int(transactions[-1]['blockNumber']))
+    
+    with _wallet_index_lock:
+        db.execute(
+            "INSERT OR REPLACE INTO wallet_sync (chain, address, last_block, synced_at) VALUES (?, ?, ?, ?)",
+            (chain, address, last_block, time.time())
+        )
+        db.commit()
+    return new_transfers
+
+def query_wallet_transfers(address, chain, offset=0, limit=30, token=None, counterparty=None, min_block=None, before_block=None):
+    address = address.lower()
+    if counterparty:
+        counterparty = counterparty.lower()
+        conditions = ["chain = ?", "((from_address = ? AND to_address = ?) OR (from_address = ? AND to_address = ?))"]
+        params = [chain, address, counterparty, counterparty, address]
+    else:
+        conditions = ["chain = ?", "(from_address = ? OR to_address = ?)"]
+        params = [chain, address, address]
+    if token:
+        if token.lower().startswith('0x'):
+            conditions.append("contract_address = ?")
+            params.append(token.lower())
+        else:
+            conditions.append("token_symbol = ? COLLATE NOCASE")
+            params.append(token)
+    if min_block is not None:
+        conditions.append("block_number >= ?")
+        params.append(min_block)
+    if before_block is not None:
+        conditions.append("block_number < ?")
+        params.append(before_block)
+    
+    columns = ", ".join(column for _, column in TRANSFER_COLUMNS)
+    query = (
+        f"SELECT {columns} FROM transfers WHERE {' AND '.join(conditions)} "
+        "ORDER BY time_stamp DESC, block_number DESC, log_index DESC LIMIT ? OFFSET ?"
+    )
+    with _wallet_index_lock:
+        rows = get_wallet_index_db().execute(query, params + [limit, offset]).fetchall()
+    # Same shape as the tokentx API rows so the display functions work unchanged
+    return [
+        {key: str(value) if value is not None else '' for (key, _), value in zip(TRANSFER_COLUMNS, row)}
+        for row in rows
+    ]
+
+def transfer_key(tx):
+    return (tx['hash'].lower(), transfer_log_index(tx))
+
+def iter_transfer_pages(address, chain, startblock=0, endblock=99999999, page_size=None, on_truncated=None):
+    page_size = page_size or TRANSFER_SYNC_PAGE_SIZE
+    
+    def fetch(from_block, page):
+        return fetch_token_transfers(address, chain, (page - 1) * page_size, page_size, startblock=from_block, sort="asc", endblock=endblock)
+    
+    # One page is always in flight while the caller works on the current one
+    executor = ThreadPoolExecutor(max_workers=1)
+    page = 1
+    future = executor.submit(fetch, startblock, page)
+    # Keys seen in the newest block, so re-fetching it after a range move yields no duplicates
+    current_block, current_block_keys = None, set()
+    boundary_block, boundary_keys = None, set()
+    try:
+        while True:
+            transactions = future.result()
+            if transactions is None:
+                raise requests.RequestException(f"token transfer page {page} from block {startblock} failed")
+            if not transactions:
+                return
+            last_block = int(transactions[-1]['blockNumber'])
+            full_page = len(transactions) == page_size
+            at_depth_cap = full_page and page * page_size >= SCAN_API_MAX_RESULTS
+            if at_depth_cap:
+                # The API will not page deeper: restart the range at the last block seen
+                next_start = last_block if last_block > startblock else last_block + 1
+                if next_start > last_block:
+                    # The whole window is one block, and the API cannot reach the rest of it
+                    report_fetch_error(f"Block {last_block} holds more than {SCAN_API_MAX_RESULTS} transfers; the rest of that block was skipped")
+                    if on_truncated:
+                        on_truncated(last_block)
+                future = executor.submit(fetch, next_start, 1)
+            elif full_page:
+                future = executor.submit(fetch, startblock, page + 1)
+            
+            if boundary_block is not None:
+                transactions = [
+                    tx for tx in transactions
+                    if int(tx['blockNumber']) != boundary_block or transfer_key(tx) not in boundary_keys
+                ]
+            for tx in transactions:
+                block = int(tx['blockNumber'])
+                if block != current_block:
+                    current_block, current_block_keys = block, set()
+                current_block_keys.add(transfer_key(tx))
+            if transactions:
+                yield transactions
+            
+            if not full_page:
+                return
+            if at_depth_cap:
+                boundary_block, boundary_keys = current_block, set(current_block_keys)
+                startblock, page = next_start, 1
+            else:
+                page += 1
+    finally:
+        executor.shutdown(wait=False)
+
+def iter_token_transfers(address, chain, startblock=0, endblock=99999999, on_truncated=None):
+    for transactions in iter_transfer_pages(address, chain, startblock, endblock, on_truncated=on_truncated):
+        yield from transactions
+
+def normalize_transfer(tx, wallet_address, chain):
+    wallet_address = wallet_address.lower()
+    from_address, to_address = tx['from'].lower(), tx['to'].lower()
+    if from_address == to_address == wallet_address:
+        direction = 'self'
+    else:
+        direction = 'in' if to_address == wallet_address else 'out'
+    decimals = int(tx.get('tokenDecimal') or 0)
+    return {
+        'chain': chain,
+        'block_number': int(tx['blockNumber']),
+        'timestamp': int(tx['timeStamp']),
+        'datetime': datetime.utcfromtimestamp(int(tx['timeStamp'])).isoformat() + "Z",
+        'hash': tx['hash'],
+        'log_index': transfer_log_index(tx),
+        'direction': direction,
+        'from': from_address,
+        'to': to_address,
+        'counterparty': from_address if direction == 'in' else to_address,
+        'token_contract': tx['contractAddress'].lower(),
+        'token_symbol': tx.get('tokenSymbol'),
+        'token_name': tx.get('tokenName'),
+        'token_decimals': decimals,
+        'value_raw': tx['value'],
+        # Exact decimal string; never routed through float
+        'amount': str(from_units(int(tx['value']), decimals)),
+    }
+
+def filter_transfers(rows, token=None, direction=None, counterparty=None, since=None, until=None):
+    token = token.lower() if token else None
+    counterparty = counterparty.lower() if counterparty else None
+    for row in rows:
+        if until is not None and row['timestamp'] > until:
+            # Rows arrive in ascending time order, so nothing later can match
+            return
+        if since is not None and row['timestamp'] < since:
+            continue
+        if token and token not in (row['token_contract'], (row['token_symbol'] or '').lower()):
+            continue
+        if direction and row['direction'] != direction:
+            continue
+        if counterparty and row['counterparty'] != counterparty:
+            continue
+        yield row
+
+EXPORT_FIELDS = [
+    'chain', 'block_number', 'timestamp', 'datetime', 'hash', 'log_index', 'direction', 'from', 'to',
+    'counterparty', 'token_contract', 'token_symbol', 'token_name', 'token_decimals', 'value_raw', 'amount',
+]
+
+def write_ndjson(rows, output):
+    count = 0
+    for row in rows:
+        output.write(json.dumps(row, separators=(',', ':')) + "\n")
+        count += 1
+    return count
+
+def write_csv(rows, output):
+    writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+def parse_timestamp(value):
+    # Unix seconds or an ISO date/datetime, read as UTC
+    if value.isdigit():
+        return int(value)
+    return int((datetime.fromisoformat(value.rstrip("Z")) - datetime(1970, 1, 1)).total_seconds())
+
+def export_wallet_transfers(address, chain, output, fmt="ndjson", startblock=0, on_truncated=None, **filters):
+    # fetch -> normalize -> filter -> sink, one page in memory at a time; a failed page raises RequestException
+    rows = (normalize_transfer(tx, address, chain) for tx in iter_token_transfers(address, chain, startblock, on_truncated=on_truncated))
+    rows = filter_transfers(rows, **filters)
+    sink = write_csv if fmt == "csv" else write_ndjson
+    return sink(rows, output)
+
+# Transfer values are up to 78 digits. SQLite integers are 64-bit, so each value is summed as 12-digit
+# limbs: a limb sum stays exact for up to 9 million rows per group and is recombined in Python.
+VALUE_LIMB_DIGITS = 12
+VALUE_LIMBS = 7
+
+def value_limb_sums_sql():
+    return ", ".join(
+        f"SUM(CAST(substr(value, {-VALUE_LIMB_DIGITS * (i + 1)}, {VALUE_LIMB_DIGITS}) AS INTEGER))"
+        for i in range(VALUE_LIMBS)
+    )
+
+def combine_limbs(limbs):
+    return sum((limb or 0) * 10 ** (VALUE_LIMB_DIGITS * i) for i, limb in enumerate(limbs))
+
+def build_portfolio(address, chain):
+    address = address.lower()
+    db = get_wallet_index_db()
+    with _wallet_index_lock:
+        flow_rows = []
+        for direction, own_column, counterparty_column in (("in", "to_address", "from_address"), ("out", "from_address", "to_address")):
+            # Index order already groups by (contract, counterparty), so there is no sort step
+            flow_rows += [(direction, *row) for row in db.execute(
+                f"SELECT contract_address, {counterparty_column}, COUNT(*), {value_limb_sums_sql()} FROM transfers "
+                f"WHERE chain = ? AND {own_column} = ? GROUP BY contract_address, {counterparty_column}",
+                (chain, address)
+            )]
+        token_rows = [
+            (contract, *db.execute(
+                "SELECT token_symbol, token_name, token_decimal FROM transfers WHERE chain = ? AND contract_address = ? LIMIT 1",
+                (chain, contract)
+            ).fetchone())
+            for contract in {row[1] for row in flow_rows}
+        ]
+    
+    tokens = {
+        contract: {
+            'contract': contract, 'symbol': symbol, 'name': name, 'decimals': int(decimals or 0),
+            'received': 0, 'sent': 0, 'transfers': 0,
+        }
+        for contract, symbol, name, decimals in token_rows
+    }
+    flows = []
+    for direction, contract, counterparty, count, *limbs in flow_rows:
+        token = tokens[contract]
+        if counterparty == address:
+            # A self transfer shows up in both directions; count it once and move nothing
+            if direction == "in":
+                token['transfers'] += count
+            continue
+        total = combine_limbs(limbs)
+        token['transfers'] += count
+        token['received' if direction == "in" else 'sent'] += total
+        flows.append({
+            'contract': contract, 'symbol': token['symbol'], 'counterparty': counterparty,
+            'direction': direction, 'raw': total, 'transfers': count,
+        })
+    for token in tokens.values():
+        token['net'] = token['received'] - token['sent']
+    return {'tokens': tokens, 'flows': flows}
+
+def pair_token_price(token_address, pair):
+    # USD price of token_address in this pair; a token on the quote side is priced through the pair
+    if not pair.get('priceUsd'):
+        return None
+    if pair.get('baseToken', {}).get('address', '').lower() == token_address.lower():
+        return Decimal(pair['priceUsd'])
+    if pair.get('priceNative') and Decimal(pair['priceNative']):
+        return Decimal(pair['priceUsd']) / Decimal(pair['priceNative'])
+    return None
+
+def pair_liquidity(pair):
+    return float((pair.get('liquidity') or {}).get('usd') or 0)
+
+def pick_usd_price(token_address, pairs, chain):
+    # Most liquid pair on this chain
+    chain_id = DEXSCREENER_CHAIN_IDS.get(chain)
+    best_price, best_liquidity = None, -1
+    for pair in pairs:
+        if chain_id and pair.get('chainId') != chain_id:
+            continue
+        liquidity = pair_liquidity(pair)
+        if liquidity <= best_liquidity:
+            continue
+        price = pair_token_price(token_address, pair)
+        if price is not None:
+            best_price, best_liquidity = price, liquidity
+    return best_price
+
+def fetch_usd_prices(token_addresses, chain, max_in_flight=None):
+    token_addresses = [address.lower() for address in token_addresses]
+    batches = [token_addresses[i:i + DEXSCREENER_BATCH_SIZE] for i in range(0, len(token_addresses), DEXSCREENER_BATCH_SIZE)]
+    prices = {}
+    with ThreadPoolExecutor(max_workers=max_in_flight or SCAN_MAX_IN_FLIGHT) as executor:
+        for results in executor.map(fetch_dexscreener_batch, batches):
+            for address, pairs in (results or {}).items():
+                prices[address] = pick_usd_price(address, pairs, chain)
+    return prices
+
+def value_portfolio(portfolio, chain):
+    held = [token for token in portfolio['tokens'].values() if token['net'] > 0]
+    prices = fetch_usd_prices([token['contract'] for token in held], chain) if held else {}
+    total = Decimal(0)
+    for token in portfolio['tokens'].values():
+        token['balance'] = from_units(token['net'], token['decimals'])
+        token['price_usd'] = prices.get(token['contract'])
+        token['value_usd'] = token['balance'] * token['price_usd'] if token['net'] > 0 and token['price_usd'] is not None else None
+        if token['value_usd'] is not None:
+            total += token['value_usd']
+    portfolio['total_value_usd'] = total
+    return portfolio
+
+@timed_stage
+def display_portfolio(address, chain, limit=20):
+    with console.status("[bold green]Building portfolio from indexed transfers..."):
+        portfolio = value_portfolio(build_portfolio(address, chain), chain)
+    tokens = sorted(
+        portfolio['tokens'].values(),
+        key=lambda token: (token['value_usd'] is not None, token['value_usd'] or 0, token['net'] > 0),
+        reverse=True,
+    )
+    if not tokens:
+        console.print("[bold red]No indexed transfers for this wallet.[/bold red]")
+        return
+    
+    table = Table(title=f"Token Positions ({chain.upper()}) - net of all indexed transfers")
+    table.add_column("Token", style="green")
+    table.add_column("Balance", style="blue", justify="right")
+    table.add_column("Price (USD)", style="yellow", justify="right")
+    table.add_column("Value (USD)", style="magenta", justify="right")
+    table.add_column("Transfers", style="cyan", justify="right")
+    table.add_column("Contract", style="dim blue")
+    for token in tokens[:limit]:
+        table.add_row(
+            token['symbol'] or '-',
+            f"{token['balance']:,.6f}",
+            f"${token['price_usd']:.8f}" if token['price_usd'] is not None else "-",
+            f"${token['value_usd']:,.2f}" if token['value_usd'] is not None else "-",
+            str(token['transfers']),
+            truncate_address(token['contract']),
+        )
+    console.print(table)
+    console.print(f"[bold green]Total priced value:[/bold green] ${portfolio['total_value_usd']:,.2f} across {len(tokens)} tokens")
     
+    decimals = {contract: token['decimals'] for contract, token in portfolio['tokens'].items()}
+    flows_table = Table(title="Top Counterparties")
+    flows_table.add_column("Counterparty", style="yellow")
+    flows_table.add_column("Token", style="green")
+    flows_table.add_column("Direction", style="magenta")
+    flows_table.add_column("Amount", style="blue", justify="right")
+    flows_table.add_column("Transfers", style="cyan", justify="right")
+    for flow in sorted(portfolio['flows'], key=lambda flow: flow['transfers'], reverse=True)[:10]:
+        color = 'green' if flow['direction'] == 'in' else 'red'
+        flows_table.add_row(
+            truncate_address(flow['counterparty']),
+            flow['symbol'] or '-',
+            f"[{color}]{flow['direction'].upper()}[/{color}]",
+            f"{from_units(flow['raw'], decimals[flow['contract']]):,.4f}",
+            str(flow['transfers']),
+        )
+    console.print(flows_table)
+
 def truncate_address(address):
     return f"{address[:6]}...{address[-6:]}"
 
+@timed_stage
 def display_transactions(transactions, chain, wallet_address, start=0):
     table = Table(title=f"Token Transfer Events ({chain.upper()}) - Showing {start+1} to {start+len(transactions)}")
     table.add_column("#", style="cyan")
@@ -468,7 +2270,7 @@ def display_transactions(transactions, chain, wallet_address, start=0):
     
     for index, tx in enumerate(transactions, start=start+1):
         date = datetime.fromtimestamp(int(tx['timeStamp']))
-        amount = float(tx['value']) / (10 ** int(tx['tokenDecimal']))
+        amount = from_units(int(tx['value']), tx['tokenDecimal'] or 0)
         
         # Determine if it's a buy or sell/send transaction
         if tx['to'].lower() == wallet_address.lower():
@@ -488,15 +2290,104 @@ def display_transactions(transactions, chain, wallet_address, start=0):
         )
         
     console.print(table)
+    # Fetch details for the whole page in the background so opening a row costs no round trip
+    prefetch_transaction_details([tx['hash'] for tx in transactions], chain)
     return transactions
 
+@timed_stage
 def display_wallet_balance(address, chain):
     balance = get_wallet_balance(address, chain)
     if balance is not None:
-        console.print(f"\n[bold green]Current Wallet Balance:[/bold green] {balance:.4f} {'ETH' if chain == 'eth' else 'BNB'}")
+        console.print(f"\n[bold green]Current Wallet Balance:[/bold green] {balance:.4f} {NATIVE_SYMBOLS[chain]}")
     else:
         console.print("\n[bold red]Failed to fetch wallet balance.[/bold red]")
             
+def wallet_balance_targets(favorites):
+    targets = {}
+    for address, data in favorites.items():
+        for chain in (WALLET_CHAINS if data['chain'] == "all" else [data['chain']]):
+            targets.setdefault(chain, []).append(address)
+    return targets
+
+def refresh_wallet_balances(favorites, batch_size=None, max_in_flight=None):
+    batch_size = batch_size or BALANCE_BATCH_SIZE
+    max_in_flight = max_in_flight or SCAN_MAX_IN_FLIGHT
+    targets = wallet_balance_targets(favorites)
+    per_chain = [
+        [(chain, addresses[i:i + batch_size]) for i in range(0, len(addresses), batch_size)]
+        for chain, addresses in targets.items()
+    ]
+    # Interleave the chains so every chain's key is busy from the start; the scheduler paces each key
+    batches = [batch for batch in itertools.chain.from_iterable(itertools.zip_longest(*per_chain)) if batch]
+    
+    # Yields (address, chain, previous wei or None, current wei or None) as each batch lands
+    with ThreadPoolExecutor(max_workers=max_in_flight * max(1, len(targets))) as executor:
+        futures = {executor.submit(fetch_wallet_balances, addresses, chain): (chain, addresses) for chain, addresses in batches}
+        for future in as_completed(futures):
+            chain, addresses = futures[future]
+            balances = future.result() or {}
+            for address in addresses:
+                previous = favorites[address].get('balances', {}).get(chain)
+                yield address, chain, int(previous['wei']) if previous else None, balances.get(address.lower())
+
+def update_wallet_balance(favorites, address, chain, balance_wei, checked_at):
+    balances = favorites[address].setdefault('balances', {})
+    previous = balances.get(chain)
+    changed_at = previous['changed_at'] if previous and int(previous['wei']) == balance_wei else checked_at
+    balances[chain] = {'wei': str(balance_wei), 'checked_at': checked_at, 'changed_at': changed_at}
+    store_favorite_row("favorite_wallets", address, favorites[address])
+
+def refresh_favorite_wallets(favorites):
+    if not favorites:
+        console.print("[yellow]No favorite wallets saved yet.[/yellow]")
+        return
+    
+    started = time.monotonic()
+    checked_at = datetime.now().isoformat()
+    changes = []
+    checked = first_seen = failed = 0
+    targets = wallet_balance_targets(favorites)
+    with console.status(f"[bold green]Refreshing {sum(map(len, targets.values()))} balances across {len(targets)} chains..."), favorites_batch():
+        for address, chain, previous, current in refresh_wallet_balances(favorites):
+            if current is None:
+                failed += 1
+                continue
+            checked += 1
+            if previous is None:
+                first_seen += 1
+            elif current != previous:
+                changes.append((address, chain, previous, current))
+            update_wallet_balance(favorites, address, chain, current, checked_at)
+    
+    if changes:
+        table = Table(title="Changed Wallet Balances")
+        table.add_column("Wallet", style="cyan")
+        table.add_column("Chain", style="magenta")
+        table.add_column("Previous", justify="right")
+        table.add_column("Current", justify="right", style="green")
+        table.add_column("Change", justify="right")
+        for address, chain, previous, current in sorted(changes, key=lambda change: abs(change[3] - change[2]), reverse=True):
+            symbol = NATIVE_SYMBOLS[chain]
+            delta = from_wei(current - previous, 'ether')
+            color = "green" if delta > 0 else "red"
+            table.add_row(
+                favorites[address].get('nickname') or truncate_address(address),
+                chain.upper(),
+                f"{from_wei(previous, 'ether'):.4f} {symbol}",
+                f"{from_wei(current, 'ether'):.4f} {symbol}",
+                f"[{color}]{delta:+.4f} {symbol}[/{color}]",
+            )
+        console.print(table)
+    else:
+        console.print("[green]No balance changes since the last refresh.[/green]")
+    
+    summary = f"{checked} balances checked in {time.monotonic() - started:.1f}s, {len(changes)} changed"
+    if first_seen:
+        summary += f", {first_seen} recorded for the first time"
+    if failed:
+        summary += f", [red]{failed} failed[/red]"
+    console.print(f"[dim]{summary}[/dim]")
+            
 def wallet_transaction_analysis():
     favorite_wallets = load_favorite_wallets()
     
@@ -506,15 +2397,19 @@ def wallet_transaction_analysis():
         console.print("[bold white]2.[/bold white] [yellow]View favorite wallets[/yellow]")
         console.print("[bold white]3.[/bold white] [yellow]Analyze a favorite wallet[/yellow]")
         console.print("[bold white]4.[/bold white] [yellow]Remove a favorite wallet[/yellow]")
-        console.print("[bold white]5.[/bold white] [yellow]Return to main menu[/yellow]")
+        console.print("[bold white]5.[/bold white] [yellow]Refresh balances of all favorite wallets[/yellow]")
+        console.print("[bold white]6.[/bold white] [yellow]Return to main menu[/yellow]")
         
         choice = Prompt.ask("[bold cyan]Enter your choice[/bold cyan]")
         
         
         if choice == "1":
             address = Prompt.ask("\nEnter the wallet address")
-            chain = Prompt.ask("Enter the blockchain (eth/bsc)", choices=["eth", "bsc"])
-            analyze_wallet(address, chain)
+            chain = Prompt.ask("Enter the blockchain (eth/bsc/polygon, or all to merge every chain)", choices=[*WALLET_CHAINS, "all"])
+            if chain == "all":
+                analyze_wallet_all_chains(address)
+            else:
+                analyze_wallet(address, chain)
             
             if address not in favorite_wallets:
                 if Prompt.ask("Add this wallet to favorites?", choices=["y", "n"], default="n") == "y":
@@ -530,7 +2425,10 @@ def wallet_transaction_analysis():
                 if index.isdigit() and 1 <= int(index) <= len(favorite_wallets):
                     address = list(favorite_wallets.keys())[int(index) - 1]
                     chain = favorite_wallets[address]['chain']
-                    analyze_wallet(address, chain)
+                    if chain == "all":
+                        analyze_wallet_all_chains(address)
+                    else:
+                        analyze_wallet(address, chain)
                 else:
                     console.print("[bold red]Invalid wallet number.[/bold red]")
                     
@@ -545,72 +2443,550 @@ def wallet_transaction_analysis():
                     console.print("[bold red]Invalid wallet number.[/bold red]")
                     
         elif choice == "5":
+            refresh_favorite_wallets(favorite_wallets)
+                    
+        elif choice == "6":
             clear_screen()
             break
         
+def submit_daemon(func, *args):
+    # Like executor.submit, but an abandoned call never holds up interpreter exit
+    future = Future()
+    
+    def run():
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+def _background_wallet_sync(address, chain):
+    _thread_state.quiet = True
+    try:
+        return sync_wallet_transfers(address, chain)
+    except requests.RequestException:
+        return None
+
+def iter_indexed_transfers(address, chain, page_size=100, **filters):
+    offset = 0
+    while True:
+        transactions = query_wallet_transfers(address, chain, offset, page_size, **filters)
+        for tx in transactions:
+            tx['chain'] = chain
+            yield tx
+        if len(transactions) < page_size:
+            return
+        offset += page_size
+
+def iter_live_transfers(address, chain, page_size=100, timeout=None, on_incomplete=None, **filters):
+    # Newest first: API pages (sort=desc) down to the last synced block, then the local index below it.
+    # The first page is requested right away, so building one stream per chain fetches their heads in parallel.
+    db = get_wallet_index_db()
+    timeout = timeout or WALLET_CHAIN_TIMEOUT
+    synced = wallet_synced_block(address, chain)
+    startblock = synced if synced is not None else 0
+    
+    def fetch(endblock, page):
+        transactions = fetch_token_transfers(address, chain, (page - 1) * page_size, page_size, startblock=startblock, sort="desc", endblock=endblock)
+        if transactions:
+            with _wallet_index_lock:
+                store_transfers(db, chain, transactions)
+                db.commit()
+        return transactions
+    
+    def stream(future):
+        endblock, page, window_top = 99999999, 1, None
+        # Every block at or above this one has been yielded
+        yielded_from = None
+        try:
+            while True:
+                transactions = future.result(timeout=timeout)
+                if transactions is None:
+                    raise requests.RequestException(f"token transfer page {page} below block {endblock} failed")
+                full_page = len(transactions) == page_size
+                if transactions and window_top is None:
+                    window_top = int(transactions[0]['blockNumber'])
+                # The oldest block of a full page may continue on the next page, so it is not complete yet
+                complete_from = int(transactions[-1]['blockNumber']) + 1 if full_page else startblock
+                if full_page:
+                    low = complete_from - 1
+                    if page * page_size >= SCAN_API_MAX_RESULTS:
+                        # The API will not page deeper: restart the range at the oldest block seen
+                        if low == window_top:
+                            report_fetch_error(f"Block {low} holds more than {SCAN_API_MAX_RESULTS} transfers; the rest of that block was skipped")
+                            if on_incomplete:
+                                on_incomplete(chain, f"block {low} was truncated")
+                            endblock, complete_from = low - 1, low
+                        else:
+                            endblock = low
+                        page, window_top = 1, None
+                    else:
+                        page += 1
+                    future = submit_daemon(fetch, endblock, page)
+                yield from iter_indexed_transfers(address, chain, min_block=complete_from, before_block=yielded_from, **filters)
+                yielded_from = complete_from
+                if not full_page:
+                    break
+        except (requests.RequestException, TimeoutError) as e:
+            reason = str(e) or f"no answer within {timeout}s"
+            report_fetch_error(f"{chain.upper()}: {reason}; continuing from the local index")
+            if on_incomplete:
+                on_incomplete(chain, reason)
+        yield from iter_indexed_transfers(address, chain, before_block=yielded_from, **filters)
+    
+    return stream(submit_daemon(fetch, 99999999, 1))
+
+def transfer_sort_key(tx):
+    return int(tx['timeStamp']), int(tx['blockNumber'] or 0), int(tx['logIndex'] or 0)
+
+def merge_wallet_transfers(address, chains, live=False, on_incomplete=None, **filters):
+    # Each chain's stream is already newest first, so a k-way heap merge streams them in order page by page
+    if live:
+        streams = [iter_live_transfers(address, chain, on_incomplete=on_incomplete, **filters) for chain in chains]
+    else:
+        streams = [iter_indexed_transfers(address, chain, **filters) for chain in chains]
+    return heapq.merge(*streams, key=transfer_sort_key, reverse=True)
+
+@timed_stage
+def display_merged_transactions(transactions, wallet_address, start=0):
+    table = Table(title=f"Token Transfer Events (All Chains) - Showing {start+1} to {start+len(transactions)}")
+    table.add_column("#", style="cyan")
+    table.add_column("Chain", style="green")
+    table.add_column("Date", style="cyan")
+    table.add_column("Type", style="magenta")
+    table.add_column("From", style="yellow")
+    table.add_column("To", style="yellow")
+    table.add_column("Token", style="green")
+    table.add_column("Amount", style="blue", justify="right")
+    table.add_column("Tx Hash", style="dim blue")
+    
+    for index, tx in enumerate(transactions, start=start+1):
+        date = datetime.fromtimestamp(int(tx['timeStamp']))
+        amount = from_units(int(tx['value']), tx['tokenDecimal'] or 0)
+        tx_type = "[green]IN[/green]" if tx['to'].lower() == wallet_address.lower() else "[red]OUT[/red]"
+        table.add_row(
+            str(index),
+            tx['chain'].upper(),
+            date.strftime("%b %d %H:%M"),
+            tx_type,
+            truncate_address(tx['from']),
+            truncate_address(tx['to']),
+            tx['tokenSymbol'],
+            f"{amount:,.4f}",
+            truncate_address(tx['hash'])
+        )
+    console.print(table)
+    
+    hashes_by_chain = defaultdict(list)
+    for tx in transactions:
+        hashes_by_chain[tx['chain']].append(tx['hash'])
+    for chain, tx_hashes in hashes_by_chain.items():
+        prefetch_transaction_details(tx_hashes, chain)
+
+def display_chain_balances(balances, problems):
+    table = Table(title="Native Balances")
+    table.add_column("Chain", style="cyan")
+    table.add_column("Balance", style="green", justify="right")
+    table.add_column("Transfers")
+    deadline = time.monotonic() + WALLET_CHAIN_TIMEOUT
+    for chain, future in balances.items():
+        try:
+            balance = future.result(timeout=max(0, deadline - time.monotonic()))
+            balance = f"{balance:.4f} {NATIVE_SYMBOLS[chain]}" if balance is not None else "[red]unavailable[/red]"
+        except TimeoutError:
+            balance = "[yellow]timed out[/yellow]"
+        status = f"[yellow]local index only: {problems[chain]}[/yellow]" if chain in problems else "[green]live[/green]"
+        table.add_row(chain.upper(), balance, status)
+    console.print(table)
+
+def analyze_wallet_all_chains(address, chains=None):
+    chains = chains or WALLET_CHAINS
+    limit = 30
+    balances = {chain: submit_daemon(get_wallet_balance, address, chain) for chain in chains}
+    problems = {}
+    
+    def on_incomplete(chain, reason):
+        problems.setdefault(chain, reason)
+    
+    stream = merge_wallet_transfers(address, chains, live=True, on_incomplete=on_incomplete)
+    with console.status(f"[bold green]Fetching the newest transfers on {', '.join(chain.upper() for chain in chains)}..."):
+        page = list(itertools.islice(stream, limit))
+    display_chain_balances(balances, problems)
+    # The view only pulls the pages it shows; complete the local index behind it for the next visit
+    for chain in chains:
+        submit_daemon(_background_wallet_sync, address, chain)
+    
+    shown = []
+    while True:
+        if not page:
+            console.print("[bold yellow]No more transactions to display.[/bold yellow]" if shown else "[bold red]No token transfer events found.[/bold red]")
+            return
+        display_merged_transactions(page, address, len(shown))
+        shown.extend(page)
+        
+        while True:
+            action = Prompt.ask("\nEnter a transaction number to view details, 'm' for more transactions, or 'c' to continue")
+            if action.lower() == 'c':
+                return
+            elif action.lower() == 'm':
+                break
+            elif action.isdigit() and 1 <= int(action) <= len(shown):
+                tx = shown[int(action) - 1]
+                display_transaction_details(tx, tx['chain'], address)
+            else:
+                console.print("[bold red]Invalid input. Please enter a transaction number, 'm', or 'c'.[/bold red]")
+        with console.status("[bold green]Fetching more transfers..."):
+            page = list(itertools.islice(stream, limit))
+
+def export_transfers_interactive(address, chain, filters):
+    fmt = Prompt.ask("Export format", choices=["ndjson", "csv"], default="ndjson")
+    filename = Prompt.ask("Output file", default=f"{address[:10]}_{chain}_transfers.{fmt}")
+    truncated = []
+    with open(filename, "w", newline="") as output:
+        with console.status("[bold green]Exporting token transfer events..."):
+            try:
+                count = export_wallet_transfers(address, chain, output, fmt, on_truncated=truncated.append, **filters)
+            except requests.RequestException as e:
+                console.print(f"[bold red]Export stopped early, {filename} is incomplete: {e}[/bold red]")
+                return
+    if truncated:
+        console.print(f"[bold yellow]Exported {count} transfer events to {filename}, missing part of {len(truncated)} oversized blocks[/bold yellow]")
+    else:
+        console.print(f"[bold green]Exported {count} transfer events to {filename}[/bold green]")
+
 def analyze_wallet(address, chain):
     start = 0
     limit = 30
-    all_transactions = []
+    filters = {}
+    
+    with console.status("[bold green]Syncing token transfer events..."):
+        try:
+            new_transfers = sync_wallet_transfers(address, chain)
+        except requests.RequestException as e:
+            new_transfers = None
+            console.print(f"[bold red]Sync stopped early, showing the transfers indexed so far: {e}[/bold red]")
+    if new_transfers is not None:
+        console.print(f"[dim]{new_transfers} new transfer events indexed locally.[/dim]")
 
     while True:
-        with console.status("[bold green]Fetching token transfer events..."):
-            transactions = fetch_token_transfers(address, chain, start, limit)
+        transactions = query_wallet_transfers(address, chain, start, limit, **filters)
         
         if transactions:
-            all_transactions.extend(transactions)
-            displayed_transactions = display_transactions(transactions, chain, address, start)
+            display_transactions(transactions, chain, address, start)
             display_wallet_balance(address, chain)
             
             while True:
-                action = Prompt.ask("\nEnter a transaction number to view details, 'm' for more transactions, or 'c' to continue")
+                action = Prompt.ask("\nEnter a transaction number to view details, 'm' for more transactions, 'f' to filter, 'p' for portfolio, 'e' to export all, or 'c' to continue")
                 if action.lower() == 'c':
                     return
                 elif action.lower() == 'm':
                     start += limit
                     break
+                elif action.lower() == 'e':
+                    export_transfers_interactive(address, chain, filters)
+                elif action.lower() == 'p':
+                    display_portfolio(address, chain)
+                elif action.lower() == 'f':
+                    token = Prompt.ask("Filter by token contract or symbol (leave empty for all)", default="")
+                    counterparty = Prompt.ask("Filter by counterparty address (leave empty for all)", default="")
+                    filters = {'token': token or None, 'counterparty': counterparty or None}
+                    start = 0
+                    break
                 elif action.isdigit():
-                    tx_index = int(action) - 1
-                    if 0 <= tx_index < len(all_transactions):
-                        tx = all_transactions[tx_index]
-                        display_transaction_details(tx, chain, address)
+                    matches = query_wallet_transfers(address, chain, int(action) - 1, 1, **filters) if int(action) > 0 else []
+                    if matches:
+                        display_transaction_details(matches[0], chain, address)
                     else:
                         console.print("[bold red]Invalid transaction number.[/bold red]")
                 else:
-                    console.print("[bold red]Invalid input. Please enter a number, 'm', or 'c'.[/bold red]")
+                    console.print("[bold red]Invalid input. Please enter a number, 'm', 'f', 'p', 'e', or 'c'.[/bold red]")
         else:
+            if start == 0 and filters:
+                console.print("[bold yellow]No transfer events match the current filter.[/bold yellow]")
+                filters = {}
+                continue
             if start == 0:
                 console.print("[bold red]No token transfer events found or error occurred.[/bold red]")
             else:
                 console.print("[bold yellow]No more transactions to display.[/bold yellow]")
             break
 
+_favorites_db = None
+_favorites_lock = threading.RLock()
+
+FAVORITE_TABLES = {
+    "favorite_tokens": lambda: FAVORITES_FILE,
+    "favorite_wallets": lambda: WALLET_FAVORITES_FILE,
+}
+
+def migrate_favorites_json(db, table, json_file):
+    if not os.path.exists(json_file) or db.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+        return
+    try:
+        with open(json_file, 'r') as f:
+            favorites = json.load(f)
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]Could not migrate {json_file}: {e}[/bold red]")
+        return
+    with db:
+        db.executemany(
+            f"INSERT OR IGNORE INTO {table} (address, data) VALUES (?, ?)",
+            [(address, json.dumps(data)) for address, data in favorites.items()],
+        )
+    # Keep the original around, but stop reading it
+    os.replace(json_file, json_file + ".migrated")
+    console.print(f"[dim]Migrated {len(favorites)} entries from {json_file} to {FAVORITES_DB_FILE}.[/dim]")
+
+def get_favorites_db():
+    global _favorites_db
+    with _favorites_lock:
+        if _favorites_db is None:
+            db = sqlite3.connect(FAVORITES_DB_FILE, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            for table, json_file in FAVORITE_TABLES.items():
+                # rowid keeps insertion order, which the menus number entries by
+                db.execute(f"CREATE TABLE IF NOT EXISTS {table} (address TEXT PRIMARY KEY, data TEXT NOT NULL)")
+                db.commit()
+                migrate_favorites_json(db, table, json_file())
+            _favorites_db = db
+        return _favorites_db
+
+def execute_favorites(statements):
+    # statements: (sql, rows) pairs run with executemany; inside favorites_batch they wait for the batch
+    batch = getattr(_thread_state, 'favorites_batch', None)
+    if batch is not None:
+        batch.extend(statements)
+        return
+    with _favorites_lock:
+        db = get_favorites_db()
+        try:
+            for sql, rows in statements:
+                db.executemany(sql, rows)
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+@contextlib.contextmanager
+def favorites_batch():
+    # Writes inside the block are collected and land in one short transaction at the end, so the lock is
+    # never held across the network work in between; if the block raises, none of them are written
+    if getattr(_thread_state, 'favorites_batch', None) is not None:
+        yield
+        return
+    statements = _thread_state.favorites_batch = []
+    try:
+        yield
+    finally:
+        _thread_state.favorites_batch = None
+    execute_favorites(statements)
+
+def load_favorite_rows(table):
+    with _favorites_lock:
+        rows = get_favorites_db().execute(f"SELECT address, data FROM {table} ORDER BY rowid").fetchall()
+    return {address: json.loads(data) for address, data in rows}
+
+def store_favorite_row(table, address, data):
+    execute_favorites([(
+        f"INSERT INTO {table} (address, data) VALUES (?, ?) ON CONFLICT(address) DO UPDATE SET data = excluded.data",
+        [(address, json.dumps(data))],
+    )])
+
+def delete_favorite_row(table, address):
+    execute_favorites([(f"DELETE FROM {table} WHERE address = ?", [(address,)])])
+
+def replace_favorite_rows(table, favorites):
+    execute_favorites([
+        (f"DELETE FROM {table}", [()]),
+        (f"INSERT INTO {table} (address, data) VALUES (?, ?)", [(a, json.dumps(d)) for a, d in favorites.items()]),
+    ])
+
 def load_favorites():
-    if os.path.exists(FAVORITES_FILE):
-        with open(FAVORITES_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    return load_favorite_rows("favorite_tokens")
 
 def update_last_scan_price(favorites, token_address, current_price):
     if token_address in favorites:
         favorites[token_address]['last_scan_price'] = current_price
         favorites[token_address]['last_scan_time'] = datetime.now().isoformat()
-    save_favorites(favorites)
+        store_favorite_row("favorite_tokens", token_address, favorites[token_address])
     
 def save_favorites(favorites):
-    with open(FAVORITES_FILE, 'w') as f:
-        json.dump(favorites, f, indent=2)
+    replace_favorite_rows("favorite_tokens", favorites)
 
+@response_cached("pairs")
 def fetch_dexscreener_data(token_address):
-    url = f"https://api.dexscreener.com/latest/dex/tokens/{token_address}"
+    url = f"{DEXSCREENER_API}/tokens/{token_address}"
     try:
-        response = requests.get(url)
+        response = http_get(url, endpoint="dexscreener")
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        index_pairs_async(data.get('pairs'))
+        return data
+    except requests.RequestException as e:
+        report_fetch_error(f"Error fetching data: {e}")
+        return None
+
+def fetch_dexscreener_batch(token_addresses, ttl=None, max_staleness=None, complete=False):
+    # Entries are shared with fetch_dexscreener_data, so single lookups and batch scans reuse each other
+    max_age = cache_max_age("pairs", ttl, max_staleness)
+    results = {}
+    missing = []
+    for address in token_addresses:
+        cached = response_cache_get("pairs", ["fetch_dexscreener_data", address.lower()], max_age)
+        if cached is not None:
+            results[address] = cached.get('pairs') or []
+        else:
+            missing.append(address)
+    if not missing:
+        return results
+    
+    url = f"{DEXSCREENER_API}/tokens/{','.join(missing)}"
+    try:
+        response = http_get(url, endpoint="dexscreener")
+        response.raise_for_status()
+        pairs = response.json().get('pairs') or []
     except requests.RequestException as e:
-        console.print(f"[bold red]Error fetching data: {e}[/bold red]")
+        report_fetch_error(f"Error fetching batch data: {e}")
+        return results or None
+    index_pairs_async(pairs)
+
+    # Group the combined pair list back under the addresses that were requested
+    requested = {address.lower(): address for address in missing}
+    for address in missing:
+        results[address] = []
+    for pair in pairs:
+        for side in ('baseToken', 'quoteToken'):
+            address = requested.get(pair.get(side, {}).get('address', '').lower())
+            if address is not None:
+                results[address].append(pair)
+    # A combined list that reached the cap may have cut off pairs of any of the addresses, so no group
+    # from it is cached as a token's full pair list; only a single-token lookup can vouch for that
+    truncated = len(missing) > 1 and len(pairs) >= DEXSCREENER_PAIR_CAP
+    for address in missing:
+        if not truncated:
+            response_cache_put("pairs", ["fetch_dexscreener_data", address.lower()], {'pairs': results[address]})
+        elif complete or not results[address]:
+            data = fetch_dexscreener_data(address, ttl=ttl, max_staleness=max_staleness)
+            results[address] = (data or {}).get('pairs') or []
+    return results
+
+def primary_pair(token_address, pairs):
+    # Most liquid pair that trades the token as its base, so priceUsd is the token's own price;
+    # a pair holding it only as the quote token would show the other token's price, fdv and changes
+    base_pairs = [pair for pair in pairs if pair.get('baseToken', {}).get('address', '').lower() == token_address.lower()]
+    return max(base_pairs, key=pair_liquidity) if base_pairs else None
+
+def new_pair_bucket():
+    return {'pairs': 0, 'liquidity_usd': 0.0, 'volume_h24': 0.0, 'buys_h24': 0, 'sells_h24': 0}
+
+def aggregate_pairs(token_address, pairs):
+    if not pairs:
         return None
+    totals = new_pair_bucket()
+    by_chain = defaultdict(new_pair_bucket)
+    by_dex = defaultdict(new_pair_bucket)
+    weighted_price = Decimal(0)
+    priced_liquidity = 0.0
+    priced = []
+    for pair in pairs:
+        liquidity = pair_liquidity(pair)
+        volume = float((pair.get('volume') or {}).get('h24') or 0)
+        txns = (pair.get('txns') or {}).get('h24') or {}
+        chain, dex = pair.get('chainId', '?'), pair.get('dexId', '?')
+        for bucket in (totals, by_chain[chain], by_dex[f"{chain}/{dex}"]):
+            bucket['pairs'] += 1
+            bucket['liquidity_usd'] += liquidity
+            bucket['volume_h24'] += volume
+            bucket['buys_h24'] += txns.get('buys', 0)
+            bucket['sells_h24'] += txns.get('sells', 0)
+        price = pair_token_price(token_address, pair)
+        if price is not None:
+            priced.append((pair, price, liquidity))
+            weighted_price += price * Decimal(repr(liquidity))
+            priced_liquidity += liquidity
+    
+    if priced_liquidity:
+        price_usd = float(weighted_price / Decimal(repr(priced_liquidity)))
+    else:
+        price_usd = float(priced[0][1]) if priced else None
+    outliers = []
+    for pair, price, liquidity in priced:
+        deviation = float(price) / price_usd - 1 if price_usd else 0.0
+        reasons = []
+        if abs(deviation) > PAIR_OUTLIER_DEVIATION:
+            reasons.append('price')
+        if liquidity < PAIR_MIN_LIQUIDITY_USD:
+            reasons.append('liquidity')
+        if reasons:
+            outliers.append({
+                'pair_address': pair.get('pairAddress'), 'chain': pair.get('chainId'), 'dex': pair.get('dexId'),
+                'price_usd': float(price), 'deviation_pct': deviation * 100, 'liquidity_usd': liquidity, 'reasons': reasons,
+            })
+    return {
+        'token_address': token_address,
+        'price_usd': price_usd,
+        **totals,
+        'by_chain': dict(by_chain),
+        'by_dex': dict(by_dex),
+        'outliers': outliers,
+        'primary_pair': primary_pair(token_address, pairs),
+    }
+
+def aggregate_pair_batch(results):
+    # results as returned by fetch_dexscreener_batch: {address: [pairs]}
+    return {address: aggregate_pairs(address, pairs) for address, pairs in results.items()}
+
+def scan_tokens_batched(token_addresses, batch_size=None, max_in_flight=None, ttl=None, max_staleness=None, aggregate=False):
+    batch_size = batch_size or DEXSCREENER_BATCH_SIZE
+    max_in_flight = max_in_flight or SCAN_MAX_IN_FLIGHT
+    batches = [token_addresses[i:i + batch_size] for i in range(0, len(token_addresses), batch_size)]
+    
+    # Yields (address, primary pair or None) as each batch lands, not in input order;
+    # with aggregate=True the second item is the aggregate over all of the token's pairs
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        # Aggregates sum over every pair, so they need complete pair lists; a primary pair does not
+        futures = {executor.submit(fetch_dexscreener_batch, batch, ttl, max_staleness, aggregate): batch for batch in batches}
+        for future in as_completed(futures):
+            results = future.result() or {}
+            for address in futures[future]:
+                pairs = results.get(address)
+                if aggregate:
+                    yield address, aggregate_pairs(address, pairs)
+                else:
+                    yield address, primary_pair(address, pairs) if pairs else None
+
+@timed_stage
+def display_pair_aggregate(aggregate):
+    if aggregate['pairs'] < 2:
+        return
+    summary_table = Table(show_header=False, box=None)
+    summary_table.add_row("Pairs", f"[cyan]{aggregate['pairs']}[/cyan] across {len(aggregate['by_chain'])} chains and {len(aggregate['by_dex'])} DEXes")
+    if aggregate['price_usd'] is not None:
+        summary_table.add_row("Liquidity-Weighted Price", f"[yellow]${aggregate['price_usd']:,.9f}[/yellow]")
+    summary_table.add_row("Total Liquidity", f"${aggregate['liquidity_usd']:,.2f}")
+    summary_table.add_row("Total 24h Volume", f"${aggregate['volume_h24']:,.2f}")
+    summary_table.add_row("Total 24h Transactions", f"Buys: {aggregate['buys_h24']}, Sells: {aggregate['sells_h24']}")
+    console.print(Panel(summary_table, title="All Pairs", expand=False))
+    
+    dex_table = Table(title="Liquidity by Chain / DEX", show_header=True, header_style="bold blue")
+    dex_table.add_column("Chain / DEX", style="cyan")
+    dex_table.add_column("Pairs", justify="right")
+    dex_table.add_column("Liquidity (USD)", justify="right")
+    dex_table.add_column("24h Volume (USD)", justify="right")
+    dex_table.add_column("Buys / Sells", justify="right")
+    for name, bucket in sorted(aggregate['by_dex'].items(), key=lambda item: item[1]['liquidity_usd'], reverse=True):
+        dex_table.add_row(name, str(bucket['pairs']), f"${bucket['liquidity_usd']:,.2f}", f"${bucket['volume_h24']:,.2f}",
+                          f"{bucket['buys_h24']} / {bucket['sells_h24']}")
+    console.print(dex_table)
+    
+    if aggregate['outliers']:
+        console.print(f"[yellow]{len(aggregate['outliers'])} outlier pairs (price more than {PAIR_OUTLIER_DEVIATION:.0%} off, or under ${PAIR_MIN_LIQUIDITY_USD:,} liquidity):[/yellow]")
+        for outlier in sorted(aggregate['outliers'], key=lambda o: abs(o['deviation_pct']), reverse=True)[:5]:
+            console.print(f"  [dim]{outlier['chain']}/{outlier['dex']} {outlier['pair_address']}[/dim] ${outlier['price_usd']:.9f} "
+                          f"({outlier['deviation_pct']:+.1f}%, liquidity ${outlier['liquidity_usd']:,.0f})")
 
+@timed_stage
 def display_token_info(token_data, pair_data):
     token_table = Table(show_header=False, box=None)
     token_table.add_row("Name", f"[cyan]{token_data['name']}[/cyan]")
@@ -622,6 +2998,7 @@ def display_token_info(token_data, pair_data):
     
     console.print(Panel(token_table, title="Token Information", expand=False))
 
+@timed_stage
 def display_pair_info(pair_data):
     base_token = pair_data['baseToken']['symbol']
     quote_token = pair_data['quoteToken']['symbol']
@@ -678,22 +3055,13 @@ def display_pair_info(pair_data):
     # Token Holders
     token_address = pair_data['baseToken']['address']
     chain = pair_data['chainId']
-    top_holders = fetch_top_token_holders(token_address, chain)
+    distribution = cached_holder_distribution(token_address, chain)
+    top_holders = distribution['top_holders'][:10] if distribution else fetch_top_token_holders(token_address, chain)
     
     if top_holders:
-        holders_table = Table(title=f"Top 10 Token Holders ({chain.upper()})", show_header=True, header_style="bold blue")
-        holders_table.add_column("Rank", style="cyan", justify="right")
-        holders_table.add_column("Address", style="green")
-        holders_table.add_column("Share", style="magenta", justify="right")
-        
-        for i, holder in enumerate(top_holders, 1):
-            holders_table.add_row(
-                str(i),
-                holder['address'],
-                format_token_share(holder['share'])
-            )
-            
-        console.print(holders_table)
+        if distribution:
+            display_holder_distribution(distribution, chain)
+        display_top_holders(top_holders, chain)
     else:
         console.print(f"[yellow]Unable to fetch or display top token holders for {chain} chain. This may be due to API limitations or the token contract not supporting this feature.[/yellow]")
         
@@ -705,20 +3073,21 @@ def add_to_favorites(favorites, token_address, token_name, current_price, curren
     }
     if current_fdv is not None:
         favorites[token_address]['last_scan_fdv'] = current_fdv
-    save_favorites(favorites)
+    store_favorite_row("favorite_tokens", token_address, favorites[token_address])
     console.print(f"[bold green]Added {token_name} to favorites![/bold green]")
     
 
 def remove_from_favorites(favorites, token_address):
     if token_address in favorites:
         token_name = favorites.pop(token_address)
-        save_favorites(favorites)
+        delete_favorite_row("favorite_tokens", token_address)
         console.print(f"[bold yellow]Removed {token_name} from favorites.[/bold yellow]")
     else:
         console.print("[bold red]Token not found in favorites.[/bold red]")
 
 
-def display_favorites(favorites):
+@timed_stage
+def display_favorites(favorites, live_prices=None):
     if not favorites:
         console.print("[yellow]No favorites saved yet.[/yellow]")
         return
@@ -729,19 +3098,25 @@ def display_favorites(favorites):
     table.add_column("Name", style="magenta")
     table.add_column("Last Scan Price", style="yellow")
     table.add_column("Last Scan Time", style="green")
+    if live_prices:
+        table.add_column("Current Price", style="yellow")
     
     for i, (address, data) in enumerate(favorites.items(), 1):
         # Parse and format the last scan time
         last_scan_time = datetime.fromisoformat(data['last_scan_time'])
         formatted_time = last_scan_time.strftime("%b %d, %H:%M")
         
-        table.add_row(
+        row = [
             str(i),
             address,
             data['name'],
             f"${data['last_scan_price']:.8f}",
             formatted_time
-        )
+        ]
+        if live_prices:
+            current_price = live_prices.get(address)
+            row.append(f"${current_price:.8f}" if current_price is not None else "-")
+        table.add_row(*row)
         
     console.print(table)
 
@@ -753,15 +3128,18 @@ def scan_favorite_token(token_address):
             data = fetch_dexscreener_data(token_address)
             progress.update(task, completed=100)
     
-    if data and 'pairs' in data and data['pairs']:
-        pair_data = data['pairs'][0]
+    # A token that only appears as the quote side has no pair of its own to show
+    aggregate = aggregate_pairs(token_address, data['pairs']) if data and data.get('pairs') else None
+    if aggregate and aggregate['primary_pair']:
+        pair_data = aggregate['primary_pair']
         token_data = pair_data['baseToken']
-        return token_data, pair_data
+        return token_data, pair_data, aggregate
     else:
-        return None, None
+        return None, None, None
 
 
-def display_favorite_token_summary(favorites, address, data, pair_data):
+@timed_stage
+def display_favorite_token_summary(address, data, pair_data):
     if pair_data:
         current_price = float(pair_data['priceUsd'])
         last_price = float(data['last_scan_price'])
@@ -790,10 +3168,15 @@ def display_favorite_token_summary(favorites, address, data, pair_data):
             fdv_color = 'green' if fdv_change >= 0 else 'red'
             summary_table.add_row("Market Cap (FDV)", f"${current_fdv:,.2f} [{fdv_color}]({fdv_change:+,.2f})[/{fdv_color}]")
             
+        for name, stats in price_history_summary(address).items():
+            if stats and stats['samples'] > 1:
+                summary_table.add_row(
+                    f"{name} History",
+                    f"{format_change(stats['change_pct'])}  range ${stats['min']:.9f} - ${stats['max']:.9f}"
+                    + (f"  vol {stats['volatility_pct']:.2f}%" if stats['volatility_pct'] is not None else ""),
+                )
+            
         console.print(Panel(summary_table, title=f"Summary for {data['name']}", expand=False))
-        
-        # Update the last scan price and FDV
-        update_last_scan_data(favorites, address, current_price, current_fdv if 'fdv' in pair_data else None)
     else:
         console.print(f"[bold red]Failed to fetch data for {data['name']}[/bold red]")
         
@@ -803,116 +3186,753 @@ def update_last_scan_data(favorites, token_address, current_price, current_fdv=N
         favorites[token_address]['last_scan_time'] = datetime.now().isoformat()
         if current_fdv is not None:
             favorites[token_address]['last_scan_fdv'] = current_fdv
-    save_favorites(favorites)
+        store_favorite_row("favorite_tokens", token_address, favorites[token_address])
         
         
+#----- PRICE HISTORY -----#
+
+_price_history_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def price_sample_dtype():
+    import numpy as np
+    return np.dtype([('t', '<f8'), ('price', '<f8'), ('fdv', '<f8'), ('liquidity', '<f8'), ('volume_24h', '<f8')])
+
+def price_history_path(token_address, tier):
+    return os.path.join(PRICE_HISTORY_DIR, f"{token_address.lower()}.{tier}.bin")
+
+def read_price_tier(token_address, tier):
+    import numpy as np
+    path = price_history_path(token_address, tier)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=price_sample_dtype())
+    return np.fromfile(path, dtype=price_sample_dtype())
+
+def write_price_tier(token_address, tier, samples):
+    path = price_history_path(token_address, tier)
+    tmp_path = path + ".tmp"
+    samples.tofile(tmp_path)
+    os.replace(tmp_path, path)
+
+def append_price_tier(token_address, tier, samples):
+    with open(price_history_path(token_address, tier), "ab") as f:
+        f.write(samples.tobytes())
+
+def downsample_prices(samples, bucket_seconds):
+    import numpy as np
+    if not len(samples):
+        return samples
+    # Samples are time ordered; keep the last one in each bucket
+    buckets = np.floor_divide(samples['t'], bucket_seconds)
+    last_in_bucket = np.append(buckets[1:] != buckets[:-1], True)
+    return samples[last_in_bucket]
+
+def compact_price_history(token_address, now=None):
+    import numpy as np
+    now = now or time.time()
+    for (tier, _, retention), (next_tier, next_bucket, _) in zip(PRICE_HISTORY_TIERS, PRICE_HISTORY_TIERS[1:]):
+        samples = read_price_tier(token_address, tier)
+        expired = np.searchsorted(samples['t'], now - retention)
+        if not expired:
+            continue
+        next_samples = read_price_tier(token_address, next_tier)
+        rolled_up = downsample_prices(samples[:expired], next_bucket)
+        if len(next_samples) and next_samples['t'][-1] // next_bucket == rolled_up['t'][0] // next_bucket:
+            # The newest stored bucket was still open; its later sample replaces it
+            write_price_tier(token_address, next_tier, np.concatenate([next_samples[:-1], rolled_up]))
+        else:
+            append_price_tier(token_address, next_tier, rolled_up)
+        write_price_tier(token_address, tier, samples[expired:])
+    tier, _, retention = PRICE_HISTORY_TIERS[-1]
+    if retention:
+        samples = read_price_tier(token_address, tier)
+        expired = np.searchsorted(samples['t'], now - retention)
+        if expired:
+            write_price_tier(token_address, tier, samples[expired:])
+
+def needs_compaction(token_address, now):
+    import numpy as np
+    path = price_history_path(token_address, PRICE_HISTORY_TIERS[0][0])
+    if not os.path.exists(path):
+        return False
+    oldest = np.fromfile(path, dtype=price_sample_dtype(), count=1)
+    # Let a day of expired samples pile up so compaction rewrites files rarely
+    return bool(len(oldest)) and oldest['t'][0] < now - PRICE_HISTORY_TIERS[0][2] - 86400
+
+def record_price_sample(token_address, pair_data, now=None):
+    import numpy as np
+    now = now or time.time()
+    sample = np.array([(
+        now,
+        float(pair_data.get('priceUsd') or 'nan'),
+        float(pair_data.get('fdv') or 'nan'),
+        float((pair_data.get('liquidity') or {}).get('usd') or 'nan'),
+        float((pair_data.get('volume') or {}).get('h24') or 'nan'),
+    )], dtype=price_sample_dtype())
+    with _price_history_lock:
+        os.makedirs(PRICE_HISTORY_DIR, exist_ok=True)
+        append_price_tier(token_address, PRICE_HISTORY_TIERS[0][0], sample)
+        if needs_compaction(token_address, now):
+            compact_price_history(token_address, now)
+
+def load_price_history(token_address, since=None):
+    import numpy as np
+    with _price_history_lock:
+        tiers = [read_price_tier(token_address, tier) for tier, _, _ in reversed(PRICE_HISTORY_TIERS)]
+    samples = np.concatenate(tiers)
+    # Tiers only overlap around a compaction boundary; sort to be safe
+    samples = samples[np.argsort(samples['t'], kind='stable')]
+    if since is not None:
+        samples = samples[np.searchsorted(samples['t'], since):]
+    return samples
+
+def price_window_stats(samples, window_seconds, now=None):
+    import numpy as np
+    now = now or time.time()
+    samples = samples[~np.isnan(samples['price'])]
+    if not len(samples):
+        return None
+    start = np.searchsorted(samples['t'], now - window_seconds)
+    window = samples[start:]
+    if not len(window):
+        return None
+    # Measure change against the last price at or before the window start when there is one
+    base = samples[start - 1] if start else window[0]
+    prices = window['price']
+    log_returns = np.diff(np.log(prices[prices > 0]))
+    return {
+        'change_pct': (prices[-1] / base['price'] - 1) * 100 if base['price'] else None,
+        'min': float(prices.min()),
+        'max': float(prices.max()),
+        'volatility_pct': float(log_returns.std() * 100) if len(log_returns) > 1 else None,
+        'samples': int(len(window)),
+        'covered_seconds': float(now - base['t']),
+    }
+
+def price_history_summary(token_address, windows=None, now=None):
+    windows = windows or PRICE_HISTORY_WINDOWS
+    now = now or time.time()
+    samples = load_price_history(token_address, since=now - max(windows.values()) - PRICE_HISTORY_TIERS[-1][1])
+    return {name: price_window_stats(samples, seconds, now) for name, seconds in windows.items()}
+
+def format_change(change_pct):
+    if change_pct is None:
+        return "-"
+    color = 'green' if change_pct >= 0 else 'red'
+    return f"[{color}]{change_pct:+.2f}%[/{color}]"
+
+@timed_stage
 def scan_all_favorites(favorites):
-    for address, data in favorites.items():
-        _, pair_data = scan_favorite_token(address)
-        display_favorite_token_summary(favorites, address, data, pair_data)
+    addresses = list(favorites.keys())
+    with console.status(f"[bold green]Scanning {len(addresses)} favorite tokens..."), favorites_batch():
+        for address, pair_data in scan_tokens_batched(addresses):
+            # The summary compares against the previous scan, so keep it before this one overwrites it
+            previous = dict(favorites[address])
+            if pair_data:
+                record_price_sample(address, pair_data)
+                update_last_scan_data(favorites, address, float(pair_data['priceUsd']), float(pair_data['fdv']) if 'fdv' in pair_data else None)
+            display_favorite_token_summary(address, previous, pair_data)
 
-def fetch_top_cryptocurrencies():
-    url = "https://api.coincap.io/v2/assets?limit=10"
+@response_cached("market")
+def fetch_market_page(offset, limit):
+    url = f"{COINCAP_API}/assets?limit={limit}&offset={offset}"
     try:
-        response = requests.get(url)
+        response = http_get(url, endpoint="coincap")
         response.raise_for_status()
         data = response.json()
         return data['data']
     except requests.RequestException as e:
-        console.print(f"[bold red]Error fetching top cryptocurrencies: {e}[/bold red]")
+        report_fetch_error(f"Error fetching top cryptocurrencies: {e}")
         return None
 
-def load_last_scanned_prices():
-    if os.path.exists('last_scanned_prices.json'):
-        with open('last_scanned_prices.json', 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_last_scanned_prices(prices):
-    with open('last_scanned_prices.json', 'w') as f:
-        json.dump(prices, f)
-
-def display_top_cryptocurrencies():
-    cryptos = fetch_top_cryptocurrencies()
-    last_scanned = load_last_scanned_prices()
-    current_time = datetime.now()
-    
-    if cryptos:
-        table = Table(title="Top 10 Cryptocurrencies by Market Cap")
-        table.add_column("Rank", style="cyan", justify="right")
-        table.add_column("Name", style="magenta")
-        table.add_column("Symbol", style="yellow")
-        table.add_column("Price (USD)", style="green", justify="right")
-        table.add_column("24h Change", style="blue", justify="right")
-        table.add_column("Market Cap (USD)", style="red", justify="right")
-        table.add_column("Last Scanned Price", style="yellow", justify="right")
-        table.add_column("Price Change", style="cyan", justify="right")
-        
-        new_prices = {}
-        for crypto in cryptos:
-            symbol = crypto['symbol']
-            current_price = float(crypto['priceUsd'])
-            new_prices[symbol] = {'price': current_price, 'time': current_time.isoformat()}
-            
-            last_price = last_scanned.get(symbol, {}).get('price', current_price)
-            last_time = last_scanned.get(symbol, {}).get('time', current_time.isoformat())
-            
-            price_change = ((current_price - last_price) / last_price) * 100 if last_price else 0
-            price_change_24h = float(crypto['changePercent24Hr'])
-            
-            change_color = "green" if price_change_24h >= 0 else "red"
-            price_change_color = "green" if price_change >= 0 else "red"
-            
-            table.add_row(
-                crypto['rank'],
-                crypto['name'],
-                symbol,
-                f"${current_price:.2f}",
-                f"[{change_color}]{price_change_24h:.2f}%[/{change_color}]",
-                f"${float(crypto['marketCapUsd']):,.0f}",
-                f"${last_price:.2f}",
-                f"[{price_change_color}]{price_change:+.2f}%[/{price_change_color}]"
-            )
+def fetch_top_cryptocurrencies(limit=10, max_in_flight=None):
+    limit = min(limit, MARKET_SCAN_MAX)
+    if limit < 1:
+        return []
+    offsets = range(0, limit, MARKET_PAGE_SIZE)
+    with ThreadPoolExecutor(max_workers=max_in_flight or SCAN_MAX_IN_FLIGHT) as executor:
+        pages = list(executor.map(lambda offset: fetch_market_page(offset, min(MARKET_PAGE_SIZE, limit - offset)), offsets))
+    if pages[0] is None:
+        return None
+    # Stop at the first failed page so ranks stay contiguous
+    assets = []
+    for page in pages:
+        if page is None:
+            break
+        assets.extend(page)
+    return assets
+
+def market_columns(assets, taken_at=None):
+    import numpy as np
+    def floats(key):
+        return np.array([float(asset.get(key) or 'nan') for asset in assets], dtype='f8')
+    return {
+        'taken_at': np.float64(taken_at or time.time()),
+        'id': np.array([asset['id'] for asset in assets], dtype=str),
+        'symbol': np.array([asset.get('symbol') or '' for asset in assets], dtype=str),
+        'name': np.array([asset.get('name') or '' for asset in assets], dtype=str),
+        'rank': np.array([int(asset.get('rank') or 0) for asset in assets], dtype='i4'),
+        'price': floats('priceUsd'),
+        'change_24h': floats('changePercent24Hr'),
+        'market_cap': floats('marketCapUsd'),
+        'volume_24h': floats('volumeUsd24Hr'),
+    }
+
+def market_snapshot_paths():
+    if not os.path.isdir(MARKET_SNAPSHOT_DIR):
+        return []
+    # Snapshots are named by their unix time; anything else in the directory is not ours
+    names = [name for name in os.listdir(MARKET_SNAPSHOT_DIR) if name.endswith('.npz') and name[:-4].isdigit()]
+    return [os.path.join(MARKET_SNAPSHOT_DIR, name) for name in sorted(names, key=lambda name: int(name[:-4]))]
+
+def save_market_snapshot(columns):
+    import numpy as np
+    os.makedirs(MARKET_SNAPSHOT_DIR, exist_ok=True)
+    path = os.path.join(MARKET_SNAPSHOT_DIR, f"{int(columns['taken_at'] * 1000)}.npz")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **columns)
+    os.replace(tmp_path, path)
+    for old_path in market_snapshot_paths()[:-MARKET_SNAPSHOT_KEEP]:
+        os.remove(old_path)
+    return path
+
+def load_market_snapshot(path):
+    import numpy as np
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+def find_market_snapshot(against=None, now=None):
+    # against: None for the latest snapshot, an age such as "24h" for the newest one at least that old, or a path
+    paths = market_snapshot_paths()
+    if against is None:
+        return paths[-1] if paths else None
+    if os.path.exists(against):
+        return against
+    units = {'m': 60, 'h': 3600, 'd': 86400}
+    if against[-1:] in units and against[:-1].replace('.', '', 1).isdigit():
+        cutoff = (now or time.time()) - float(against[:-1]) * units[against[-1]]
+        older = [path for path in paths if int(os.path.basename(path)[:-4]) / 1000 <= cutoff]
+        return older[-1] if older else None
+    raise ValueError(f"No snapshot file or age like '24h' matches {against!r}")
+
+def migrate_last_scanned_prices(columns):
+    # The old file was keyed by symbol, which several assets share; carry over only symbols that are unique now
+    if market_snapshot_paths() or not os.path.exists(LAST_SCANNED_PRICES_FILE):
+        return None
+    import numpy as np
+    with open(LAST_SCANNED_PRICES_FILE, 'r') as f:
+        last_scanned = json.load(f)
+    symbols, counts = np.unique(columns['symbol'], return_counts=True)
+    unique_symbols = set(symbols[counts == 1].tolist())
+    keep = np.array([symbol in last_scanned and symbol in unique_symbols for symbol in columns['symbol'].tolist()], dtype=bool)
+    os.replace(LAST_SCANNED_PRICES_FILE, LAST_SCANNED_PRICES_FILE + ".migrated")
+    if not keep.any():
+        return None
+    taken_at = min(datetime.fromisoformat(entry['time']).timestamp() for entry in last_scanned.values())
+    migrated = {key: (value[keep] if getattr(value, 'ndim', 0) else value) for key, value in columns.items()}
+    migrated['taken_at'] = np.float64(taken_at)
+    migrated['price'] = np.array([last_scanned[symbol]['price'] for symbol in migrated['symbol'].tolist()], dtype='f8')
+    for key in ('change_24h', 'market_cap', 'volume_24h'):
+        migrated[key] = np.full(len(migrated['id']), np.nan)
+    return save_market_snapshot(migrated)
+
+def diff_market_snapshots(current, previous):
+    import numpy as np
+    count = len(current['id'])
+    previous_price = np.full(count, np.nan)
+    previous_rank = np.zeros(count, dtype='i4')
+    if previous is not None and len(previous['id']):
+        # Align the two snapshots on asset id; symbols are not unique
+        _, current_index, previous_index = np.intersect1d(current['id'], previous['id'], assume_unique=True, return_indices=True)
+        previous_price[current_index] = previous['price'][previous_index]
+        previous_rank[current_index] = previous['rank'][previous_index]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (current['price'] - previous_price) / previous_price * 100
+    return {
+        'previous_price': previous_price,
+        'change': change,
+        'rank_change': np.where(previous_rank > 0, previous_rank - current['rank'], 0),
+        'is_new': previous_rank == 0,
+        'previous_taken_at': float(previous['taken_at']) if previous is not None else None,
+    }
+
+def market_movers(diff, count=None):
+    import numpy as np
+    count = count or MARKET_MOVERS
+    change = diff['change']
+    known = np.flatnonzero(np.isfinite(change))
+    order = known[np.argsort(change[known], kind='stable')]
+    gainers = order[::-1][:count]
+    losers = order[:count]
+    return gainers[change[gainers] > 0], losers[change[losers] < 0]
+
+def format_asset_price(price):
+    if price != price:
+        return "N/A"
+    return f"${price:,.2f}" if price >= 1 else f"${price:.6g}"
+
+def render_market_table(columns, diff, rows, title):
+    table = Table(title=title)
+    table.add_column("Rank", style="cyan", justify="right")
+    table.add_column("Name", style="magenta")
+    table.add_column("Symbol", style="yellow")
+    table.add_column("Price (USD)", style="green", justify="right")
+    table.add_column("24h Change", style="blue", justify="right")
+    table.add_column("Market Cap (USD)", style="red", justify="right")
+    table.add_column("Last Scanned Price", style="yellow", justify="right")
+    table.add_column("Price Change", style="cyan", justify="right")
+    
+    for i in rows:
+        price_change_24h = columns['change_24h'][i]
+        change_color = "green" if price_change_24h >= 0 else "red"
+        market_cap = columns['market_cap'][i]
+        if diff['is_new'][i]:
+            last_price, price_change = "[dim]new[/dim]", ""
+        else:
+            change = diff['change'][i]
+            price_change_color = "green" if change >= 0 else "red"
+            last_price = format_asset_price(diff['previous_price'][i])
+            price_change = f"[{price_change_color}]{change:+.2f}%[/{price_change_color}]" if change == change else "N/A"
+            if diff['rank_change'][i]:
+                price_change += f" [dim]({diff['rank_change'][i]:+d} rank)[/dim]"
+        table.add_row(
+            str(columns['rank'][i]),
+            columns['name'][i],
+            columns['symbol'][i],
+            format_asset_price(columns['price'][i]),
+            f"[{change_color}]{price_change_24h:.2f}%[/{change_color}]" if price_change_24h == price_change_24h else "N/A",
+            f"${market_cap:,.0f}" if market_cap == market_cap else "N/A",
+            last_price,
+            price_change
+        )
+    return table
+
+def display_market_movers(columns, diff):
+    gainers, losers = market_movers(diff)
+    if not len(gainers) and not len(losers):
+        return
+    table = Table(title="Biggest Movers Since Last Scan")
+    table.add_column("Gainers", style="magenta")
+    table.add_column("Change", justify="right")
+    table.add_column("Losers", style="magenta")
+    table.add_column("Change", justify="right")
+    for i in range(max(len(gainers), len(losers))):
+        cells = []
+        for movers, color in ((gainers, "green"), (losers, "red")):
+            if i < len(movers):
+                index = movers[i]
+                cells += [f"{columns['name'][index]} ({columns['symbol'][index]})", f"[{color}]{diff['change'][index]:+.2f}%[/{color}]"]
+            else:
+                cells += ["", ""]
+        table.add_row(*cells)
+    console.print(table)
+
+@timed_stage
+def display_top_cryptocurrencies(limit=10, against=None):
+    assets = fetch_top_cryptocurrencies(limit)
+    
+    if assets:
+        current = market_columns(assets)
+        migrate_last_scanned_prices(current)
+        previous_path = find_market_snapshot(against)
+        previous = load_market_snapshot(previous_path) if previous_path else None
+        diff = diff_market_snapshots(current, previous)
+        save_market_snapshot(current)
         
-        console.print(table)
+        # Only one page is rendered at a time, so a 2000-asset scan stays as quick to draw as the top 10
+        pages = max(1, -(-len(assets) // MARKET_TABLE_ROWS))
+        page = 0
+        while True:
+            rows = range(page * MARKET_TABLE_ROWS, min((page + 1) * MARKET_TABLE_ROWS, len(assets)))
+            title = f"Top {len(assets)} Cryptocurrencies by Market Cap"
+            if pages > 1:
+                title += f" (page {page + 1}/{pages})"
+            console.print(render_market_table(current, diff, rows, title))
+            if pages == 1:
+                break
+            choice = Prompt.ask(
+                "[bold cyan]'n' next page, 'p' previous, a page number, 'm' movers, or 'q' to finish[/bold cyan]", default="n"
+            ).lower()
+            if choice == 'q':
+                break
+            if choice == 'm':
+                display_market_movers(current, diff)
+                continue
+            if choice == 'p':
+                page = max(page - 1, 0)
+            elif choice.isdigit() and 1 <= int(choice) <= pages:
+                page = int(choice) - 1
+            elif page + 1 < pages:
+                page += 1
+            else:
+                break
         
-        # Save the new prices
-        save_last_scanned_prices(new_prices)
+        if pages == 1 and len(assets) > MARKET_MOVERS:
+            display_market_movers(current, diff)
         
         # Display last scan time
-        last_scan_time = datetime.fromisoformat(min(p['time'] for p in last_scanned.values())) if last_scanned else current_time
+        last_scan_time = datetime.fromtimestamp(diff['previous_taken_at']) if previous is not None else datetime.now()
         console.print(f"\n[bold cyan]Last scan time: {last_scan_time.strftime('%Y-%m-%d %H:%M:%S')}[/bold cyan]")
     else:
         console.print("[bold red]Failed to fetch top cryptocurrencies data.[/bold red]")
         
 def fetch_btc_eth_prices():
-    url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin,ethereum&vs_currencies=usd"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+    data = fetch_coingecko_prices("bitcoin,ethereum")
+    if data and 'bitcoin' in data and 'ethereum' in data:
         return data['bitcoin']['usd'], data['ethereum']['usd']
-    except requests.RequestException as e:
-        console.print(f"[bold red]Error fetching BTC and ETH prices: {e}[/bold red]")
-        return None, None
+    return None, None
+
+def format_age(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}s ago"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m ago"
+    return f"{seconds / 3600:.1f}h ago"
+
+class PriceTicker(threading.Thread):
+    def __init__(self, favorites, interval=None):
+        super().__init__(daemon=True)
+        self.favorites = favorites
+        self.interval = interval or PRICE_TICKER_INTERVAL
+        self.btc_price = None
+        self.eth_price = None
+        self.updated_at = None
+        self.token_prices = {}
+        self.tokens_updated_at = None
+        self.last_error = None
+        self._stop_event = threading.Event()
+        
+    def run(self):
+        _thread_state.quiet = True
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                # One bad refresh must not end the ticker; the next interval tries again
+                self.last_error = f"{type(e).__name__}: {e}"
+                report_fetch_error(f"Price ticker refresh failed: {self.last_error}")
+            self._stop_event.wait(self.interval)
+            
+    def stop(self):
+        self._stop_event.set()
+        
+    def refresh(self):
+        btc_price, eth_price = fetch_btc_eth_prices()
+        if btc_price and eth_price:
+            # Keep the last good value on failure; the menu shows how old it is
+            self.btc_price, self.eth_price = btc_price, eth_price
+            self.updated_at = time.time()
+        
+        addresses = list(self.favorites.keys())
+        if addresses:
+            token_prices = dict(self.token_prices)
+            for address, pair_data in scan_tokens_batched(addresses, ttl=self.interval):
+                if pair_data and pair_data.get('priceUsd'):
+                    token_prices[address] = float(pair_data['priceUsd'])
+            self.token_prices = token_prices
+            self.tokens_updated_at = time.time()
+            
+    def display_prices(self):
+        if self.btc_price and self.eth_price:
+            age = format_age(time.time() - self.updated_at)
+            console.print(f"\n[bold yellow]BTC: ${self.btc_price:,.2f}[/bold yellow] | [bold yellow]ETH: ${self.eth_price:,.2f}[/bold yellow] [dim](updated {age})[/dim]")
+        elif self.is_alive() and self.updated_at is None:
+            console.print("\n[dim]Fetching BTC and ETH prices...[/dim]")
+        else:
+            console.print("\n[bold red]Unable to fetch BTC and ETH prices[/bold red]")
+        if self.last_error:
+            console.print(f"[dim]Last price refresh failed ({self.last_error}); retrying every {self.interval}s[/dim]")
+    
+class WatchScheduler:
+    def __init__(self, addresses, min_interval=None, max_interval=None, threshold=None):
+        self.min_interval = min_interval or WATCH_MIN_INTERVAL
+        self.max_interval = max_interval or WATCH_MAX_INTERVAL
+        self.threshold = WATCH_MOVE_THRESHOLD if threshold is None else threshold
+        now = time.time()
+        self.state = {
+            address: {'interval': self.min_interval, 'next_poll': now, 'price': None, 'change_pct': None, 'changed_at': None, 'polled_at': None}
+            for address in addresses
+        }
+        self.polls = 0
+        
+    def due(self, now=None):
+        now = now or time.time()
+        return [address for address, state in self.state.items() if state['next_poll'] <= now]
+    
+    def next_poll_in(self, now=None):
+        now = now or time.time()
+        return max(0, min(state['next_poll'] for state in self.state.values()) - now) if self.state else self.max_interval
+    
+    def observe(self, address, price, now=None):
+        now = now or time.time()
+        state = self.state[address]
+        self.polls += 1
+        state['polled_at'] = now
+        change_pct = None
+        if price is not None and state['price']:
+            change_pct = (price - state['price']) / state['price'] * 100
+        if change_pct is not None and abs(change_pct) >= self.threshold:
+            # Moving: poll twice as often, down to the floor
+            state['interval'] = max(self.min_interval, state['interval'] / 2)
+            state['change_pct'], state['changed_at'] = change_pct, now
+        else:
+            state['interval'] = min(self.max_interval, state['interval'] * 1.5)
+        if price is not None and (change_pct is None or abs(change_pct) >= self.threshold):
+            state['price'] = price
+        # Spread polls out so tokens that share an interval do not bunch into one burst
+        state['next_poll'] = now + state['interval'] * random.uniform(0.9, 1.1)
+        return change_pct if change_pct is not None and abs(change_pct) >= self.threshold else None
+    
+    def poll(self, favorites, on_change=None):
+        due = self.due()
+        if not due:
+            return 0
+        for address, pair_data in scan_tokens_batched(due, ttl=self.min_interval / 2):
+            price = float(pair_data['priceUsd']) if pair_data and pair_data.get('priceUsd') else None
+            change_pct = self.observe(address, price)
+            if price is not None:
+                record_price_sample(address, pair_data)
+            if change_pct is not None and on_change:
+                on_change(address, favorites.get(address, {}), price, change_pct)
+        return len(due)
+
+@timed_stage
+def render_watch_table(favorites, scheduler, started_at):
+    now = time.time()
+    rows = [(address, state) for address, state in scheduler.state.items() if state['changed_at']]
+    rows.sort(key=lambda row: row[1]['changed_at'], reverse=True)
+    quiet = len(scheduler.state) - len(rows)
+    
+    table = Table(title=f"Watching {len(scheduler.state)} favorite tokens", caption=(
+        f"{quiet} quiet tokens hidden | {scheduler.polls} polls in {now - started_at:.0f}s | Ctrl+C to stop"
+    ))
+    table.add_column("Name", style="magenta")
+    table.add_column("Address", style="cyan")
+    table.add_column("Price", style="yellow", justify="right")
+    table.add_column("Move", justify="right")
+    table.add_column("Changed", style="green", justify="right")
+    table.add_column("Poll Every", style="blue", justify="right")
+    for address, state in rows[:WATCH_MAX_ROWS]:
+        table.add_row(
+            favorites.get(address, {}).get('name', '-'),
+            truncate_address(address),
+            f"${state['price']:.9f}",
+            format_change(state['change_pct']),
+            format_age(now - state['changed_at']),
+            f"{state['interval']:.0f}s",
+        )
+    return table
+
+def watch_favorites(favorites):
+    from rich.live import Live
+    if not favorites:
+        console.print("[yellow]No favorites saved yet.[/yellow]")
+        return
+    scheduler = WatchScheduler(list(favorites.keys()))
+    started_at = time.time()
+    # Live redraws at most WATCH_FPS times a second no matter how fast prices arrive
+    with Live(get_renderable=lambda: render_watch_table(favorites, scheduler, started_at), console=console,
+              refresh_per_second=WATCH_FPS, transient=False):
+        # Fetch errors would scroll the live table away; the poll simply retries later
+        _thread_state.quiet = True
+        try:
+            while True:
+                scheduler.poll(favorites)
+                time.sleep(min(1, scheduler.next_poll_in()))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            _thread_state.quiet = False
+
+_search_index_db = None
+_search_index_lock = threading.Lock()
+_search_index_executor = ThreadPoolExecutor(max_workers=2)
+
+def get_search_index_db():
+    global _search_index_db
+    if _search_index_db is None:
+        _search_index_db = sqlite3.connect(SEARCH_INDEX_FILE, check_same_thread=False)
+        _search_index_db.execute("PRAGMA journal_mode=WAL")
+        # Every pair is kept, but search runs over tokens: one row per token pointing at its most
+        # liquid pair. token_search is an external-content trigram index over tokens, kept in step by the triggers.
+        _search_index_db.executescript("""
+            CREATE TABLE IF NOT EXISTS pairs (
+                id INTEGER PRIMARY KEY,
+                chain TEXT NOT NULL,
+                pair_address TEXT NOT NULL,
+                token_address TEXT NOT NULL COLLATE NOCASE,
+                liquidity_usd REAL NOT NULL,
+                volume_24h REAL NOT NULL,
+                data TEXT NOT NULL,
+                seen_at REAL NOT NULL,
+                UNIQUE (chain, pair_address)
+            );
+            CREATE INDEX IF NOT EXISTS pairs_token ON pairs (chain, token_address, liquidity_usd);
+            CREATE TABLE IF NOT EXISTS tokens (
+                id INTEGER PRIMARY KEY,
+                chain TEXT NOT NULL,
+                token_address TEXT NOT NULL COLLATE NOCASE,
+                name TEXT NOT NULL COLLATE NOCASE,
+                symbol TEXT NOT NULL COLLATE NOCASE,
+                liquidity_usd REAL NOT NULL,
+                volume_24h REAL NOT NULL,
+                pair_id INTEGER NOT NULL,
+                UNIQUE (chain, token_address)
+            );
+            CREATE INDEX IF NOT EXISTS tokens_rank ON tokens (liquidity_usd DESC, volume_24h DESC);
+            CREATE INDEX IF NOT EXISTS tokens_symbol ON tokens (symbol, liquidity_usd);
+            CREATE INDEX IF NOT EXISTS tokens_name ON tokens (name);
+            CREATE INDEX IF NOT EXISTS tokens_address ON tokens (token_address);
+            CREATE VIRTUAL TABLE IF NOT EXISTS token_search USING fts5(
+                name, symbol, token_address, content='tokens', content_rowid='id', tokenize='trigram'
+            );
+            CREATE TRIGGER IF NOT EXISTS tokens_ai AFTER INSERT ON tokens BEGIN
+                INSERT INTO token_search (rowid, name, symbol, token_address) VALUES (new.id, new.name, new.symbol, new.token_address);
+            END;
+            CREATE TRIGGER IF NOT EXISTS tokens_ad AFTER DELETE ON tokens BEGIN
+                INSERT INTO token_search (token_search, rowid, name, symbol, token_address) VALUES ('delete', old.id, old.name, old.symbol, old.token_address);
+            END;
+            CREATE TRIGGER IF NOT EXISTS tokens_au AFTER UPDATE OF name, symbol ON tokens BEGIN
+                INSERT INTO token_search (token_search, rowid, name, symbol, token_address) VALUES ('delete', old.id, old.name, old.symbol, old.token_address);
+                INSERT INTO token_search (rowid, name, symbol, token_address) VALUES (new.id, new.name, new.symbol, new.token_address);
+            END;
+        """)
+        _search_index_db.commit()
+    return _search_index_db
+
+def index_pairs(pairs):
+    now = time.time()
+    pair_rows = []
+    token_rows = {}
+    for pair in pairs or []:
+        base_token = pair.get('baseToken') or {}
+        chain, token_address = pair.get('chainId') or '', base_token.get('address')
+        if not pair.get('pairAddress') or not token_address:
+            continue
+        pair_rows.append((
+            chain, pair['pairAddress'], token_address, pair_liquidity(pair),
+            float((pair.get('volume') or {}).get('h24') or 0), json.dumps(pair, separators=(',', ':')), now
+        ))
+        token_rows[(chain, token_address.lower())] = (base_token.get('name') or '', base_token.get('symbol') or '', chain, token_address)
+    if not pair_rows:
+        return 0
+    
+    with _search_index_lock:
+        db = get_search_index_db()
+        db.executemany(
+            "INSERT INTO pairs (chain, pair_address, token_address, liquidity_usd, volume_24h, data, seen_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (chain, pair_address) DO UPDATE SET token_address = excluded.token_address, "
+            "liquidity_usd = excluded.liquidity_usd, volume_24h = excluded.volume_24h, "
+            "data = excluded.data, seen_at = excluded.seen_at",
+            pair_rows
+        )
+        # Re-derive each touched token from all of its pairs; MAX() makes the bare id column the most liquid pair
+        db.executemany(
+            "INSERT INTO tokens (name, symbol, chain, token_address, liquidity_usd, volume_24h, pair_id) "
+            "SELECT ?, ?, chain, token_address, MAX(liquidity_usd), SUM(volume_24h), id "
+            "FROM pairs WHERE chain = ? AND token_address = ? "
+            "ON CONFLICT (chain, token_address) DO UPDATE SET name = excluded.name, symbol = excluded.symbol, "
+            "liquidity_usd = excluded.liquidity_usd, volume_24h = excluded.volume_24h, pair_id = excluded.pair_id",
+            list(token_rows.values())
+        )
+        db.commit()
+    return len(pair_rows)
+
+def index_pairs_async(pairs):
+    # Every pair response feeds the search index without holding up the caller
+    if pairs:
+        _search_index_executor.submit(index_pairs, pairs)
+
+def search_index_size():
+    with _search_index_lock:
+        return get_search_index_db().execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+def search_index(term, limit=None):
+    term = term.strip()
+    limit = limit or SEARCH_RESULT_LIMIT
+    if not term:
+        return []
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    params = {
+        'term': term,
+        'match': '"' + term.replace('"', '""') + '"',
+        'prefix': escaped + '%',
+        'substring': '%' + escaped + '%',
+        'limit': limit,
+        'threshold': SEARCH_SCAN_THRESHOLD,
+    }
+    if len(term) >= SEARCH_MIN_SUBSTRING:
+        candidates = "SELECT rowid FROM token_search WHERE token_search MATCH :match"
+        predicate = ("name LIKE :substring ESCAPE '\\' OR symbol LIKE :substring ESCAPE '\\' "
+                     "OR token_address LIKE :substring ESCAPE '\\'")
+    else:
+        candidates = "SELECT id FROM tokens WHERE symbol LIKE :prefix ESCAPE '\\' OR name LIKE :prefix ESCAPE '\\'"
+        predicate = "symbol LIKE :prefix ESCAPE '\\' OR name LIKE :prefix ESCAPE '\\'"
     
+    with _search_index_lock:
+        db = get_search_index_db()
+        # Exact symbol or address matches always come first
+        exact = [row[0] for row in db.execute(
+            "SELECT id FROM tokens WHERE symbol = :term OR token_address = :term "
+            "ORDER BY liquidity_usd DESC, volume_24h DESC LIMIT :limit", params
+        )]
+        matches = db.execute(f"SELECT COUNT(*) FROM ({candidates} LIMIT :threshold)", params).fetchone()[0]
+        if matches < SEARCH_SCAN_THRESHOLD:
+            ranked_query = (f"SELECT id FROM tokens WHERE id IN ({candidates}) "
+                            "ORDER BY liquidity_usd DESC, volume_24h DESC LIMIT :limit")
+        else:
+            # A common term matches so many tokens that walking them from the most liquid down
+            # reaches enough hits long before sorting every match would finish
+            ranked_query = (f"SELECT id FROM tokens INDEXED BY tokens_rank WHERE {predicate} "
+                            "ORDER BY liquidity_usd DESC, volume_24h DESC LIMIT :limit")
+        ranked = [row[0] for row in db.execute(ranked_query, {**params, 'limit': limit + len(exact)})]
+        token_ids = (exact + [token_id for token_id in ranked if token_id not in exact])[:limit]
+        
+        placeholders = ",".join("?" * len(token_ids))
+        data = dict(db.execute(
+            f"SELECT tokens.id, pairs.data FROM tokens JOIN pairs ON pairs.id = tokens.pair_id WHERE tokens.id IN ({placeholders})",
+            token_ids
+        ).fetchall())
+    return [json.loads(data[token_id]) for token_id in token_ids if token_id in data]
+
+def refresh_search_index(search_term, refresh=False):
+    pairs = fetch_meme_tokens(search_term, refresh=refresh)
+    if pairs is None:
+        return None
+    # Indexed here as well so the pairs are searchable as soon as this returns
+    index_pairs(pairs)
+    return pairs
+
+def _background_search_refresh(search_term, refresh=False):
+    _thread_state.quiet = True
+    return refresh_search_index(search_term, refresh)
+
+def start_search_refresh(search_term, refresh=False):
+    return _search_index_executor.submit(_background_search_refresh, search_term, refresh)
+
+@response_cached("search")
 def fetch_meme_tokens(search_term):
-    url = f"https://api.dexscreener.com/latest/dex/search?q={search_term}"
+    url = f"{DEXSCREENER_API}/search?q={search_term}"
     try:
-        response = requests.get(url)
+        response = http_get(url, endpoint="dexscreener")
         response.raise_for_status()
         data = response.json()
+        index_pairs_async(data.get('pairs'))
         return data.get('pairs', [])
     except requests.RequestException as e:
-        console.print(f"[bold red]Error fetching meme tokens: {e}[/bold red]")
+        report_fetch_error(f"Error fetching meme tokens: {e}")
         return None
 
-def display_meme_tokens(tokens):
+@timed_stage
+def display_meme_tokens(tokens, caption=None):
     if not tokens:
         console.print("[yellow]No tokens found matching the search term.[/yellow]")
         return
 
-    table = Table(title="Meme Tokens Search Results")
+    table = Table(title="Meme Tokens Search Results", caption=caption)
     table.add_column("#", style="cyan", justify="right")
     table.add_column("Name", style="magenta")
     table.add_column("Symbol", style="yellow")
@@ -921,7 +3941,7 @@ def display_meme_tokens(tokens):
     table.add_column("Liquidity (USD)", style="cyan", justify="right")
     table.add_column("Market Cap", style="red", justify="right")
 
-    for i, token in enumerate(tokens[:10], 1):  # Limit to top 10 results
+    for i, token in enumerate(tokens[:SEARCH_RESULT_LIMIT], 1):
         base_token = token['baseToken']
         liquidity = float(token['liquidity']['usd'])
         market_cap = float(token.get('fdv', 0))  # Use FDV as market cap, default to 0 if not available
@@ -938,30 +3958,47 @@ def display_meme_tokens(tokens):
         )
 
     console.print(table)
-    return tokens[:10]  # Return the displayed tokens for further analysis
+    return tokens[:SEARCH_RESULT_LIMIT]  # Return the displayed tokens for further analysis
 
 def search_and_analyze_meme_tokens(favorites):
     search_term = Prompt.ask("\n[bold cyan]Enter the name of the meme token to search[/bold cyan]")
     
-    with Progress() as progress:
-        task = progress.add_task("[green]Searching for meme tokens...", total=100)
-        
-        while not progress.finished:
-            progress.update(task, advance=0.5)
-            tokens = fetch_meme_tokens(search_term)
-            progress.update(task, completed=100)
+    # Answer from the local index right away while DexScreener is asked for fresh pairs in the background
+    refresh = start_search_refresh(search_term)
+    tokens = search_index(search_term)
+    if not tokens:
+        with Progress() as progress:
+            task = progress.add_task("[green]Searching for meme tokens...", total=100)
+            
+            while not progress.finished:
+                progress.update(task, advance=0.5)
+                refresh.result()
+                progress.update(task, completed=100)
+        tokens = search_index(search_term)
+        if refresh.result() is None:
+            # The background refresh runs quietly, so its error is reported here
+            console.print("[bold red]Error fetching meme tokens from DexScreener.[/bold red]")
     
     if tokens:
-        displayed_tokens = display_meme_tokens(tokens)
+        caption = None if refresh.done() else "From the local index; press 'r' to include fresh DexScreener results"
+        displayed_tokens = display_meme_tokens(tokens, caption)
         
         while True:
             choice = Prompt.ask(
-                "\n[bold cyan]Enter the number of the token to analyze, or 'q' to return to the main menu[/bold cyan]"
+                "\n[bold cyan]Enter the number of the token to analyze, 'r' to refresh the results, or 'q' to return to the main menu[/bold cyan]"
             )
             
             if choice.lower() == 'q':
                 break
             
+            if choice.lower() == 'r':
+                if refresh.done():
+                    refresh = start_search_refresh(search_term, refresh=True)
+                if refresh.result() is None:
+                    console.print("[bold red]Could not refresh from DexScreener; showing the local index.[/bold red]")
+                displayed_tokens = display_meme_tokens(search_index(search_term)) or displayed_tokens
+                continue
+            
             try:
                 token_index = int(choice) - 1
                 if 0 <= token_index < len(displayed_tokens):
@@ -975,13 +4012,15 @@ def search_and_analyze_meme_tokens(favorites):
                             data = fetch_dexscreener_data(token_address)
                             progress.update(task, completed=100)
                     
-                    if data and 'pairs' in data and data['pairs']:
-                        pair_data = data['pairs'][0]
+                    aggregate = aggregate_pairs(token_address, data['pairs']) if data and data.get('pairs') else None
+                    if aggregate and aggregate['primary_pair']:
+                        pair_data = aggregate['primary_pair']
                         token_data = pair_data['baseToken']
                         current_price = float(pair_data['priceUsd'])
                         
                         display_token_info(token_data, pair_data)
                         display_pair_info(pair_data)
+                        display_pair_aggregate(aggregate)
                         
                         if token_address not in favorites:
                             if Prompt.ask("[bold cyan]Add this token to favorites?[/bold cyan]", choices=["y", "n"], default="n") == "y":
@@ -991,6 +4030,7 @@ def search_and_analyze_meme_tokens(favorites):
                             if Prompt.ask("[bold cyan]Remove this token from favorites?[/bold cyan]", choices=["y", "n"], default="n") == "y":
                                 remove_from_favorites(favorites, token_address)
                             else:
+                                record_price_sample(token_address, pair_data)
                                 update_last_scan_price(favorites, token_address, current_price)
                     else:
                         console.print("[bold red]Failed to fetch data for the selected token.[/bold red]")
@@ -1004,51 +4044,512 @@ def search_and_analyze_meme_tokens(favorites):
     else:
         console.print("[bold red]No tokens found or error occurred during search.[/bold red]")
 
+#----- HEADLESS CLI -----#
+
+EXIT_OK = 0
+EXIT_NO_DATA = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+EXIT_ERROR = 70  # unexpected exception, EX_SOFTWARE from sysexits.h
+EXIT_INTERRUPTED = 130
+
+def emit_record(record):
+    sys.stdout.write(json.dumps(record, separators=(',', ':'), default=str) + "\n")
+    sys.stdout.flush()
+
+def exit_code_for(succeeded, failed):
+    if failed and succeeded:
+        return EXIT_PARTIAL
+    return EXIT_NO_DATA if failed or not succeeded else EXIT_OK
+
+def summarize_pair(pair_data):
+    base_token = pair_data.get('baseToken', {})
+    txns_h24 = pair_data.get('txns', {}).get('h24', {})
+    return {
+        'chain': pair_data.get('chainId'),
+        'dex': pair_data.get('dexId'),
+        'pair_address': pair_data.get('pairAddress'),
+        'url': pair_data.get('url'),
+        'token_address': base_token.get('address'),
+        'name': base_token.get('name'),
+        'symbol': base_token.get('symbol'),
+        'quote_symbol': pair_data.get('quoteToken', {}).get('symbol'),
+        'price_usd': float(pair_data['priceUsd']) if pair_data.get('priceUsd') else None,
+        'price_native': float(pair_data['priceNative']) if pair_data.get('priceNative') else None,
+        'liquidity_usd': pair_data.get('liquidity', {}).get('usd'),
+        'volume': pair_data.get('volume', {}),
+        'price_change': pair_data.get('priceChange', {}),
+        'buys_h24': txns_h24.get('buys'),
+        'sells_h24': txns_h24.get('sells'),
+        'fdv': pair_data.get('fdv'),
+    }
+
+def cli_analyze_token(args):
+    succeeded = failed = 0
+    for address, aggregate in scan_tokens_batched(args.addresses, aggregate=True):
+        if aggregate is None:
+            emit_record({'type': 'token', 'address': address, 'ok': False, 'error': 'no pairs found'})
+            failed += 1
+            continue
+        pair_data = aggregate['primary_pair']
+        if pair_data is None:
+            emit_record({'type': 'token', 'address': address, 'ok': False, 'error': 'only traded as a quote token',
+                         'price_usd': aggregate['price_usd']})
+            failed += 1
+            continue
+        record = {'type': 'token', 'address': address, 'ok': True, **summarize_pair(pair_data),
+                  'aggregate': {key: value for key, value in aggregate.items() if key not in ('primary_pair', 'token_address')}}
+        if args.holders:
+            record['top_holders'] = fetch_top_token_holders(pair_data['baseToken']['address'], pair_data['chainId'])
+        emit_record(record)
+        succeeded += 1
+    return exit_code_for(succeeded, failed)
+
+def cli_scan_favorites(args):
+    favorites = load_favorites()
+    if not favorites:
+        return EXIT_NO_DATA
+    succeeded = failed = 0
+    with favorites_batch():
+        for address, pair_data in scan_tokens_batched(list(favorites.keys())):
+            data = favorites[address]
+            if pair_data is None:
+                emit_record({'type': 'favorite', 'address': address, 'name': data['name'], 'ok': False, 'error': 'no pairs found'})
+                failed += 1
+                continue
+            current_price = float(pair_data['priceUsd'])
+            last_price = float(data['last_scan_price'])
+            emit_record({
+                'type': 'favorite',
+                'address': address,
+                'ok': True,
+                'last_scan_price': last_price,
+                'last_scan_time': data['last_scan_time'],
+                'change_since_last_scan_pct': (current_price - last_price) / last_price * 100 if last_price else None,
+                **summarize_pair(pair_data),
+            })
+            if not args.no_update:
+                record_price_sample(address, pair_data)
+                update_last_scan_data(favorites, address, current_price, float(pair_data['fdv']) if 'fdv' in pair_data else None)
+            succeeded += 1
+    return exit_code_for(succeeded, failed)
+
+def cli_refresh_wallets(args):
+    favorites = load_favorite_wallets()
+    if not favorites:
+        return EXIT_NO_DATA
+    checked_at = datetime.now().isoformat()
+    succeeded = failed = 0
+    with favorites_batch():
+        for address, chain, previous, current in refresh_wallet_balances(favorites):
+            if current is None:
+                emit_record({'type': 'wallet_balance', 'address': address, 'chain': chain, 'ok': False, 'error': 'balance unavailable'})
+                failed += 1
+                continue
+            succeeded += 1
+            if not args.no_update:
+                update_wallet_balance(favorites, address, chain, current, checked_at)
+            if current == previous and not args.all:
+                continue
+            emit_record({
+                'type': 'wallet_balance',
+                'address': address,
+                'chain': chain,
+                'ok': True,
+                'nickname': favorites[address].get('nickname') or None,
+                'balance': from_wei(current, 'ether'),
+                'balance_wei': str(current),
+                'previous_wei': str(previous) if previous is not None else None,
+                'change_wei': str(current - previous) if previous is not None else None,
+                'checked_at': checked_at,
+            })
+    return exit_code_for(succeeded, failed)
+
+def cli_wallet_transfers(args):
+    incomplete = {}
+    if args.chain == "all":
+        # Only the pages needed for --offset/--limit are fetched; nothing waits on a full sync
+        stream = merge_wallet_transfers(
+            args.address, WALLET_CHAINS, live=not args.no_sync, on_incomplete=incomplete.setdefault,
+            token=args.token, counterparty=args.counterparty,
+        )
+    else:
+        if not args.no_sync:
+            try:
+                sync_wallet_transfers(args.address, args.chain)
+            except requests.RequestException as e:
+                # Serve what the index already holds, but flag the run as partial
+                console.print(f"[yellow]Sync of {args.chain} stopped early: {e}[/yellow]")
+                incomplete[args.chain] = str(e)
+        stream = merge_wallet_transfers(args.address, [args.chain], token=args.token, counterparty=args.counterparty)
+    transactions = list(itertools.islice(stream, args.offset, args.offset + args.limit))
+    for tx in transactions:
+        emit_record({
+            'type': 'transfer',
+            'chain': tx['chain'],
+            'direction': 'in' if tx['to'].lower() == args.address.lower() else 'out',
+            **tx,
+        })
+    if incomplete:
+        console.print(f"[yellow]Served from the local index only: {', '.join(incomplete)}[/yellow]")
+        return EXIT_PARTIAL if transactions else EXIT_NO_DATA
+    return EXIT_OK if transactions else EXIT_NO_DATA
+
+def cli_export_transfers(args):
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    truncated = []
+    try:
+        count = export_wallet_transfers(
+            args.address, args.chain, output, args.format, startblock=args.startblock, on_truncated=truncated.append,
+            token=args.token, direction=args.direction, counterparty=args.counterparty,
+            since=parse_timestamp(args.since) if args.since else None,
+            until=parse_timestamp(args.until) if args.until else None,
+        )
+    except requests.RequestException as e:
+        console.print(f"[bold red]Export stopped early, output is incomplete: {e}[/bold red]")
+        return EXIT_PARTIAL
+    finally:
+        if args.output:
+            output.close()
+    console.print(f"[dim]{count} transfer events exported[/dim]")
+    if truncated:
+        return EXIT_PARTIAL
+    return EXIT_OK if count else EXIT_NO_DATA
+
+def cli_price_history(args):
+    addresses = args.addresses or list(load_favorites().keys())
+    found = 0
+    for address in addresses:
+        history = price_history_summary(address)
+        if any(history.values()):
+            found += 1
+        emit_record({'type': 'price_history', 'address': address, 'windows': history})
+    return EXIT_OK if found else EXIT_NO_DATA
+
+def cli_watch(args):
+    favorites = load_favorites()
+    if not favorites:
+        return EXIT_NO_DATA
+    scheduler = WatchScheduler(list(favorites.keys()), args.min_interval, args.max_interval, args.threshold)
+    
+    def emit_change(address, data, price, change_pct):
+        emit_record({'type': 'price_move', 'address': address, 'name': data.get('name'), 'price_usd': price,
+                     'change_pct': change_pct, 'time': datetime.now().isoformat()})
+    
+    deadline = time.time() + args.duration if args.duration else None
+    while deadline is None or time.time() < deadline:
+        scheduler.poll(favorites, on_change=emit_change)
+        time.sleep(min(1, scheduler.next_poll_in()))
+    return EXIT_OK
+
+def cli_portfolio(args):
+    synced = True
+    if not args.no_sync:
+        try:
+            sync_wallet_transfers(args.address, args.chain)
+        except requests.RequestException as e:
+            console.print(f"[bold red]Sync failed, the portfolio is built from the transfers indexed so far: {e}[/bold red]")
+            synced = False
+    portfolio = build_portfolio(args.address, args.chain)
+    if args.no_prices:
+        for token in portfolio['tokens'].values():
+            token['balance'] = from_units(token['net'], token['decimals'])
+    else:
+        value_portfolio(portfolio, args.chain)
+    if not portfolio['tokens']:
+        return EXIT_NO_DATA
+    for token in portfolio['tokens'].values():
+        # Raw amounts go out as strings so JSON consumers keep every digit
+        emit_record({'type': 'position', 'chain': args.chain, 'wallet': args.address.lower(), **token,
+                     'received': str(token['received']), 'sent': str(token['sent']), 'net': str(token['net'])})
+    if args.flows:
+        for flow in portfolio['flows']:
+            emit_record({'type': 'flow', 'chain': args.chain, 'wallet': args.address.lower(), **flow, 'raw': str(flow['raw'])})
+    return EXIT_OK if synced else EXIT_PARTIAL
+
+def cli_holders(args):
+    distribution = fetch_holder_distribution(args.address, args.chain)
+    if not distribution:
+        return EXIT_NO_DATA
+    emit_record({'type': 'holder_distribution', 'address': args.address, 'chain': args.chain, **distribution})
+    return EXIT_OK if distribution['complete'] else EXIT_PARTIAL
+
+def cli_top_cryptos(args):
+    assets = fetch_top_cryptocurrencies(args.limit)
+    if not assets:
+        return EXIT_NO_DATA
+    current = market_columns(assets)
+    migrate_last_scanned_prices(current)
+    try:
+        previous_path = find_market_snapshot(args.against)
+    except ValueError as e:
+        console.print(f"[bold red]{e}[/bold red]")
+        return EXIT_USAGE
+    previous = load_market_snapshot(previous_path) if previous_path else None
+    diff = diff_market_snapshots(current, previous)
+    if not args.no_save:
+        save_market_snapshot(current)
+    
+    def optional(value):
+        return float(value) if value == value else None
+    
+    for i, crypto in enumerate(assets):
+        emit_record({
+            'type': 'asset',
+            'id': crypto['id'],
+            'rank': int(crypto['rank']),
+            'symbol': crypto['symbol'],
+            'name': crypto['name'],
+            'price_usd': float(crypto['priceUsd']),
+            'change_24h_pct': float(crypto['changePercent24Hr']) if crypto.get('changePercent24Hr') else None,
+            'market_cap_usd': float(crypto['marketCapUsd']) if crypto.get('marketCapUsd') else None,
+            'previous_price_usd': optional(diff['previous_price'][i]),
+            'change_since_snapshot_pct': optional(diff['change'][i]),
+            'rank_change': int(diff['rank_change'][i]),
+        })
+    if args.movers:
+        gainers, losers = market_movers(diff, args.movers)
+        for direction, movers in (('gainer', gainers), ('loser', losers)):
+            for i in movers:
+                emit_record({
+                    'type': 'mover',
+                    'direction': direction,
+                    'id': str(current['id'][i]),
+                    'symbol': str(current['symbol'][i]),
+                    'change_since_snapshot_pct': float(diff['change'][i]),
+                    'since': diff['previous_taken_at'],
+                })
+    return EXIT_OK
+
+def cli_gas(args):
+    quote = fetch_gas_quote()
+    eth_price_usd = fetch_eth_price()
+    if not quote or not eth_price_usd:
+        return EXIT_NO_DATA
+    costs = gas_cost_matrix(quote['gas_prices'], eth_price_usd)
+    labels = gas_cost_labels()
+    tiers = {}
+    for i, (tier, _, _, _) in enumerate(GAS_TIERS):
+        tiers[tier.lower()] = {
+            'gas_price_gwei': quote['gas_prices'][i],
+            'priority_fee_gwei': quote['priority_fees'][i] if quote['priority_fees'] else None,
+            'transfer_cost_usd': float(costs[0, i]),
+            'costs_usd': {tx_type: float(costs[row, i]) for row, tx_type in enumerate(labels) if row},
+        }
+    record = {
+        'type': 'gas',
+        'chain': 'eth',
+        'source': quote['source'],
+        'eth_price_usd': eth_price_usd,
+        'base_fee_gwei': quote['base_fee'],
+        'last_block': quote['last_block'],
+        'tiers': tiers,
+    }
+    if quote['history']:
+        history = quote['history']
+        record['base_fee_trend'] = {key: history[key] for key in (
+            'blocks', 'base_fee_min', 'base_fee_max', 'base_fee_mean', 'base_fee_slope', 'base_fee_change_pct', 'gas_used_ratio'
+        )}
+    emit_record(record)
+    return EXIT_OK
+
+def cli_search(args):
+    if not args.local:
+        # Still answers from the index when DexScreener is unreachable
+        refresh_search_index(args.term)
+    pairs = search_index(args.term, args.limit)
+    for pair_data in pairs:
+        emit_record({'type': 'search_result', 'query': args.term, **summarize_pair(pair_data)})
+    return EXIT_OK if pairs else EXIT_NO_DATA
+
+def cli_build_sigdb(args):
+    count = build_signature_db(args.source, args.output)
+    console.print(f"[bold green]Wrote {count} signatures to {args.output or SIGNATURE_DB_FILE}[/bold green]")
+    return EXIT_OK
+
+def market_limit(value):
+    limit = int(value)
+    if not 1 <= limit <= MARKET_SCAN_MAX:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {MARKET_SCAN_MAX}")
+    return limit
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Crypto Token Analyzer. Run without a command for the interactive menu; "
+                    "commands print NDJSON to stdout for scripts and schedulers."
+    )
+    parser.add_argument("--max-staleness", type=float, help="accept cached responses up to this many seconds old")
+    parser.add_argument("--stats", action="store_true", help="print request, stage and cache statistics on exit")
+    parser.add_argument("--prometheus-textfile", metavar="PATH", help="write run metrics in Prometheus text format for the node_exporter textfile collector")
+    parser.add_argument("--profile", action="store_true", help=f"cProfile each menu action (or the command) and save it under {PROFILE_DIR}/")
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc each menu action (or the command) and show the top allocations")
+    parser.add_argument("--profile-action", action="append", metavar="CHOICE", help="only profile these main menu choices, e.g. --profile-action 3")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    analyze_parser = subparsers.add_parser("analyze-token", help="price, liquidity and volume for one or more tokens")
+    analyze_parser.add_argument("addresses", nargs="+")
+    analyze_parser.add_argument("--holders", action="store_true", help="include top token holders")
+    analyze_parser.set_defaults(handler=cli_analyze_token)
+    
+    favorites_parser = subparsers.add_parser("scan-favorites", help="scan every favorite token")
+    favorites_parser.add_argument("--no-update", action="store_true", help="do not record this scan as the last scan")
+    favorites_parser.set_defaults(handler=cli_scan_favorites)
+    
+    refresh_parser = subparsers.add_parser("refresh-wallets", help="refresh the native balance of every favorite wallet with batched balancemulti calls")
+    refresh_parser.add_argument("--all", action="store_true", help="emit unchanged balances too")
+    refresh_parser.add_argument("--no-update", action="store_true", help="do not store the refreshed balances")
+    refresh_parser.set_defaults(handler=cli_refresh_wallets)
+    
+    wallet_parser = subparsers.add_parser("wallet-transfers", help="token transfers for a wallet")
+    wallet_parser.add_argument("address")
+    wallet_parser.add_argument("--chain", choices=[*WALLET_CHAINS, "all"], required=True, help="'all' merges every chain newest first")
+    wallet_parser.add_argument("--limit", type=int, default=30)
+    wallet_parser.add_argument("--offset", type=int, default=0)
+    wallet_parser.add_argument("--token", help="token contract address or symbol")
+    wallet_parser.add_argument("--counterparty", help="only transfers to or from this address")
+    wallet_parser.add_argument("--no-sync", action="store_true", help="read the local index without syncing first")
+    wallet_parser.set_defaults(handler=cli_wallet_transfers)
+    
+    export_parser = subparsers.add_parser("export-transfers", help="stream every token transfer of a wallet to NDJSON or CSV")
+    export_parser.add_argument("address")
+    export_parser.add_argument("--chain", choices=WALLET_CHAINS, required=True)
+    export_parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    export_parser.add_argument("--output", help="write to this file instead of stdout")
+    export_parser.add_argument("--token", help="token contract address or symbol")
+    export_parser.add_argument("--direction", choices=["in", "out", "self"])
+    export_parser.add_argument("--counterparty", help="only transfers to or from this address")
+    export_parser.add_argument("--since", help="unix time or ISO date (UTC)")
+    export_parser.add_argument("--until", help="unix time or ISO date (UTC)")
+    export_parser.add_argument("--startblock", type=int, default=0)
+    export_parser.set_defaults(handler=cli_export_transfers)
+    
+    portfolio_parser = subparsers.add_parser("portfolio", help="net token positions and counterparty flows from a wallet's full transfer history")
+    portfolio_parser.add_argument("address")
+    portfolio_parser.add_argument("--chain", choices=WALLET_CHAINS, required=True)
+    portfolio_parser.add_argument("--flows", action="store_true", help="also emit one record per token and counterparty")
+    portfolio_parser.add_argument("--no-prices", action="store_true", help="skip the USD valuation")
+    portfolio_parser.add_argument("--no-sync", action="store_true", help="read the local index without syncing first")
+    portfolio_parser.set_defaults(handler=cli_portfolio)
+    
+    holders_parser = subparsers.add_parser("holders", help="complete holder list with HHI, Gini, top-N share and holders to 50%%")
+    holders_parser.add_argument("address")
+    holders_parser.add_argument("--chain", choices=["eth", "bsc", "polygon"], default="eth")
+    holders_parser.set_defaults(handler=cli_holders)
+    
+    history_parser = subparsers.add_parser("price-history", help="recorded price change, range and volatility over 1h/24h/7d")
+    history_parser.add_argument("addresses", nargs="*", help="defaults to every favorite token")
+    history_parser.set_defaults(handler=cli_price_history)
+    
+    watch_parser = subparsers.add_parser("watch", help="poll favorites adaptively and print a record whenever a price moves")
+    watch_parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    watch_parser.add_argument("--min-interval", type=float, default=WATCH_MIN_INTERVAL)
+    watch_parser.add_argument("--max-interval", type=float, default=WATCH_MAX_INTERVAL)
+    watch_parser.add_argument("--threshold", type=float, default=WATCH_MOVE_THRESHOLD, help="percent move that counts as a change")
+    watch_parser.set_defaults(handler=cli_watch)
+    
+    top_parser = subparsers.add_parser("top-cryptos", help="top cryptocurrencies by market cap")
+    top_parser.add_argument("--limit", type=market_limit, default=10, help=f"number of assets, up to {MARKET_SCAN_MAX}")
+    top_parser.add_argument("--against", help="compare with the newest snapshot at least this old (e.g. 1h, 24h, 7d) or a snapshot file; defaults to the latest")
+    top_parser.add_argument("--movers", type=int, metavar="N", help="also emit the N biggest gainers and losers since that snapshot")
+    top_parser.add_argument("--no-save", action="store_true", help="do not store this scan as a snapshot")
+    top_parser.set_defaults(handler=cli_top_cryptos)
+    
+    gas_parser = subparsers.add_parser("gas", help="Ethereum gas prices and transaction costs")
+    gas_parser.set_defaults(handler=cli_gas)
+    
+    search_parser = subparsers.add_parser("search", help="search DexScreener pairs by name or symbol")
+    search_parser.add_argument("term")
+    search_parser.add_argument("--limit", type=int, default=SEARCH_RESULT_LIMIT)
+    search_parser.add_argument("--local", action="store_true", help="answer from the local search index without asking DexScreener")
+    search_parser.set_defaults(handler=cli_search)
+    
+    sigdb_parser = subparsers.add_parser("build-sigdb", help="build the calldata signature database from a dump")
+    sigdb_parser.add_argument("source")
+    sigdb_parser.add_argument("--output", help=f"defaults to {SIGNATURE_DB_FILE}")
+    sigdb_parser.set_defaults(handler=cli_build_sigdb)
+    return parser
+
+def run_cli(argv=None):
+    global CACHE_MAX_STALENESS, PROFILE_CPU, PROFILE_MEMORY, PROFILE_ACTIONS, STATS_REPORT
+    args = build_arg_parser().parse_args(argv)
+    if args.max_staleness is not None:
+        CACHE_MAX_STALENESS = args.max_staleness
+    PROFILE_CPU = args.profile
+    PROFILE_MEMORY = args.trace_memory
+    PROFILE_ACTIONS = set(args.profile_action) if args.profile_action else None
+    STATS_REPORT = args.stats
+    
+    exit_code = EXIT_INTERRUPTED
+    try:
+        if args.command is None:
+            main()
+            exit_code = EXIT_OK
+        else:
+            # stdout carries only NDJSON; warnings and errors go to stderr
+            console.stderr = True
+            try:
+                with profiled(args.command):
+                    exit_code = args.handler(args)
+            except KeyboardInterrupt:
+                exit_code = EXIT_INTERRUPTED
+    except Exception:
+        # Recorded before the metrics are written so a crash is not reported as a Ctrl+C
+        exit_code = EXIT_ERROR
+        raise
+    finally:
+        if args.stats:
+            display_metrics_report()
+        if args.prometheus_textfile:
+            write_prometheus_textfile(args.prometheus_textfile, args.command or "interactive", exit_code)
+    return exit_code
+
 def main():
     clear_screen()
     console.print("[bold green]Welcome to the Crypto Token Analyzer![/bold green]")
     console.print("This tool fetches and displays information about cryptocurrency tokens across various networks.")
     
     favorites = load_favorites()
+    price_ticker = PriceTicker(favorites)
+    price_ticker.start()
     
     while True:
         display_ascii_art()
-        btc_price, eth_price = fetch_btc_eth_prices()
-        if btc_price and eth_price:
-            console.print(f"\n[bold yellow]BTC: ${btc_price:,.2f}[/bold yellow] | [bold yellow]ETH: ${eth_price:,.2f}[/bold yellow]")
-        else:
-            console.print("\n[bold red]Unable to fetch BTC and ETH prices[/bold red]")
+        price_ticker.display_prices()
             
         console.print("\n[bold cyan]Main Menu:[/bold cyan]")
         console.print("[bold white]1.[/bold white] [yellow]Analyze Token[/yellow]")
         console.print("[bold white]2.[/bold white] [yellow]Analyze Wallets[/yellow]")
         console.print("[bold white]3.[/bold white] [yellow]View Favorites Token[/yellow]")
-        console.print("[bold white]4.[/bold white] [yellow]View Top 10 Cryptocurrencies[/yellow]")
+        console.print("[bold white]4.[/bold white] [yellow]View Top Cryptocurrencies[/yellow]")
         console.print("[bold white]5.[/bold white] [yellow]View Ethereum Gas Prices[/yellow]")
         console.print("[bold white]6.[/bold white] [yellow]Search Meme Tokens[/yellow]")
-        console.print("[bold white]7.[/bold white] [yellow]Exit[/yellow]")
+        console.print("[bold white]7.[/bold white] [yellow]Holder Distribution Analysis[/yellow]")
+        console.print("[bold white]8.[/bold white] [yellow]Exit[/yellow]")
         
         choice = Prompt.ask("[bold cyan]Enter your choice[/bold cyan]")
         
-        if choice == "1":
+        with (profiled(f"menu-{choice}") if should_profile(choice) else contextlib.nullcontext()):
+            if choice == "1":
                 token_address = Prompt.ask("\n[bold cyan]Enter the token address[/bold cyan]")
             
                 with Progress() as progress:
                     task = progress.add_task("[green]Fetching data...", total=100)
-                    
+                
                     while not progress.finished:
                         progress.update(task, advance=0.5)
                         data = fetch_dexscreener_data(token_address)
                         progress.update(task, completed=100)
-                        
-                if data and 'pairs' in data and data['pairs']:
-                    pair_data = data['pairs'][0]
+                    
+                aggregate = aggregate_pairs(token_address, data['pairs']) if data and data.get('pairs') else None
+                if aggregate and aggregate['primary_pair']:
+                    pair_data = aggregate['primary_pair']
                     token_data = pair_data['baseToken']
                     current_price = float(pair_data['priceUsd'])
-                    
+                
                     display_token_info(token_data, pair_data)
                     display_pair_info(pair_data)
-                    
+                    display_pair_aggregate(aggregate)
+                
                     if token_address not in favorites:
                         if Prompt.ask("[bold cyan]Add this token to favorites?[/bold cyan]", choices=["y", "n"], default="n") == "y":
                             current_fdv = float(pair_data.get('fdv', 0)) 
@@ -1057,91 +4558,108 @@ def main():
                         if Prompt.ask("[bold cyan]Remove this token from favorites?[/bold cyan]", choices=["y", "n"], default="n") == "y":
                             remove_from_favorites(favorites, token_address)
                         else:
+                            record_price_sample(token_address, pair_data)
                             update_last_scan_price(favorites, token_address, current_price)
                 else:
                     console.print("[bold red]No data found for the given token address.[/bold red]")
                     console.print("[yellow]Please check the address and try again.[/yellow]")
                 
-        elif choice == "3":
-            clear_screen()
-            display_favorites(favorites)
-            if favorites:
-                console.print("\n[bold cyan]Favorite Token Options:[/bold cyan]")
-                console.print("[bold white]1.[/bold white] [yellow]Enter the number of a favorite token to analyze[/yellow]")
-                console.print("[bold white]2.[/bold white] [yellow]Scan all favorite tokens[/yellow]")
-                console.print("[bold white]3.[/bold white] [yellow]Remove a favorite token by number[/yellow]")
-                console.print("[bold white]4.[/bold white] [yellow]Remove all favorite tokens[/yellow]")
-                console.print("[bold white]5.[/bold white] [yellow]Return to the main menu[/yellow]")
+            elif choice == "3":
+                clear_screen()
+                display_favorites(favorites, price_ticker.token_prices)
+                if favorites:
+                    console.print("\n[bold cyan]Favorite Token Options:[/bold cyan]")
+                    console.print("[bold white]1.[/bold white] [yellow]Enter the number of a favorite token to analyze[/yellow]")
+                    console.print("[bold white]2.[/bold white] [yellow]Scan all favorite tokens[/yellow]")
+                    console.print("[bold white]3.[/bold white] [yellow]Remove a favorite token by number[/yellow]")
+                    console.print("[bold white]4.[/bold white] [yellow]Remove all favorite tokens[/yellow]")
+                    console.print("[bold white]5.[/bold white] [yellow]Watch favorite tokens live[/yellow]")
+                    console.print("[bold white]6.[/bold white] [yellow]Return to the main menu[/yellow]")
                 
-                fav_choice = Prompt.ask("[bold cyan]Enter your choice[/bold cyan]")
+                    fav_choice = Prompt.ask("[bold cyan]Enter your choice[/bold cyan]")
                 
-                if fav_choice == "1":
-                    token_number = Prompt.ask("[bold cyan]Enter the number of the favorite token to analyze[/bold cyan]")
-                    if token_number.isdigit():
-                        index = int(token_number) - 1
-                        if 0 <= index < len(favorites):
-                            address = list(favorites.keys())[index]
-                            token_data, pair_data = scan_favorite_token(address)
-                            if token_data and pair_data:
-                                display_token_info(token_data, pair_data)
-                                display_pair_info(pair_data)
-                                console.print("\nPress Enter to continue...")
-                                input()
+                    if fav_choice == "1":
+                        token_number = Prompt.ask("[bold cyan]Enter the number of the favorite token to analyze[/bold cyan]")
+                        if token_number.isdigit():
+                            index = int(token_number) - 1
+                            if 0 <= index < len(favorites):
+                                address = list(favorites.keys())[index]
+                                token_data, pair_data, aggregate = scan_favorite_token(address)
+                                if token_data and pair_data:
+                                    display_token_info(token_data, pair_data)
+                                    display_pair_info(pair_data)
+                                    display_pair_aggregate(aggregate)
+                                    console.print("\nPress Enter to continue...")
+                                    input()
+                                else:
+                                    console.print("[bold red]Failed to fetch data for the selected token.[/bold red]")
                             else:
-                                console.print("[bold red]Failed to fetch data for the selected token.[/bold red]")
+                                console.print("[bold red]Invalid token number.[/bold red]")
                         else:
-                            console.print("[bold red]Invalid token number.[/bold red]")
-                    else:
-                        console.print("[bold red]Invalid input. Please enter a number.[/bold red]")
+                            console.print("[bold red]Invalid input. Please enter a number.[/bold red]")
                         
-                elif fav_choice == "2":
-                    scan_all_favorites(favorites)
-                    console.print("\nPress Enter to continue...")
-                    input()
+                    elif fav_choice == "2":
+                        scan_all_favorites(favorites)
+                        console.print("\nPress Enter to continue...")
+                        input()
                     
-                elif fav_choice == "3":
-                    token_number = Prompt.ask("[bold cyan]Enter the number of the favorite token to remove[/bold cyan]")
-                    if token_number.isdigit():
-                        index = int(token_number) - 1
-                        if 0 <= index < len(favorites):
-                            address = list(favorites.keys())[index]
-                            remove_from_favorites(favorites, address)
+                    elif fav_choice == "3":
+                        token_number = Prompt.ask("[bold cyan]Enter the number of the favorite token to remove[/bold cyan]")
+                        if token_number.isdigit():
+                            index = int(token_number) - 1
+                            if 0 <= index < len(favorites):
+                                address = list(favorites.keys())[index]
+                                remove_from_favorites(favorites, address)
+                            else:
+                                console.print("[bold red]Invalid token number.[/bold red]")
                         else:
-                            console.print("[bold red]Invalid token number.[/bold red]")
-                    else:
-                        console.print("[bold red]Invalid input. Please enter a number.[/bold red]")
+                            console.print("[bold red]Invalid input. Please enter a number.[/bold red]")
                         
-                elif fav_choice == "4":
-                    if Prompt.ask("[bold cyan]Are you sure you want to remove all favorites?[/bold cyan]", choices=["y", "n"], default="n") == "y":
-                        favorites.clear()
-                        save_favorites(favorites)
-                        console.print("[bold yellow]All favorites have been removed.[/bold yellow]")
+                    elif fav_choice == "4":
+                        if Prompt.ask("[bold cyan]Are you sure you want to remove all favorites?[/bold cyan]", choices=["y", "n"], default="n") == "y":
+                            favorites.clear()
+                            save_favorites(favorites)
+                            console.print("[bold yellow]All favorites have been removed.[/bold yellow]")
                         
-                elif fav_choice == "5":
-                    clear_screen()
-                    pass 
+                    elif fav_choice == "5":
+                        watch_favorites(favorites)
+                    
+                    elif fav_choice == "6":
+                        clear_screen()
+                        pass 
 
-        elif choice == "2":
-            clear_screen()
-            wallet_transaction_analysis()
-        elif choice == "4":
-            clear_screen()
-            console.print("\n[bold cyan]Top 10 Cryptocurrencies by Market Cap:[/bold cyan]")
-            display_top_cryptocurrencies()
-            input("\nPress Enter to return to the main menu...")
-        elif choice == "5":
-            clear_screen()
-            console.print("\n[bold cyan]Ethereum Gas Prices:[/bold cyan]")
-            display_eth_gas_prices()
-            input("\nPress Enter to return to the main menu...")
-        elif choice == "6":
-            clear_screen()
-            search_and_analyze_meme_tokens(favorites)
-        elif choice == "7":
-            break
-        else:
-            console.print("[bold red]Invalid choice. Please try again.[/bold red]")
+            elif choice == "2":
+                clear_screen()
+                wallet_transaction_analysis()
+            elif choice == "4":
+                clear_screen()
+                limit = Prompt.ask(f"[bold cyan]How many assets to scan (up to {MARKET_SCAN_MAX})?[/bold cyan]", default="10")
+                limit = min(int(limit), MARKET_SCAN_MAX) if limit.isdigit() and int(limit) > 0 else 10
+                console.print(f"\n[bold cyan]Top {limit} Cryptocurrencies by Market Cap:[/bold cyan]")
+                display_top_cryptocurrencies(limit)
+                input("\nPress Enter to return to the main menu...")
+            elif choice == "5":
+                clear_screen()
+                console.print("\n[bold cyan]Ethereum Gas Prices:[/bold cyan]")
+                display_eth_gas_prices()
+                input("\nPress Enter to return to the main menu...")
+            elif choice == "6":
+                clear_screen()
+                search_and_analyze_meme_tokens(favorites)
+            elif choice == "7":
+                clear_screen()
+                holder_distribution_analysis()
+                input("\nPress Enter to return to the main menu...")
+            elif choice == "8":
+                break
+            else:
+                console.print("[bold red]Invalid choice. Please try again.[/bold red]")
         
+    price_ticker.stop()
+    display_http_stats()
+    if not STATS_REPORT:
+        # --stats prints the scan API line with its report instead
+        display_scan_api_stats()
     console.print("[bold green]Thank you for using the Crypto Token Analyzer![/bold green]")
 if __name__ == "__main__":
-    main()
+    sys.exit(run_cli())